@@ -154,4 +154,51 @@ CORS_ALLOW_CREDENTIALS = True
 
 # File Upload Settings
 FILE_UPLOAD_MAX_MEMORY_SIZE = 5242880  # 5MB
-DATA_UPLOAD_MAX_MEMORY_SIZE = 5242880
\ No newline at end of file
+DATA_UPLOAD_MAX_MEMORY_SIZE = 5242880
+
+# Scoring
+# 'rules' : grille de score ; 'model' : artefact ML SCORING_MODEL_VERSION
+# (repli sur la grille si l'artefact est absent)
+SCORING_MODE = config('SCORING_MODE', default='rules')
+SCORING_MODEL_VERSION = config('SCORING_MODEL_VERSION', default='')
+SCORING_MODELS_DIR = config('SCORING_MODELS_DIR', default=str(BASE_DIR / 'ml_models'))
+
+# File de scoring (run_scoring_worker)
+SCORING_JOB_MAX_ATTEMPTS = config('SCORING_JOB_MAX_ATTEMPTS', default=5, cast=int)
+SCORING_JOB_RETRY_DELAY = config('SCORING_JOB_RETRY_DELAY', default=30, cast=int)  # secondes, doublé à chaque essai
+SCORING_JOB_MAX_RETRY_DELAY = config('SCORING_JOB_MAX_RETRY_DELAY', default=3600, cast=int)
+SCORING_JOB_LOCK_TIMEOUT = config('SCORING_JOB_LOCK_TIMEOUT', default=600, cast=int)
+
+# Rescoring automatique des demandes ouvertes après modification du client (secondes)
+SCORING_RESCORE_DEBOUNCE = config('SCORING_RESCORE_DEBOUNCE', default=30, cast=int)
+SCORING_RESCORE_MAX_DELAY = config('SCORING_RESCORE_MAX_DELAY', default=300, cast=int)
+
+# Simulation what-if : nombre maximum de variantes par appel
+SCORING_SIMULATION_MAX_CANDIDATES = config('SCORING_SIMULATION_MAX_CANDIDATES', default=500, cast=int)
+
+# Calcul en lot (scores/calculate_batch/) : nombre maximum de demandes par appel
+SCORING_BATCH_MAX_DEMANDS = config('SCORING_BATCH_MAX_DEMANDS', default=500, cast=int)
+
+# Export en flux des scores (scores/export/, export_scores) : lignes lues par paquet
+SCORING_EXPORT_CHUNK_SIZE = config('SCORING_EXPORT_CHUNK_SIZE', default=2000, cast=int)
+
+# Mesures de latence par étape (core/instrumentation.py)
+SCORING_METRICS_ENABLED = config('SCORING_METRICS_ENABLED', default=True, cast=bool)
+SCORING_STORE_TIMINGS = config('SCORING_STORE_TIMINGS', default=False, cast=bool)  # copie sur CreditScore.timings
+
+# Grilles, challengers et règles compilés par processus : intervalle (secondes)
+# de relecture de leur version en base (apps/scoring/versions.py), 0 = à chaque usage
+CONFIG_VERSION_CHECK_INTERVAL = config('CONFIG_VERSION_CHECK_INTERVAL', default=1.0, cast=float)
+
+# Histogrammes de dérive : âge minimal (secondes) d'un calcul historisé avant agrégation
+SCORING_DRIFT_AGGREGATION_LAG = config('SCORING_DRIFT_AGGREGATION_LAG', default=30, cast=int)
+
+# Scoring shadow des challengers : part maximale du CPU du worker
+SCORING_SHADOW_CPU_SHARE = config('SCORING_SHADOW_CPU_SHARE', default=0.2, cast=float)
+
+# Règles métier : nombre maximum de demandes par appel de rules/evaluate_batch/
+RULES_BATCH_MAX_DEMANDS = config('RULES_BATCH_MAX_DEMANDS', default=1000, cast=int)
+
+# Règles métier : mode d'évaluation par défaut ('full' : toutes les règles,
+# 'fail_fast' : arrêt au premier échec bloquant, règles ordonnées par coût mesuré)
+RULES_EVALUATION_MODE = config('RULES_EVALUATION_MODE', default='full')
@@ -43,26 +43,18 @@ def auto_calculate_score(sender, instance, created, **kwargs):
     """
     NOUVEAU WORKFLOW - CALCUL AUTOMATIQUE DU SCORE
     Score calculé dès la création (plus besoin d'attendre la soumission)
+    
+    Le calcul n'est plus fait pendant la requête : la demande est mise en
+    file et scorée par la commande run_scoring_worker.
     """
-    # Calculer le score UNIQUEMENT à la création
+    # Mettre en file UNIQUEMENT à la création
     if created and instance.status == 'PENDING_ANALYST':
-        # Vérifier si un score existe déjà
-        from apps.scoring.models import CreditScore
+        from apps.scoring.jobs import enqueue_scoring
         
-        if not CreditScore.objects.filter(demand=instance).exists():
-            # Calculer le score automatiquement en arrière-plan
-            from apps.scoring.services import calculate_score
-            
-            try:
-                score = calculate_score(instance)
-                print(f"✅ Score calculé automatiquement pour la demande #{instance.id}: {score.score_value}/1000")
-                
-                # IMPORTANT: NE PAS CHANGER LE STATUT AUTOMATIQUEMENT
-                # L'agent doit TOUJOURS décider manuellement
-                # Même si la recommandation IA est AUTO_APPROVE/AUTO_REJECT
-                
-            except Exception as e:
-                print(f"❌ Erreur calcul score pour demande #{instance.id}: {str(e)}")
+        # IMPORTANT: NE PAS CHANGER LE STATUT AUTOMATIQUEMENT
+        # L'agent doit TOUJOURS décider manuellement
+        # Même si la recommandation IA est AUTO_APPROVE/AUTO_REJECT
+        enqueue_scoring(instance)
 
 @receiver(post_save, sender=CreditDemand)
 def auto_notify_demand(sender, instance, created, **kwargs):
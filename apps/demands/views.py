@@ -42,14 +42,14 @@ class CreditDemandViewSet(viewsets.ModelViewSet):
         """
         NOUVEAU WORKFLOW : 
         - Création directe avec statut PENDING_ANALYST
-        - Score calculé automatiquement en arrière-plan via signals
+        - Score mis en file via signals, calculé par run_scoring_worker
         - Plus de statut DRAFT/SUBMIT
         """
         # Sauvegarder avec le statut PENDING_ANALYST par défaut
         demand = serializer.save(client=self.request.user)
         
-        # Le calcul du score se fait automatiquement via le signal post_save
-        # Voir apps/demands/signals.py
+        # Le signal post_save met le calcul du score en file
+        # Voir apps/demands/signals.py et apps/scoring/jobs.py
     
     # SUPPRIMER la méthode submit() - plus nécessaire
     
@@ -4,8 +4,8 @@ from .models import BusinessRule, RuleEvaluation, CreditProduct
 
 @admin.register(BusinessRule)
 class BusinessRuleAdmin(admin.ModelAdmin):
-    list_display = ['name', 'rule_type', 'credit_type', 'is_active', 'priority']
-    list_filter = ['rule_type', 'is_active', 'credit_type']
+    list_display = ['name', 'rule_type', 'credit_type', 'is_active', 'is_blocking', 'priority']
+    list_filter = ['rule_type', 'is_active', 'is_blocking', 'credit_type']
     search_fields = ['name', 'description']
     ordering = ['-priority']
 
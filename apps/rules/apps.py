@@ -4,4 +4,8 @@ from django.apps import AppConfig
 class RulesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.rules'
-    verbose_name = 'Règles Métier'
\ No newline at end of file
+    verbose_name = 'Règles Métier'
+    
+    def ready(self):
+        """Importer les signals au démarrage de l'application"""
+        import apps.rules.signals
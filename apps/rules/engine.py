@@ -1,168 +1,299 @@
 """
 Moteur d'évaluation des règles métier
+
+Les règles actives sont compilées une fois par processus : pour chaque type
+de crédit, la liste ordonnée (priorité décroissante) des règles applicables,
+chacune liée à sa fonction d'évaluation. La compilation est refaite quand le
+compteur de version des règles change en base (incrémenté à chaque
+enregistrement ou suppression d'une BusinessRule, voir signals.py et
+apps/scoring/versions.py) : une règle modifiée dans l'API est prise en compte
+par tous les processus, et évaluer une demande ne lit plus la table
+business_rules.
+
+Deux modes d'évaluation (settings.RULES_EVALUATION_MODE par défaut) :
+    full        toutes les règles applicables sont évaluées
+    fail_fast   arrêt au premier échec d'une règle bloquante (is_blocking) ;
+                à priorité égale, les règles les moins coûteuses passent
+                d'abord (coût mesuré à chaque évaluation, voir RuleCosts)
 """
+import time
 from datetime import datetime
 from decimal import Decimal
+import numpy as np
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction as db_transaction
+from core.instrumentation import StageRecorder
+from apps.scoring.versions import VersionedCache, bump_config_version
+from .expressions import compile_expression
 from .models import BusinessRule, RuleEvaluation, CreditProduct
 
-def evaluate_all_rules(demand):
-    """Évalue toutes les règles actives pour une demande"""
+# Compteur de version des règles (table config_versions, partagée par tous les processus)
+RULES_VERSION_KEY = 'business_rules'
+
+EVALUATION_MODES = ['full', 'fail_fast']
+
+
+class RuleCosts:
+    """
+    Coût mesuré de chaque règle (secondes par demande), propre au processus.
+    
+    Moyenne mobile exponentielle : le coût suit les variations (taille des
+    lots, cache des features, ...) sans garder d'historique. Une règle pas
+    encore mesurée compte pour un coût nul : elle est essayée tôt, puis
+    reclassée.
+    """
     
-    client = demand.client
-    profile = client.client_profile
+    def __init__(self, alpha=0.2):
+        self.alpha = alpha
+        self.costs = {}
+        self.counts = {}
+    
+    def record(self, rule_id, seconds):
+        previous = self.costs.get(rule_id)
+        self.costs[rule_id] = seconds if previous is None else previous + self.alpha * (seconds - previous)
+        self.counts[rule_id] = self.counts.get(rule_id, 0) + 1
+    
+    def cost(self, rule_id):
+        return self.costs.get(rule_id, 0.0)
+    
+    def order(self, entries):
+        """(règle, évaluateur) par priorité décroissante puis coût croissant"""
+        return sorted(entries, key=lambda entry: (-entry[0].priority, self.cost(entry[0].id)))
+    
+    def snapshot(self):
+        return {
+            rule_id: {'cost_ms': round(cost * 1000, 4), 'evaluations': self.counts[rule_id]}
+            for rule_id, cost in self.costs.items()
+        }
+    
+    def reset(self):
+        self.costs.clear()
+        self.counts.clear()
+
+
+# Coûts par chemin d'évaluation : une règle vectorisée ne coûte pas la même
+# chose par demande en lot et seule
+rule_costs = {
+    'single': RuleCosts(),
+    'batch': RuleCosts(),
+}
+
+
+def get_evaluation_mode(mode=None):
+    mode = mode or settings.RULES_EVALUATION_MODE
+    if mode not in EVALUATION_MODES:
+        raise ValueError(f"Mode d'évaluation inconnu : {mode} (attendu : {', '.join(EVALUATION_MODES)})")
+    return mode
+
+
+def is_blocking_failure(rule, passed):
+    return rule.is_blocking and not passed
+
+
+def evaluate_all_rules(demand, mode=None):
+    """Évalue les règles actives pour une demande
     
-    # Récupérer toutes les règles actives
-    rules = BusinessRule.objects.filter(is_active=True).order_by('-priority')
+    mode : 'full' (toutes les règles) ou 'fail_fast' (arrêt au premier
+    échec bloquant), settings.RULES_EVALUATION_MODE par défaut.
     
-    # Filtrer par type de crédit si spécifié
-    applicable_rules = []
-    for rule in rules:
-        if not rule.credit_type or rule.credit_type == demand.credit_type:
-            applicable_rules.append(rule)
+    Les évaluations précédentes de la demande sont remplacées : la table
+    rule_evaluations ne garde que la dernière évaluation de chaque demande.
+    """
     
-    results = []
-    all_passed = True
+    mode = get_evaluation_mode(mode)
+    recorder = StageRecorder('evaluate_all_rules')
+    costs = rule_costs['single']
     
-    for rule in applicable_rules:
-        result = evaluate_single_rule(rule, demand, profile)
+    with recorder.stage('load'):
+        client = demand.client
+        profile = client.client_profile
         
-        # Sauvegarder l'évaluation
-        evaluation = RuleEvaluation.objects.create(
+        # Règles actives applicables à ce type de crédit, déjà compilées
+        applicable_rules = get_compiled_rules().for_credit_type(demand.credit_type)
+        if mode == 'fail_fast':
+            applicable_rules = costs.order(applicable_rules)
+    
+    with recorder.stage('evaluation'):
+        rule_results = []
+        for rule, evaluator in applicable_rules:
+            started = time.perf_counter()
+            result = evaluator(demand, profile)
+            costs.record(rule.id, time.perf_counter() - started)
+            
+            rule_results.append((rule, result))
+            if mode == 'fail_fast' and is_blocking_failure(rule, result['passed']):
+                break
+    
+    skipped = len(applicable_rules) - len(rule_results)
+    
+    # Instances liées à leur règle : le résumé ne relit pas business_rules
+    results = [
+        RuleEvaluation(
             demand=demand,
             rule=rule,
             passed=result['passed'],
             computed_value=result.get('computed_value'),
             message=result['message']
         )
-        
-        results.append(evaluation)
-        
-        if not result['passed']:
-            all_passed = False
+        for rule, result in rule_results
+    ]
+    all_passed = all(evaluation.passed for evaluation in results)
+    
+    with recorder.stage('persistence'):
+        # Une réévaluation remplace la précédente, en une transaction
+        with db_transaction.atomic():
+            RuleEvaluation.objects.filter(demand=demand).delete()
+            RuleEvaluation.objects.bulk_create(results)
+    
+    recorder.finish()
     
     return {
         'all_passed': all_passed,
+        'mode': mode,
         'evaluations': results,
-        'summary': generate_evaluation_summary(results)
+        'summary': generate_evaluation_summary(results, skipped)
     }
 
 
 def evaluate_single_rule(rule, demand, profile):
     """Évalue une règle spécifique"""
-    
-    rule_type = rule.rule_type
-    
-    # Dispatcher vers la fonction appropriée
-    if rule_type == 'AGE_LIMIT':
-        return evaluate_age_rule(rule, profile)
-    elif rule_type == 'INCOME_REQUIREMENT':
-        return evaluate_income_rule(rule, profile)
-    elif rule_type == 'DEBT_RATIO':
-        return evaluate_debt_ratio_rule(rule, profile)
-    elif rule_type == 'AMOUNT_LIMIT':
-        return evaluate_amount_rule(rule, demand)
-    elif rule_type == 'DURATION_LIMIT':
-        return evaluate_duration_rule(rule, demand)
-    elif rule_type == 'SCORING_THRESHOLD':
-        return evaluate_scoring_rule(rule, demand)
-    else:
-        return {
-            'passed': True,
-            'message': f"Règle {rule.name} non implémentée"
-        }
+    return compile_rule(rule)(demand, profile)
+
+
+def age_bounds(rule):
+    condition = rule.condition
+    return condition.get('min_age', 21), condition.get('max_age', 65)
+
+
+def age_message(age, min_age, max_age, passed):
+    return f"Âge: {age:.0f} ans (requis: {min_age}-{max_age} ans)" if passed else f"Âge non conforme: {age:.0f} ans (requis: {min_age}-{max_age} ans)"
 
 
 def evaluate_age_rule(rule, profile):
     """Évalue la règle d'âge"""
     age = (datetime.now().date() - profile.birth_date).days / 365.25
-    condition = rule.condition
-    
-    min_age = condition.get('min_age', 21)
-    max_age = condition.get('max_age', 65)
+    min_age, max_age = age_bounds(rule)
     
     passed = min_age <= age <= max_age
     
     return {
         'passed': passed,
         'computed_value': Decimal(age),
-        'message': f"Âge: {age:.0f} ans (requis: {min_age}-{max_age} ans)" if passed else f"Âge non conforme: {age:.0f} ans (requis: {min_age}-{max_age} ans)"
+        'message': age_message(age, min_age, max_age, passed)
     }
 
 
+def income_bound(rule):
+    return rule.threshold_value or rule.condition.get('min_income', 0)
+
+
+def income_message(income, min_income, passed):
+    return f"Revenu: {income:,.0f} FCFA (requis: ≥ {min_income:,.0f} FCFA)" if passed else f"Revenu insuffisant: {income:,.0f} FCFA (requis: ≥ {min_income:,.0f} FCFA)"
+
+
 def evaluate_income_rule(rule, profile):
     """Évalue la règle de revenu minimum"""
     income = profile.monthly_income
-    min_income = rule.threshold_value or rule.condition.get('min_income', 0)
+    min_income = income_bound(rule)
     
     passed = income >= min_income
     
     return {
         'passed': passed,
         'computed_value': income,
-        'message': f"Revenu: {income:,.0f} FCFA (requis: ≥ {min_income:,.0f} FCFA)" if passed else f"Revenu insuffisant: {income:,.0f} FCFA (requis: ≥ {min_income:,.0f} FCFA)"
+        'message': income_message(income, min_income, passed)
     }
 
 
+def debt_ratio_bound(rule):
+    return float(rule.threshold_value or rule.condition.get('max_ratio', 40))
+
+
+def debt_ratio_message(debt_ratio, max_ratio, passed):
+    return f"Taux d'endettement: {debt_ratio:.1f}% (max: {max_ratio:.1f}%)" if passed else f"Taux d'endettement trop élevé: {debt_ratio:.1f}% (max: {max_ratio:.1f}%)"
+
+
 def evaluate_debt_ratio_rule(rule, profile):
     """Évalue la règle de taux d'endettement"""
     debt_ratio = profile.debt_ratio
-    max_ratio = float(rule.threshold_value or rule.condition.get('max_ratio', 40))
+    max_ratio = debt_ratio_bound(rule)
     
     passed = debt_ratio <= max_ratio
     
     return {
         'passed': passed,
         'computed_value': Decimal(debt_ratio),
-        'message': f"Taux d'endettement: {debt_ratio:.1f}% (max: {max_ratio:.1f}%)" if passed else f"Taux d'endettement trop élevé: {debt_ratio:.1f}% (max: {max_ratio:.1f}%)"
+        'message': debt_ratio_message(debt_ratio, max_ratio, passed)
     }
 
 
+def amount_bounds(rule):
+    condition = rule.condition
+    return Decimal(condition.get('min_amount', 0)), Decimal(condition.get('max_amount', 999999999))
+
+
+def amount_message(amount, min_amount, max_amount, passed):
+    return f"Montant: {amount:,.0f} FCFA (plage: {min_amount:,.0f} - {max_amount:,.0f} FCFA)" if passed else f"Montant non conforme: {amount:,.0f} FCFA (plage: {min_amount:,.0f} - {max_amount:,.0f} FCFA)"
+
+
 def evaluate_amount_rule(rule, demand):
     """Évalue la règle de montant"""
     amount = demand.amount
-    condition = rule.condition
-    
-    min_amount = Decimal(condition.get('min_amount', 0))
-    max_amount = Decimal(condition.get('max_amount', 999999999))
+    min_amount, max_amount = amount_bounds(rule)
     
     passed = min_amount <= amount <= max_amount
     
     return {
         'passed': passed,
         'computed_value': amount,
-        'message': f"Montant: {amount:,.0f} FCFA (plage: {min_amount:,.0f} - {max_amount:,.0f} FCFA)" if passed else f"Montant non conforme: {amount:,.0f} FCFA (plage: {min_amount:,.0f} - {max_amount:,.0f} FCFA)"
+        'message': amount_message(amount, min_amount, max_amount, passed)
     }
 
 
+def duration_bounds(rule):
+    condition = rule.condition
+    return condition.get('min_duration', 0), condition.get('max_duration', 999)
+
+
+def duration_message(duration, min_duration, max_duration, passed):
+    return f"Durée: {duration} mois (plage: {min_duration}-{max_duration} mois)" if passed else f"Durée non conforme: {duration} mois (plage: {min_duration}-{max_duration} mois)"
+
+
 def evaluate_duration_rule(rule, demand):
     """Évalue la règle de durée"""
     duration = demand.duration_months
-    condition = rule.condition
-    
-    min_duration = condition.get('min_duration', 0)
-    max_duration = condition.get('max_duration', 999)
+    min_duration, max_duration = duration_bounds(rule)
     
     passed = min_duration <= duration <= max_duration
     
     return {
         'passed': passed,
         'computed_value': Decimal(duration),
-        'message': f"Durée: {duration} mois (plage: {min_duration}-{max_duration} mois)" if passed else f"Durée non conforme: {duration} mois (plage: {min_duration}-{max_duration} mois)"
+        'message': duration_message(duration, min_duration, max_duration, passed)
     }
 
 
+def score_bound(rule):
+    return int(rule.threshold_value or rule.condition.get('min_score', 400))
+
+
+def score_message(score, min_score, passed):
+    return f"Score: {score}/1000 (requis: ≥ {min_score})" if passed else f"Score insuffisant: {score}/1000 (requis: ≥ {min_score})"
+
+
 def evaluate_scoring_rule(rule, demand):
     """Évalue la règle de score minimum"""
     try:
         score = demand.score.score_value
-        min_score = int(rule.threshold_value or rule.condition.get('min_score', 400))
+        min_score = score_bound(rule)
         
         passed = score >= min_score
         
         return {
             'passed': passed,
             'computed_value': Decimal(score),
-            'message': f"Score: {score}/1000 (requis: ≥ {min_score})" if passed else f"Score insuffisant: {score}/1000 (requis: ≥ {min_score})"
+            'message': score_message(score, min_score, passed)
         }
     except:
         return {
@@ -171,8 +302,369 @@ def evaluate_scoring_rule(rule, demand):
         }
 
 
-def generate_evaluation_summary(evaluations):
-    """Génère un résumé des évaluations"""
+def expression_message(expression, passed):
+    return f"Condition respectée : {expression}" if passed else f"Condition non respectée : {expression}"
+
+
+def demand_features(demands):
+    """Features de scoring des demandes (extraction en masse), par demand_id"""
+    from apps.scoring.services import extract_features_bulk
+    
+    return extract_features_bulk(demands)
+
+
+# Erreurs possibles à l'évaluation d'une expression validée (valeur de feature inattendue)
+EXPRESSION_ERRORS = (TypeError, ValueError, KeyError, ArithmeticError)
+
+
+def expression_error_message(error):
+    return f"Erreur d'évaluation de l'expression : {error}"
+
+
+def evaluate_expression_rule(rule, demand):
+    """Évalue une règle ELIGIBILITY dont la condition est une expression (voir expressions.py)"""
+    source = rule.condition.get('expression')
+    if not source:
+        return evaluate_unknown_rule(rule)
+    
+    try:
+        expression = compile_expression(source)
+    except ValidationError as e:
+        return {
+            'passed': False,
+            'message': f"Expression invalide : {'; '.join(e.messages)}"
+        }
+    
+    # Features extraites une fois par demande, partagées par ses règles à expression
+    if getattr(demand, '_rule_features', None) is None:
+        demand._rule_features = demand_features([demand])[demand.id]
+    try:
+        passed = expression.evaluate(demand._rule_features)
+    except EXPRESSION_ERRORS as e:
+        return {
+            'passed': False,
+            'message': expression_error_message(e)
+        }
+    
+    return {
+        'passed': passed,
+        'message': expression_message(source, passed)
+    }
+
+
+def evaluate_unknown_rule(rule):
+    return {
+        'passed': True,
+        'message': f"Règle {rule.name} non implémentée"
+    }
+
+
+# Type de règle -> (fonction d'évaluation, objet évalué)
+RULE_EVALUATORS = {
+    'AGE_LIMIT': (evaluate_age_rule, 'profile'),
+    'INCOME_REQUIREMENT': (evaluate_income_rule, 'profile'),
+    'DEBT_RATIO': (evaluate_debt_ratio_rule, 'profile'),
+    'AMOUNT_LIMIT': (evaluate_amount_rule, 'demand'),
+    'DURATION_LIMIT': (evaluate_duration_rule, 'demand'),
+    'SCORING_THRESHOLD': (evaluate_scoring_rule, 'demand'),
+    'ELIGIBILITY': (evaluate_expression_rule, 'demand'),
+}
+
+
+def compile_rule(rule):
+    """Fonction evaluate(demand, profile) liée à la règle (aiguillage fait une fois)"""
+    entry = RULE_EVALUATORS.get(rule.rule_type)
+    if entry is None:
+        return lambda demand, profile: evaluate_unknown_rule(rule)
+    
+    evaluate, target = entry
+    if target == 'profile':
+        return lambda demand, profile: evaluate(rule, profile)
+    return lambda demand, profile: evaluate(rule, demand)
+
+
+class CompiledRuleSet:
+    """Règles actives compilées, par type de crédit, dans l'ordre d'évaluation"""
+    
+    def __init__(self, rules, version):
+        self.version = version
+        self.rules = [(rule, compile_rule(rule)) for rule in rules]
+        
+        # Règles sans type de crédit : communes à tous les types
+        self.common = [entry for entry in self.rules if not entry[0].credit_type]
+        self.by_credit_type = {
+            credit_type: [entry for entry in self.rules if not entry[0].credit_type or entry[0].credit_type == credit_type]
+            for credit_type in {rule.credit_type for rule in rules if rule.credit_type}
+        }
+    
+    def for_credit_type(self, credit_type):
+        return self.by_credit_type.get(credit_type, self.common)
+
+
+_compiled_rules = VersionedCache(RULES_VERSION_KEY)
+
+
+def load_compiled_rules():
+    rules = list(BusinessRule.objects.filter(is_active=True).order_by('-priority', 'id'))
+    return CompiledRuleSet(rules, _compiled_rules.version)
+
+
+def bump_rules_version():
+    """Invalide les règles compilées (tous les processus)"""
+    bump_config_version(RULES_VERSION_KEY)
+    _compiled_rules.clear()
+
+
+def get_compiled_rules():
+    """Règles actives compilées, recompilées seulement si leur version a changé"""
+    return _compiled_rules.get('active', load_compiled_rules)
+
+
+# ============================================
+# Évaluation en lot (colonnes NumPy)
+# ============================================
+
+def load_demands_for_rules(demand_ids):
+    """Demandes avec client, profil et score chargés en une requête"""
+    from apps.demands.models import CreditDemand
+    
+    return list(
+        CreditDemand.objects.filter(id__in=demand_ids)
+        .select_related('client__client_profile', 'score')
+        .order_by('id')
+    )
+
+
+class RuleColumns:
+    """Valeurs évaluées par les règles, une ligne par demande du lot"""
+    
+    def __init__(self, demands, profiles, today=None):
+        today = today or datetime.now().date()
+        
+        self.demands = demands
+        self._features = None
+        
+        self.credit_types = np.array([demand.credit_type for demand in demands], dtype=object)
+        
+        self.ages = np.array([(today - profile.birth_date).days / 365.25 for profile in profiles], dtype=np.float64)
+        
+        # Valeurs d'origine (Decimal) pour les messages et computed_value ; float pour les masques
+        self.incomes = [profile.monthly_income for profile in profiles]
+        self.income_values = np.array(self.incomes, dtype=np.float64)
+        self.debt_ratios = [profile.debt_ratio for profile in profiles]
+        self.debt_ratio_values = np.array(self.debt_ratios, dtype=np.float64)
+        self.amounts = [demand.amount for demand in demands]
+        self.amount_values = np.array(self.amounts, dtype=np.float64)
+        self.durations = np.array([demand.duration_months for demand in demands], dtype=np.int64)
+        
+        scores = [getattr(getattr(demand, 'score', None), 'score_value', None) for demand in demands]
+        self.has_score = np.array([score is not None for score in scores], dtype=bool)
+        self.scores = np.array([score or 0 for score in scores], dtype=np.int64)
+    
+    @property
+    def features(self):
+        """Features de scoring du lot, extraites au premier usage (règles à expression)"""
+        if self._features is None:
+            by_demand = demand_features(self.demands)
+            self._features = [by_demand[demand.id] for demand in self.demands]
+        return self._features
+
+
+def evaluate_age_rule_batch(rule, columns, rows):
+    min_age, max_age = age_bounds(rule)
+    ages = columns.ages[rows]
+    passed = (ages >= min_age) & (ages <= max_age)
+    return [
+        (bool(ok), Decimal(float(age)), age_message(age, min_age, max_age, ok))
+        for age, ok in zip(ages, passed)
+    ]
+
+
+def evaluate_income_rule_batch(rule, columns, rows):
+    min_income = income_bound(rule)
+    passed = columns.income_values[rows] >= float(min_income)
+    return [
+        (bool(ok), columns.incomes[i], income_message(columns.incomes[i], min_income, ok))
+        for i, ok in zip(rows, passed)
+    ]
+
+
+def evaluate_debt_ratio_rule_batch(rule, columns, rows):
+    max_ratio = debt_ratio_bound(rule)
+    passed = columns.debt_ratio_values[rows] <= max_ratio
+    return [
+        (bool(ok), Decimal(columns.debt_ratios[i]), debt_ratio_message(columns.debt_ratios[i], max_ratio, ok))
+        for i, ok in zip(rows, passed)
+    ]
+
+
+def evaluate_amount_rule_batch(rule, columns, rows):
+    min_amount, max_amount = amount_bounds(rule)
+    amounts = columns.amount_values[rows]
+    passed = (amounts >= float(min_amount)) & (amounts <= float(max_amount))
+    return [
+        (bool(ok), columns.amounts[i], amount_message(columns.amounts[i], min_amount, max_amount, ok))
+        for i, ok in zip(rows, passed)
+    ]
+
+
+def evaluate_duration_rule_batch(rule, columns, rows):
+    min_duration, max_duration = duration_bounds(rule)
+    durations = columns.durations[rows]
+    passed = (durations >= min_duration) & (durations <= max_duration)
+    return [
+        (bool(ok), Decimal(int(duration)), duration_message(int(duration), min_duration, max_duration, ok))
+        for duration, ok in zip(durations, passed)
+    ]
+
+
+def evaluate_scoring_rule_batch(rule, columns, rows):
+    min_score = score_bound(rule)
+    scores = columns.scores[rows]
+    has_score = columns.has_score[rows]
+    passed = has_score & (scores >= min_score)
+    return [
+        (bool(ok), Decimal(int(score)), score_message(int(score), min_score, ok))
+        if scored else (False, None, "Score non calculé")
+        for score, scored, ok in zip(scores, has_score, passed)
+    ]
+
+
+def evaluate_expression_rule_batch(rule, columns, rows):
+    source = rule.condition.get('expression')
+    if not source:
+        result = evaluate_unknown_rule(rule)
+        return [(result['passed'], None, result['message'])] * len(rows)
+    
+    try:
+        expression = compile_expression(source)
+    except ValidationError as e:
+        return [(False, None, f"Expression invalide : {'; '.join(e.messages)}")] * len(rows)
+    
+    features = columns.features
+    try:
+        passed = expression.evaluate_batch([features[i] for i in rows])
+    except EXPRESSION_ERRORS as e:
+        return [(False, None, expression_error_message(e))] * len(rows)
+    return [(bool(ok), None, expression_message(source, ok)) for ok in passed]
+
+
+RULE_BATCH_EVALUATORS = {
+    'AGE_LIMIT': evaluate_age_rule_batch,
+    'INCOME_REQUIREMENT': evaluate_income_rule_batch,
+    'DEBT_RATIO': evaluate_debt_ratio_rule_batch,
+    'AMOUNT_LIMIT': evaluate_amount_rule_batch,
+    'DURATION_LIMIT': evaluate_duration_rule_batch,
+    'SCORING_THRESHOLD': evaluate_scoring_rule_batch,
+    'ELIGIBILITY': evaluate_expression_rule_batch,
+}
+
+
+def evaluate_rules_batch(demands, mode=None):
+    """
+    Évalue les règles actives pour un lot de demandes, règle par règle.
+    
+    demands : chargées avec load_demands_for_rules (profil et score déjà
+    joints). Chaque règle est évaluée en une fois sur toutes les demandes
+    de son type de crédit (masques NumPy, expressions vectorisées pour les
+    règles ELIGIBILITY) ; les évaluations précédentes du
+    lot sont remplacées par un seul bulk_create.
+    
+    En mode fail_fast, une demande ayant échoué à une règle bloquante
+    n'est plus évaluée par les règles suivantes (ordre d'après les coûts
+    mesurés en lot, rule_costs['batch']).
+    
+    Retourne (résultats par demand_id, erreurs par demand_id) ; les
+    résultats ont la même forme que ceux d'evaluate_all_rules.
+    """
+    mode = get_evaluation_mode(mode)
+    recorder = StageRecorder('evaluate_rules_batch')
+    costs = rule_costs['batch']
+    errors = {}
+    
+    with recorder.stage('load'):
+        rule_set = get_compiled_rules()
+        rules = costs.order(rule_set.rules) if mode == 'fail_fast' else rule_set.rules
+        
+        evaluated = []
+        profiles = []
+        for demand in demands:
+            profile = getattr(demand.client, 'client_profile', None)
+            if profile is None:
+                errors[demand.id] = 'Profil client incomplet'
+                continue
+            evaluated.append(demand)
+            profiles.append(profile)
+        
+        columns = RuleColumns(evaluated, profiles)
+    
+    evaluations = {demand.id: [] for demand in evaluated}
+    skipped = {demand.id: 0 for demand in evaluated}
+    
+    # Demandes encore en lice (fail_fast : arrêtées au premier échec bloquant)
+    pending = np.ones(len(evaluated), dtype=bool)
+    
+    with recorder.stage('evaluation'):
+        for rule, evaluator in rules:
+            if rule.credit_type:
+                applicable = columns.credit_types == rule.credit_type
+            else:
+                applicable = np.ones(len(evaluated), dtype=bool)
+            
+            for i in np.flatnonzero(applicable & ~pending):
+                skipped[evaluated[i].id] += 1
+            
+            rows = np.flatnonzero(applicable & pending)
+            if not len(rows):
+                continue
+            
+            started = time.perf_counter()
+            batch_evaluator = RULE_BATCH_EVALUATORS.get(rule.rule_type)
+            if batch_evaluator is not None:
+                outcomes = batch_evaluator(rule, columns, rows)
+            else:
+                outcomes = []
+                for i in rows:
+                    result = evaluator(evaluated[i], profiles[i])
+                    outcomes.append((result['passed'], result.get('computed_value'), result['message']))
+            costs.record(rule.id, (time.perf_counter() - started) / len(rows))
+            
+            for i, (passed, computed_value, message) in zip(rows, outcomes):
+                demand = evaluated[i]
+                if mode == 'fail_fast' and is_blocking_failure(rule, passed):
+                    pending[i] = False
+                evaluations[demand.id].append(RuleEvaluation(
+                    demand=demand,
+                    rule=rule,
+                    passed=passed,
+                    computed_value=computed_value,
+                    message=message
+                ))
+    
+    with recorder.stage('persistence'):
+        with db_transaction.atomic():
+            RuleEvaluation.objects.filter(demand__in=evaluated).delete()
+            RuleEvaluation.objects.bulk_create(
+                [evaluation for rows in evaluations.values() for evaluation in rows],
+                batch_size=1000,
+            )
+    
+    recorder.finish()
+    
+    results = {
+        demand_id: {
+            'all_passed': all(evaluation.passed for evaluation in rows),
+            'mode': mode,
+            'evaluations': rows,
+            'summary': generate_evaluation_summary(rows, skipped[demand_id]),
+        }
+        for demand_id, rows in evaluations.items()
+    }
+    return results, errors
+
+
+def generate_evaluation_summary(evaluations, skipped=0):
+    """Génère un résumé des évaluations (skipped : règles non évaluées en mode fail_fast)"""
     total = len(evaluations)
     passed = sum(1 for e in evaluations if e.passed)
     failed = total - passed
@@ -183,6 +675,7 @@ def generate_evaluation_summary(evaluations):
         'total_rules': total,
         'passed': passed,
         'failed': failed,
+        'skipped': skipped,
         'failed_rules': [
             {
                 'name': e.rule.name,
@@ -0,0 +1,377 @@
+"""
+Expressions de règles métier (conditions ELIGIBILITY)
+
+Une règle ELIGIBILITY porte une condition sur les features extraites pour
+le scoring, écrite comme une expression Python restreinte :
+
+    {"expression": "payment_capacity < 40 and late_payments <= 2"}
+    {"expression": "employment_status in ['EMPLOYEE', 'CIVIL_SERVANT'] or monthly_income >= 300000"}
+
+Syntaxe acceptée : noms de features, nombres, chaînes, booléens, listes de
+constantes (pour in / not in), + - * / %, comparaisons (chaînées comprises),
+and / or / not, parenthèses. Tout le reste (appels, attributs, indices,
+lambda, puissance, ...) est refusé à la validation, faite à
+l'enregistrement de la règle. Les types sont vérifiés à ce moment : calculs
+et comparaisons d'ordre sur des nombres seulement, and / or / not sur des
+booléens ; taille des constantes, des listes et imbrication plafonnées.
+
+L'expression est analysée et compilée en bytecode une seule fois par
+processus (cache), en deux versions : scalaire (un dictionnaire de
+features) et vectorisée (colonnes NumPy d'un lot de demandes, and/or/not
+remplacés par des opérations élément par élément).
+
+Une division (ou un modulo) par zéro rend toute l'expression fausse, quels
+que soient les opérateurs autour (!=, not compris) : une règle sur un ratio
+n'est jamais satisfaite par un client sans historique. Seules comptent les
+divisions effectivement évaluées, comme en Python : avec
+"total_payments == 0 or late_payments / total_payments < 0.3", un client
+sans paiement satisfait la règle. La version scalaire s'arrête sur la
+division ; la version vectorisée porte, ligne par ligne, une valeur
+indéfinie (NaN) à travers comparaisons et and / or / not.
+"""
+import ast
+import operator
+from functools import lru_cache
+
+import numpy as np
+from django.core.exceptions import ValidationError
+
+MAX_EXPRESSION_LENGTH = 500
+MAX_DEPTH = 30
+MAX_NUMBER = 1e15
+MAX_STRING_LENGTH = 100
+MAX_LIST_LENGTH = 50
+
+ALLOWED_BINARY_OPERATORS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Mod)
+ORDERING_COMPARISONS = (ast.Lt, ast.LtE, ast.Gt, ast.GtE)
+ALLOWED_COMPARISONS = ORDERING_COMPARISONS + (ast.Eq, ast.NotEq, ast.In, ast.NotIn)
+
+# Types des valeurs d'une expression ; None : type inconnu (nom non déclaré)
+NUMBER = 'number'
+STRING = 'string'
+BOOLEAN = 'bool'
+
+
+def _constant_type(value):
+    if isinstance(value, bool):
+        return BOOLEAN
+    if isinstance(value, (int, float)):
+        if abs(value) > MAX_NUMBER:
+            raise ValidationError(f"Nombre trop grand : {value!r} (maximum {MAX_NUMBER:.0e})")
+        return NUMBER
+    if isinstance(value, str):
+        if len(value) > MAX_STRING_LENGTH:
+            raise ValidationError(f"Chaîne trop longue (maximum {MAX_STRING_LENGTH} caractères)")
+        return STRING
+    raise ValidationError(f"Constante non autorisée : {value!r}")
+
+
+def _expect(actual, expected, context):
+    if actual is not None and actual != expected:
+        raise ValidationError(f"{context} : {expected} attendu, {actual} obtenu")
+
+
+def _check_node(node, known_names, depth=0):
+    """
+    Refuse tout nœud hors de la syntaxe autorisée et retourne le type de sa valeur.
+
+    Arithmétique et comparaisons d'ordre sur des nombres seulement, and / or /
+    not sur des booléens, == / != et in entre valeurs de même type.
+    known_names : {nom: type} des features (None : noms et types non vérifiés).
+    """
+    if depth > MAX_DEPTH:
+        raise ValidationError(f"Expression trop imbriquée (maximum {MAX_DEPTH} niveaux)")
+    depth += 1
+
+    if isinstance(node, ast.Expression):
+        return _check_node(node.body, known_names, depth)
+
+    if isinstance(node, ast.BoolOp):
+        for value in node.values:
+            _expect(_check_node(value, known_names, depth), BOOLEAN, 'and / or')
+        return BOOLEAN
+
+    if isinstance(node, ast.UnaryOp):
+        operand = _check_node(node.operand, known_names, depth)
+        if isinstance(node.op, ast.Not):
+            _expect(operand, BOOLEAN, 'not')
+            return BOOLEAN
+        if isinstance(node.op, (ast.USub, ast.UAdd)):
+            _expect(operand, NUMBER, 'Signe')
+            return NUMBER
+        raise ValidationError(f"Opérateur non autorisé : {type(node.op).__name__}")
+
+    if isinstance(node, ast.BinOp):
+        if not isinstance(node.op, ALLOWED_BINARY_OPERATORS):
+            raise ValidationError(f"Opérateur non autorisé : {type(node.op).__name__}")
+        _expect(_check_node(node.left, known_names, depth), NUMBER, 'Opération arithmétique')
+        _expect(_check_node(node.right, known_names, depth), NUMBER, 'Opération arithmétique')
+        return NUMBER
+
+    if isinstance(node, ast.Compare):
+        left = _check_node(node.left, known_names, depth)
+        for op, comparator in zip(node.ops, node.comparators):
+            if not isinstance(op, ALLOWED_COMPARISONS):
+                raise ValidationError(f"Comparaison non autorisée : {type(op).__name__}")
+
+            if isinstance(op, (ast.In, ast.NotIn)):
+                if not isinstance(comparator, (ast.List, ast.Tuple)):
+                    raise ValidationError("'in' / 'not in' attendent une liste de constantes")
+                right = _check_list(comparator, depth)
+            else:
+                right = _check_node(comparator, known_names, depth)
+
+            if isinstance(op, ORDERING_COMPARISONS):
+                _expect(left, NUMBER, 'Comparaison')
+                _expect(right, NUMBER, 'Comparaison')
+            elif left is not None and right is not None and left != right:
+                raise ValidationError(f"Comparaison entre types différents : {left} et {right}")
+
+            left = right if not isinstance(op, (ast.In, ast.NotIn)) else left
+        return BOOLEAN
+
+    if isinstance(node, (ast.List, ast.Tuple)):
+        raise ValidationError("Une liste n'est autorisée qu'après 'in' / 'not in'")
+
+    if isinstance(node, ast.Name):
+        if known_names is None:
+            return None
+        if node.id not in known_names:
+            raise ValidationError(f"Feature inconnue : {node.id}")
+        return known_names[node.id]
+
+    if isinstance(node, ast.Constant):
+        return _constant_type(node.value)
+
+    raise ValidationError(f"Syntaxe non autorisée : {type(node).__name__}")
+
+
+def _check_list(node, depth):
+    """Liste de constantes de même type (membre droit de in / not in) ; retourne ce type"""
+    if len(node.elts) > MAX_LIST_LENGTH:
+        raise ValidationError(f"Liste trop longue (maximum {MAX_LIST_LENGTH} éléments)")
+
+    types = set()
+    for element in node.elts:
+        if not isinstance(element, ast.Constant):
+            raise ValidationError("Les listes ne peuvent contenir que des constantes")
+        types.add(_constant_type(element.value))
+    if len(types) > 1:
+        raise ValidationError("Les éléments d'une liste doivent être de même type")
+    return types.pop() if types else None
+
+
+def parse_expression(source, known_names=None):
+    """Analyse et valide une expression ; lève ValidationError si elle est refusée
+
+    known_names : {nom: type} des features, pour vérifier noms et types.
+    """
+    if not isinstance(source, str) or not source.strip():
+        raise ValidationError("L'expression doit être une chaîne non vide")
+    if len(source) > MAX_EXPRESSION_LENGTH:
+        raise ValidationError(f"Expression trop longue (maximum {MAX_EXPRESSION_LENGTH} caractères)")
+
+    try:
+        tree = ast.parse(source.strip(), mode='eval')
+    except SyntaxError as e:
+        raise ValidationError(f"Expression invalide : {e.msg}")
+    except (ValueError, RecursionError, MemoryError):
+        raise ValidationError("Expression invalide")
+
+    result = _check_node(tree, known_names)
+    if known_names is not None:
+        _expect(result, BOOLEAN, "Résultat de l'expression")
+    return tree
+
+
+def expression_names(tree):
+    """Features utilisées par l'expression"""
+    return sorted({node.id for node in ast.walk(tree) if isinstance(node, ast.Name)})
+
+
+def validate_expression(source):
+    """Validation à l'enregistrement : syntaxe, noms et types des features"""
+    from apps.scoring.services import feature_types
+
+    parse_expression(source, feature_types())
+
+
+# ============================================
+# Compilation
+# ============================================
+
+class UndefinedValue(ArithmeticError):
+    """Division par zéro évaluée : l'expression est fausse"""
+
+
+def _div(a, b):
+    """Division ; scalaire : UndefinedValue si le diviseur est nul ; vectorisée : NaN sur ces lignes"""
+    if isinstance(a, np.ndarray) or isinstance(b, np.ndarray):
+        a = np.asarray(a, dtype=np.float64)
+        b = np.asarray(b, dtype=np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(b != 0, a / np.where(b != 0, b, 1), np.nan)
+    if b == 0:
+        raise UndefinedValue("division par zéro")
+    return a / b
+
+
+def _mod(a, b):
+    if isinstance(a, np.ndarray) or isinstance(b, np.ndarray):
+        a = np.asarray(a, dtype=np.float64)
+        b = np.asarray(b, dtype=np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(b != 0, np.mod(a, np.where(b != 0, b, 1)), np.nan)
+    if b == 0:
+        raise UndefinedValue("modulo par zéro")
+    return a % b
+
+
+# Version vectorisée : un booléen est un tableau de flottants, 1.0 (vrai),
+# 0.0 (faux) ou NaN (indéfini, une division par zéro a été évaluée)
+
+def _undefined(value):
+    value = np.asarray(value)
+    if value.dtype.kind == 'f':
+        return np.isnan(value)
+    return np.zeros(value.shape, dtype=bool)
+
+
+def _truth(value):
+    return np.asarray(value, dtype=np.float64)
+
+
+def _and(*values):
+    """a and b : indéfini si a l'est, faux si a est faux, b sinon (b n'est pris en compte que si a est vrai)"""
+    result = _truth(values[-1])
+    for value in reversed(values[:-1]):
+        value = _truth(value)
+        result = np.where(value == 1.0, result, value)
+    return result
+
+
+def _or(*values):
+    """a or b : indéfini si a l'est, vrai si a est vrai, b sinon"""
+    result = _truth(values[-1])
+    for value in reversed(values[:-1]):
+        value = _truth(value)
+        result = np.where(value == 0.0, result, value)
+    return result
+
+
+def _not(value):
+    return 1.0 - _truth(value)
+
+
+def _comparison(compare):
+    def vectorized(a, b):
+        with np.errstate(invalid='ignore'):
+            result = compare(np.asarray(a), np.asarray(b)).astype(np.float64)
+        return np.where(_undefined(a) | _undefined(b), np.nan, result)
+    return vectorized
+
+
+def _in(value, choices):
+    return np.where(_undefined(value), np.nan, np.isin(value, list(choices)).astype(np.float64))
+
+
+def _not_in(value, choices):
+    return _not(_in(value, choices))
+
+
+COMPARISON_HELPERS = {
+    ast.Lt: '_lt', ast.LtE: '_le', ast.Gt: '_gt', ast.GtE: '_ge', ast.Eq: '_eq', ast.NotEq: '_ne',
+}
+
+
+class _SafeDivision(ast.NodeTransformer):
+    """a / b et a % b -> _div(a, b) et _mod(a, b)"""
+
+    def visit_BinOp(self, node):
+        self.generic_visit(node)
+        if isinstance(node.op, (ast.Div, ast.Mod)):
+            helper = '_div' if isinstance(node.op, ast.Div) else '_mod'
+            return ast.Call(func=ast.Name(id=helper, ctx=ast.Load()), args=[node.left, node.right], keywords=[])
+        return node
+
+
+class _Vectorize(_SafeDivision):
+    """and / or / not / in et comparaisons chaînées -> opérations élément par élément"""
+
+    def _call(self, name, args):
+        return ast.Call(func=ast.Name(id=name, ctx=ast.Load()), args=args, keywords=[])
+
+    def visit_BoolOp(self, node):
+        self.generic_visit(node)
+        return self._call('_and' if isinstance(node.op, ast.And) else '_or', node.values)
+
+    def visit_UnaryOp(self, node):
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Not):
+            return self._call('_not', [node.operand])
+        return node
+
+    def visit_Compare(self, node):
+        self.generic_visit(node)
+        parts = []
+        left = node.left
+        for op, right in zip(node.ops, node.comparators):
+            if isinstance(op, ast.In):
+                parts.append(self._call('_in', [left, right]))
+            elif isinstance(op, ast.NotIn):
+                parts.append(self._call('_not_in', [left, right]))
+            else:
+                parts.append(self._call(COMPARISON_HELPERS[type(op)], [left, right]))
+            left = right
+        return parts[0] if len(parts) == 1 else self._call('_and', parts)
+
+
+HELPERS = {
+    '_div': _div, '_mod': _mod,
+    '_and': _and, '_or': _or, '_not': _not, '_in': _in, '_not_in': _not_in,
+    '_lt': _comparison(operator.lt), '_le': _comparison(operator.le),
+    '_gt': _comparison(operator.gt), '_ge': _comparison(operator.ge),
+    '_eq': _comparison(operator.eq), '_ne': _comparison(operator.ne),
+}
+
+
+class CompiledExpression:
+    """Expression compilée : evaluate(features) et evaluate_batch(features_list)"""
+
+    def __init__(self, source):
+        self.source = source
+        tree = parse_expression(source)
+        self.names = expression_names(tree)
+
+        scalar = ast.fix_missing_locations(_SafeDivision().visit(parse_expression(source)))
+        vector = ast.fix_missing_locations(_Vectorize().visit(parse_expression(source)))
+        self._scalar_code = compile(scalar, '<règle>', 'eval')
+        self._vector_code = compile(vector, '<règle>', 'eval')
+
+    def evaluate(self, features):
+        """Résultat (bool) pour un dictionnaire de features ; faux si une division par zéro est évaluée"""
+        namespace = {**HELPERS, **{name: features[name] for name in self.names}}
+        try:
+            return bool(eval(self._scalar_code, {'__builtins__': {}}, namespace))
+        except UndefinedValue:
+            return False
+
+    def evaluate_batch(self, features_list):
+        """Résultats (tableau de bool) pour N dictionnaires de features, en une passe"""
+        namespace = dict(HELPERS)
+        for name in self.names:
+            namespace[name] = np.array([features[name] for features in features_list])
+        result = eval(self._vector_code, {'__builtins__': {}}, namespace)
+        # Indéfini (NaN) : faux
+        return np.broadcast_to(_truth(result) == 1.0, (len(features_list),))
+
+
+@lru_cache(maxsize=1024)
+def compile_expression(source):
+    """Expression validée (noms et types des features) puis compilée, mise en cache par texte source
+
+    Une règle enregistrée avant une évolution des contrôles est ainsi
+    revérifiée avant sa première évaluation.
+    """
+    validate_expression(source)
+    return CompiledExpression(source)
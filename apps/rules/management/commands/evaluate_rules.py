@@ -0,0 +1,84 @@
+"""
+Évaluation des règles métier par lots
+Usage: python manage.py evaluate_rules [--all] [--demand-id 42] [--batch-size 1000] [--mode fail_fast]
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from apps.demands.models import CreditDemand
+from apps.rules.engine import EVALUATION_MODES, evaluate_rules_batch, load_demands_for_rules
+
+
+class Command(BaseCommand):
+    help = 'Réévalue les règles métier des demandes en attente (PENDING_ANALYST), par lots'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Évaluer toutes les demandes, quel que soit leur statut',
+        )
+        
+        parser.add_argument(
+            '--demand-id',
+            type=int,
+            help='Évaluer une demande spécifique',
+        )
+        
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Nombre de demandes évaluées par lot (défaut: 1000)',
+        )
+        
+        parser.add_argument(
+            '--mode',
+            choices=EVALUATION_MODES,
+            default=None,
+            help='full (toutes les règles) ou fail_fast (arrêt au premier échec bloquant) '
+                 '(défaut: settings.RULES_EVALUATION_MODE)',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('=== ÉVALUATION DES RÈGLES MÉTIER ===\n'))
+        
+        demands = CreditDemand.objects.all()
+        if options['demand_id']:
+            demands = demands.filter(id=options['demand_id'])
+        elif not options['all']:
+            demands = demands.filter(status='PENDING_ANALYST')
+        
+        demand_ids = list(demands.order_by('id').values_list('id', flat=True))
+        total = len(demand_ids)
+        batch_size = max(1, options['batch_size'])
+        
+        if not total:
+            self.stdout.write(self.style.WARNING('⚠️  Aucune demande à évaluer'))
+            return
+        
+        self.stdout.write(f'📊 {total} demandes à évaluer\n')
+        
+        evaluated = 0
+        passed = 0
+        errors = 0
+        started = time.perf_counter()
+        
+        for start in range(0, total, batch_size):
+            results, batch_errors = evaluate_rules_batch(
+                load_demands_for_rules(demand_ids[start:start + batch_size]),
+                mode=options['mode'],
+            )
+            evaluated += len(results)
+            passed += sum(1 for result in results.values() if result['all_passed'])
+            errors += len(batch_errors)
+            
+            done = min(start + batch_size, total)
+            self.stdout.write(f'  ✓ [{done}/{total}] {done / total * 100:.1f}%')
+        
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'\n✅ Terminé: {evaluated} demandes évaluées ({passed} conformes à toutes les règles), '
+            f'{errors} erreurs en {elapsed:.1f}s'
+        ))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rules', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='businessrule',
+            name='is_blocking',
+            field=models.BooleanField(default=True, help_text="Un échec arrête l'évaluation en mode fail_fast (sinon règle informative)"),
+        ),
+    ]
@@ -1,3 +1,4 @@
+from django.core.exceptions import ValidationError
 from django.db import models
 
 class BusinessRule(models.Model):
@@ -24,6 +25,10 @@ class BusinessRule(models.Model):
     # Paramètres
     is_active = models.BooleanField(default=True)
     priority = models.IntegerField(default=0, help_text="Ordre d'évaluation (plus élevé = prioritaire)")
+    is_blocking = models.BooleanField(
+        default=True,
+        help_text="Un échec arrête l'évaluation en mode fail_fast (sinon règle informative)"
+    )
     
     # Metadata
     description = models.TextField(blank=True)
@@ -39,6 +44,27 @@ class BusinessRule(models.Model):
     
     def __str__(self):
         return f"{self.name} ({self.get_rule_type_display()})"
+    
+    def clean(self):
+        """Validation : l'expression d'une règle ELIGIBILITY doit être acceptée (voir expressions.py)"""
+        super().clean()
+        self.validate_condition()
+    
+    def validate_condition(self):
+        from .expressions import validate_expression
+        
+        if not isinstance(self.condition, dict):
+            raise ValidationError({'condition': 'La condition doit être un objet JSON'})
+        if 'expression' in self.condition:
+            try:
+                validate_expression(self.condition['expression'])
+            except ValidationError as e:
+                raise ValidationError({'condition': e.messages})
+    
+    def save(self, *args, **kwargs):
+        # Expression analysée et validée à l'enregistrement
+        self.validate_condition()
+        super().save(*args, **kwargs)
 
 
 class RuleEvaluation(models.Model):
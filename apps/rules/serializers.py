@@ -1,5 +1,7 @@
 # serializers.py
+from django.conf import settings
 from rest_framework import serializers
+from .engine import EVALUATION_MODES
 from .models import BusinessRule, RuleEvaluation, CreditProduct
 
 class BusinessRuleSerializer(serializers.ModelSerializer):
@@ -9,6 +11,19 @@ class BusinessRuleSerializer(serializers.ModelSerializer):
         model = BusinessRule
         fields = '__all__'
         read_only_fields = ['created_at', 'updated_at', 'created_by']
+    
+    def validate_condition(self, value):
+        from django.core.exceptions import ValidationError
+        from .expressions import validate_expression
+        
+        if not isinstance(value, dict):
+            raise serializers.ValidationError('La condition doit être un objet JSON')
+        if 'expression' in value:
+            try:
+                validate_expression(value['expression'])
+            except ValidationError as e:
+                raise serializers.ValidationError(e.messages)
+        return value
 
 class RuleEvaluationSerializer(serializers.ModelSerializer):
     rule_name = serializers.CharField(source='rule.name', read_only=True)
@@ -18,6 +33,17 @@ class RuleEvaluationSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ['evaluated_at']
 
+class EvaluateBatchSerializer(serializers.Serializer):
+    """Évaluation des règles pour un lot de demandes (au plus RULES_BATCH_MAX_DEMANDS)"""
+    demand_ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False)
+    mode = serializers.ChoiceField(choices=EVALUATION_MODES, required=False)
+    
+    def validate_demand_ids(self, value):
+        max_demands = settings.RULES_BATCH_MAX_DEMANDS
+        if len(value) > max_demands:
+            raise serializers.ValidationError(f"Trop de demandes ({len(value)}, maximum {max_demands})")
+        return list(dict.fromkeys(value))
+
 class CreditProductSerializer(serializers.ModelSerializer):
     credit_type_display = serializers.CharField(source='get_credit_type_display', read_only=True)
     
@@ -0,0 +1,13 @@
+"""
+Signals Django des règles métier - invalidation des règles compilées
+"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .engine import bump_rules_version
+from .models import BusinessRule
+
+@receiver(post_save, sender=BusinessRule)
+@receiver(post_delete, sender=BusinessRule)
+def reload_business_rules(sender, instance, **kwargs):
+    """Règle ajoutée, modifiée ou supprimée : recompilation au prochain usage"""
+    bump_rules_version()
@@ -1,3 +1,215 @@
-from django.test import TestCase
+from datetime import date
+from decimal import Decimal
+from types import SimpleNamespace
 
-# Create your tests here.
+from django.core.exceptions import ValidationError
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from apps.accounts.models import ClientProfile, User
+from apps.demands.models import CreditDemand
+from apps.scoring.versions import bump_config_version
+from . import engine
+from .expressions import compile_expression, validate_expression
+from .models import BusinessRule
+
+
+@override_settings(CONFIG_VERSION_CHECK_INTERVAL=0)
+class CompiledRulesCacheTests(TestCase):
+    """Règles compilées par processus, recompilées quand leur version change en base"""
+
+    def setUp(self):
+        engine._compiled_rules.clear()
+
+    def test_rule_added_by_another_process_is_seen(self):
+        self.assertEqual(engine.get_compiled_rules().rules, [])
+
+        # Écritures d'un autre processus : pas de signal dans celui-ci
+        BusinessRule.objects.bulk_create([
+            BusinessRule(name='Durée', rule_type='DURATION_LIMIT', condition={'max_duration': 60}),
+        ])
+        self.assertEqual(engine.get_compiled_rules().rules, [])
+
+        bump_config_version(engine.RULES_VERSION_KEY)
+        self.assertEqual([rule.name for rule, _ in engine.get_compiled_rules().rules], ['Durée'])
+
+    def test_saving_a_rule_recompiles(self):
+        engine.get_compiled_rules()
+        BusinessRule.objects.create(name='Âge', rule_type='AGE_LIMIT', condition={'min_age': 21, 'max_age': 65})
+
+        self.assertEqual([rule.name for rule, _ in engine.get_compiled_rules().rules], ['Âge'])
+
+
+class ExpressionValidationTests(SimpleTestCase):
+    """Expressions de règles : syntaxe, types et tailles vérifiés à l'enregistrement"""
+
+    def assertRejected(self, source):
+        with self.assertRaises(ValidationError, msg=source):
+            validate_expression(source)
+
+    def test_valid_expressions(self):
+        for source in [
+            "payment_capacity < 40 and late_payments <= 2",
+            "employment_status in ['EMPLOYEE', 'CIVIL_SERVANT'] or monthly_income >= 300000",
+            "not (25 <= age < 60) or requested_amount / monthly_income < 50",
+        ]:
+            validate_expression(source)
+
+    def test_unsafe_syntax_is_rejected(self):
+        for source in ["__import__('os')", "age.real > 1", "age[0] > 1", "(lambda: 1)()", "age ** 2 > 1"]:
+            self.assertRejected(source)
+
+    def test_oversized_values_are_rejected(self):
+        for source in [
+            "'a' * 1000000000 == sector",
+            "sector == '" + 'x' * 200 + "'",
+            "monthly_income > 1e300",
+            "sector in [" + ', '.join(f"'s{i}'" for i in range(60)) + "]",
+        ]:
+            self.assertRejected(source)
+
+    def test_type_mismatches_are_rejected(self):
+        for source in [
+            "employment_status < 3",
+            "age > 'trente'",
+            "monthly_income + sector > 1",
+            "monthly_income and age",
+            "credit_type in [1, 2]",
+            "age + 1",
+        ]:
+            self.assertRejected(source)
+
+
+class CompiledExpressionTests(SimpleTestCase):
+    """Versions scalaire et vectorisée d'une expression : mêmes résultats"""
+
+    FEATURES = [
+        {'monthly_income': 300000.0, 'late_payments': 0, 'total_payments': 10, 'employment_status': 'EMPLOYEE'},
+        {'monthly_income': 60000.0, 'late_payments': 3, 'total_payments': 3, 'employment_status': 'SELF_EMPLOYED'},
+        {'monthly_income': 0.0, 'late_payments': 0, 'total_payments': 0, 'employment_status': 'CIVIL_SERVANT'},
+    ]
+
+    def test_scalar_and_batch_agree(self):
+        for source in [
+            "monthly_income >= 100000 and late_payments <= 2",
+            "employment_status not in ['SELF_EMPLOYED'] or not (late_payments > 1)",
+            "0 < late_payments / total_payments <= 0.5",
+            "total_payments % 3 == 1 or 50000 < monthly_income < 100000",
+        ]:
+            expression = compile_expression(source)
+            scalar = [expression.evaluate(features) for features in self.FEATURES]
+            self.assertEqual(list(expression.evaluate_batch(self.FEATURES)), scalar, source)
+
+    def test_division_by_zero_is_false(self):
+        # FEATURES[2] : aucun paiement
+        for source in [
+            "late_payments / total_payments < 1",
+            "late_payments / total_payments != 1",
+            "not (late_payments / total_payments > 1)",
+            "not (late_payments % total_payments == 1) and monthly_income >= 0",
+            "late_payments / total_payments > 1 or monthly_income >= 0",
+            "employment_status not in ['X'] and -(late_payments / total_payments) <= 0",
+        ]:
+            expression = compile_expression(source)
+
+            self.assertFalse(expression.evaluate(self.FEATURES[2]), source)
+            self.assertEqual(
+                list(expression.evaluate_batch(self.FEATURES)),
+                [expression.evaluate(features) for features in self.FEATURES],
+                source,
+            )
+
+    def test_division_not_evaluated_does_not_count(self):
+        for source in [
+            "total_payments == 0 or late_payments / total_payments < 0.5",
+            "not (total_payments > 0 and late_payments / total_payments >= 0.5)",
+        ]:
+            expression = compile_expression(source)
+
+            self.assertTrue(expression.evaluate(self.FEATURES[2]), source)
+            self.assertEqual(
+                list(expression.evaluate_batch(self.FEATURES)),
+                [expression.evaluate(features) for features in self.FEATURES],
+                source,
+            )
+
+
+class RuleCostsTests(SimpleTestCase):
+    """Ordre fail_fast : priorité décroissante, puis coût mesuré croissant"""
+
+    def test_order(self):
+        costs = engine.RuleCosts(alpha=0.5)
+        rules = [
+            (SimpleNamespace(id=1, priority=0), None),
+            (SimpleNamespace(id=2, priority=0), None),
+            (SimpleNamespace(id=3, priority=5), None),
+            (SimpleNamespace(id=4, priority=0), None),
+        ]
+        costs.record(1, 0.004)
+        costs.record(2, 0.001)
+        costs.record(3, 0.010)
+        # Moyenne mobile : 0.001 puis 0.009 -> 0.005
+        costs.record(2, 0.009)
+
+        # Règle 4 jamais mesurée : coût nul, essayée en premier à priorité égale
+        self.assertEqual([rule.id for rule, _ in costs.order(rules)], [3, 4, 1, 2])
+        self.assertAlmostEqual(costs.cost(2), 0.005)
+
+
+@override_settings(CONFIG_VERSION_CHECK_INTERVAL=0)
+class FailFastEvaluationTests(TestCase):
+    """Mode fail_fast : arrêt au premier échec bloquant, mêmes résultats seul et en lot"""
+
+    def setUp(self):
+        engine._compiled_rules.clear()
+        for costs in engine.rule_costs.values():
+            costs.reset()
+
+        client = User.objects.create_user(username='rules', password='x', role='CLIENT')
+        ClientProfile.objects.create(
+            user=client, cni_number='CM-rules', birth_date=date(1985, 3, 4), birth_place='Douala',
+            address='Akwa', employment_status='EMPLOYEE', seniority_years=Decimal('4'),
+            monthly_income=Decimal(200000), monthly_debt_payment=Decimal(40000),
+        )
+        self.demand = CreditDemand.objects.create(
+            client=client, credit_type='AUTO', amount=Decimal(5000000), duration_months=84, purpose='Test',
+        )
+
+        BusinessRule.objects.create(
+            name='Revenu', rule_type='INCOME_REQUIREMENT', condition={'min_income': 100000}, priority=30,
+        )
+        BusinessRule.objects.create(
+            name='Montant', rule_type='AMOUNT_LIMIT', condition={'max_amount': 1000000}, priority=20,
+            is_blocking=False,
+        )
+        BusinessRule.objects.create(
+            name='Durée', rule_type='DURATION_LIMIT', condition={'max_duration': 60}, priority=10,
+        )
+        BusinessRule.objects.create(
+            name='Âge', rule_type='AGE_LIMIT', condition={'min_age': 21, 'max_age': 65}, priority=0,
+        )
+
+    def evaluated(self, result):
+        return [(evaluation.rule.name, evaluation.passed) for evaluation in result['evaluations']]
+
+    def test_stops_at_first_blocking_failure(self):
+        result = engine.evaluate_all_rules(self.demand, mode='fail_fast')
+
+        # Échec non bloquant (montant) : l'évaluation continue jusqu'à la durée
+        self.assertEqual(self.evaluated(result), [('Revenu', True), ('Montant', False), ('Durée', False)])
+        self.assertEqual(result['summary']['skipped'], 1)
+        self.assertFalse(result['all_passed'])
+
+    def test_full_mode_evaluates_every_rule(self):
+        result = engine.evaluate_all_rules(self.demand, mode='full')
+
+        self.assertEqual(len(result['evaluations']), 4)
+        self.assertEqual(result['summary']['skipped'], 0)
+
+    def test_batch_matches_single(self):
+        for mode in engine.EVALUATION_MODES:
+            single = engine.evaluate_all_rules(self.demand, mode=mode)
+            results, errors = engine.evaluate_rules_batch(engine.load_demands_for_rules([self.demand.id]), mode=mode)
+
+            self.assertEqual(errors, {})
+            self.assertEqual(self.evaluated(results[self.demand.id]), self.evaluated(single), mode)
+            self.assertEqual(results[self.demand.id]['summary'], single['summary'], mode)
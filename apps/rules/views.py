@@ -11,8 +11,11 @@ from rest_framework.permissions import IsAuthenticated
 from core.permissions import IsAgent
 
 from .models import BusinessRule, RuleEvaluation, CreditProduct
-from .serializers import BusinessRuleSerializer, RuleEvaluationSerializer, CreditProductSerializer
-from .engine import evaluate_all_rules, check_product_eligibility
+from .serializers import BusinessRuleSerializer, RuleEvaluationSerializer, CreditProductSerializer, EvaluateBatchSerializer
+from .engine import (
+    EVALUATION_MODES, evaluate_all_rules, evaluate_rules_batch, load_demands_for_rules, check_product_eligibility,
+    rule_costs,
+)
 from apps.demands.models import CreditDemand
 
 
@@ -33,8 +36,15 @@ class BusinessRuleViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['post'])
     def evaluate_demand(self, request):
-        """Évaluer les règles pour une demande"""
+        """Évaluer les règles pour une demande (mode : full ou fail_fast, optionnel)"""
         demand_id = request.data.get('demand_id')
+        mode = request.data.get('mode')
+        
+        if mode and mode not in EVALUATION_MODES:
+            return Response(
+                {'error': f"Mode invalide (attendu : {', '.join(EVALUATION_MODES)})"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
         try:
             demand = CreditDemand.objects.get(id=demand_id)
@@ -45,10 +55,11 @@ class BusinessRuleViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_403_FORBIDDEN
                 )
             
-            result = evaluate_all_rules(demand)
+            result = evaluate_all_rules(demand, mode=mode)
             
             return Response({
                 'all_passed': result['all_passed'],
+                'mode': result['mode'],
                 'summary': result['summary'],
                 'evaluations': RuleEvaluationSerializer(result['evaluations'], many=True).data
             })
@@ -58,6 +69,57 @@ class BusinessRuleViewSet(viewsets.ModelViewSet):
                 {'error': 'Demande non trouvée'},
                 status=status.HTTP_404_NOT_FOUND
             )
+    
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated, IsAgent])
+    def evaluate_batch(self, request):
+        """Évaluer les règles pour un lot de demandes (chargement et écriture groupés)"""
+        serializer = EvaluateBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        demand_ids = serializer.validated_data['demand_ids']
+        
+        demands = load_demands_for_rules(demand_ids)
+        results, errors = evaluate_rules_batch(demands, mode=serializer.validated_data.get('mode'))
+        
+        response = []
+        for demand_id in demand_ids:
+            if demand_id in results:
+                response.append({
+                    'demand_id': demand_id,
+                    'all_passed': results[demand_id]['all_passed'],
+                    'summary': results[demand_id]['summary'],
+                })
+            else:
+                response.append({
+                    'demand_id': demand_id,
+                    'error': errors.get(demand_id, 'Demande non trouvée'),
+                })
+        
+        return Response({
+            'count': len(demand_ids),
+            'evaluated': len(results),
+            'errors': len(demand_ids) - len(results),
+            'results': response,
+        })
+    
+    @action(detail=False, methods=['get', 'delete'], permission_classes=[IsAuthenticated, IsAgent])
+    def costs(self, request):
+        """Coût mesuré des règles (ms par demande) dans le processus courant, seule et en lot
+        
+        Sert à l'ordre d'évaluation du mode fail_fast. DELETE remet les mesures à zéro.
+        """
+        if request.method == 'DELETE':
+            for costs in rule_costs.values():
+                costs.reset()
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        
+        names = dict(BusinessRule.objects.values_list('id', 'name'))
+        return Response({
+            path: [
+                {'rule_id': rule_id, 'name': names.get(rule_id), **measure}
+                for rule_id, measure in sorted(costs.snapshot().items(), key=lambda item: item[1]['cost_ms'])
+            ]
+            for path, costs in rule_costs.items()
+        })
 
 
 class RuleEvaluationViewSet(viewsets.ReadOnlyModelViewSet):
@@ -67,9 +129,10 @@ class RuleEvaluationViewSet(viewsets.ReadOnlyModelViewSet):
     
     def get_queryset(self):
         user = self.request.user
+        evaluations = RuleEvaluation.objects.select_related('rule')
         if user.role == 'CLIENT':
-            return RuleEvaluation.objects.filter(demand__client=user)
-        return RuleEvaluation.objects.all()
+            return evaluations.filter(demand__client=user)
+        return evaluations.all()
 
 
 class CreditProductViewSet(viewsets.ModelViewSet):
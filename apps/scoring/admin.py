@@ -1,6 +1,9 @@
 # apps/scoring/admin.py
 from django.contrib import admin
-from .models import CreditScore, PaymentHistory, Transaction
+from .models import (
+    CreditScore, PaymentHistory, Transaction, ClientFeatureSnapshot, Scorecard, ScoringJob, ScoreHistogram,
+    Challenger, ChallengerScore, CreditScoreHistory,
+)
 
 @admin.register(CreditScore)
 class CreditScoreAdmin(admin.ModelAdmin):
@@ -20,4 +23,57 @@ class TransactionAdmin(admin.ModelAdmin):
     list_display = ['client', 'transaction_date', 'transaction_type', 'amount', 'balance_after']
     list_filter = ['transaction_type', 'transaction_date', 'category']
     search_fields = ['client__username']
-    date_hierarchy = 'transaction_date'
\ No newline at end of file
+    date_hierarchy = 'transaction_date'
+
+@admin.register(ClientFeatureSnapshot)
+class ClientFeatureSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['client', 'total_payments', 'default_payments', 'transaction_count', 'updated_at']
+    search_fields = ['client__username']
+    readonly_fields = ['updated_at']
+
+
+@admin.register(Scorecard)
+class ScorecardAdmin(admin.ModelAdmin):
+    list_display = ['version', 'is_active', 'created_at', 'updated_at']
+    list_filter = ['is_active']
+    search_fields = ['version', 'description']
+    readonly_fields = ['created_at', 'updated_at']
+
+
+@admin.register(ScoringJob)
+class ScoringJobAdmin(admin.ModelAdmin):
+    list_display = ['demand', 'kind', 'status', 'attempts', 'run_after', 'created_at', 'finished_at']
+    list_filter = ['kind', 'status']
+    search_fields = ['demand__id']
+    readonly_fields = ['created_at', 'started_at', 'finished_at', 'timings']
+
+
+@admin.register(ScoreHistogram)
+class ScoreHistogramAdmin(admin.ModelAdmin):
+    list_display = ['model_version', 'day', 'feature', 'total']
+    list_filter = ['model_version', 'feature']
+    date_hierarchy = 'day'
+
+
+@admin.register(Challenger)
+class ChallengerAdmin(admin.ModelAdmin):
+    list_display = ['version', 'kind', 'is_active', 'created_at']
+    list_filter = ['kind', 'is_active']
+    search_fields = ['version', 'description']
+    readonly_fields = ['created_at']
+
+
+@admin.register(ChallengerScore)
+class ChallengerScoreAdmin(admin.ModelAdmin):
+    list_display = ['demand', 'version', 'score_value', 'champion_score_value', 'ai_recommendation', 'champion_recommendation', 'scored_at']
+    list_filter = ['version', 'ai_recommendation']
+    search_fields = ['demand__id']
+    readonly_fields = ['scored_at']
+
+
+@admin.register(CreditScoreHistory)
+class CreditScoreHistoryAdmin(admin.ModelAdmin):
+    list_display = ['demand', 'score_value', 'risk_level', 'model_version', 'calculated_at']
+    list_filter = ['risk_level', 'model_version']
+    search_fields = ['demand__id']
+    date_hierarchy = 'calculated_at'
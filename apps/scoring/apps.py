@@ -4,4 +4,8 @@ from django.apps import AppConfig
 class ScoringConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.scoring'
-    verbose_name = 'Moteur de Scoring'
\ No newline at end of file
+    verbose_name = 'Moteur de Scoring'
+    
+    def ready(self):
+        """Importer les signals au démarrage de l'application"""
+        import apps.scoring.signals
@@ -0,0 +1,158 @@
+"""
+Features comportementales sur fenêtres glissantes (30/90/180/365 jours)
+
+Pour chaque client et chaque fenêtre : crédits, débits, nombre d'opérations,
+solde minimum / moyen / volatilité (écart-type) et régularité du salaire
+(part des mois de la fenêtre ayant au moins un crédit de salaire).
+
+Calcul en une passe sur les transactions triées par (client, date), en
+NumPy, pour tout un lot de clients : chaque transaction est rangée dans la
+plus petite fenêtre qui la contient (les fenêtres sont emboîtées), les
+agrégats par (client, fenêtre) sont faits par bincount puis cumulés d'une
+fenêtre à la suivante. La volatilité est calculée sur les écarts à la
+moyenne de chaque fenêtre (pas par E[x²] - E[x]², qui perd toute précision
+sur des soldes élevés et peu dispersés). Le coût est linéaire en nombre de
+transactions (une passe par fenêtre pour les écarts).
+
+Les features d'un client sont gardées dans son snapshot pour la journée
+(voir services.get_behaviour_features_bulk) : les transactions ne sont
+relues qu'au premier scoring du jour ou après une modification.
+"""
+from datetime import date, timedelta
+
+import numpy as np
+
+WINDOWS = (30, 90, 180, 365)
+
+# Catégories de transaction reconnues comme salaire (insensible à la casse)
+SALARY_CATEGORIES = {'salaire', 'salary'}
+
+WINDOW_FEATURES = [
+    'transaction_count', 'credits', 'debits',
+    'balance_min', 'balance_avg', 'balance_volatility', 'salary_regularity',
+]
+
+
+def behaviour_feature_names(windows=WINDOWS):
+    """Noms des features produites, ex. 'credits_90d'"""
+    return [f'{name}_{window}d' for window in windows for name in WINDOW_FEATURES]
+
+
+def empty_behaviour_features(windows=WINDOWS):
+    """Features d'un client sans transaction sur la plus grande fenêtre"""
+    return {name: 0 if name.startswith('transaction_count') else 0.0 for name in behaviour_feature_names(windows)}
+
+
+def compute_behaviour_features(client_ids, as_of=None, windows=WINDOWS):
+    """
+    Features comportementales pour une liste de clients, en une requête.
+
+    Retourne {client_id: {feature: valeur}} pour chaque client demandé
+    (valeurs à zéro si le client n'a aucune transaction récente).
+    """
+    from .models import Transaction
+
+    as_of = as_of or date.today()
+    windows = sorted(windows)
+    client_ids = np.unique(np.asarray(list(client_ids), dtype=np.int64))
+    n_clients = len(client_ids)
+    n_windows = len(windows)
+
+    rows = list(
+        Transaction.objects.filter(
+            client_id__in=client_ids.tolist(),
+            transaction_date__gt=as_of - timedelta(days=windows[-1]),
+            transaction_date__lte=as_of,
+        )
+        .order_by('client_id', 'transaction_date')
+        .values_list('client_id', 'transaction_date', 'transaction_type', 'amount', 'balance_after', 'category')
+    )
+
+    if not rows:
+        return {int(client_id): empty_behaviour_features(windows) for client_id in client_ids}
+
+    owners, dates, types, amounts, balances, categories = zip(*rows)
+    client_index = np.searchsorted(client_ids, np.asarray(owners, dtype=np.int64))
+    ordinals = np.fromiter((d.toordinal() for d in dates), dtype=np.int64, count=len(dates))
+    amounts = np.asarray(amounts, dtype=np.float64)
+    balances = np.asarray(balances, dtype=np.float64)
+    is_credit = np.asarray(types) == 'CREDIT'
+
+    # Plus petite fenêtre contenant la transaction (âge < fenêtre)
+    ages = as_of.toordinal() - ordinals
+    window_index = np.searchsorted(windows, ages, side='right')
+    groups = client_index * n_windows + window_index
+    size = n_clients * n_windows
+
+    def window_sum(values):
+        """Somme par (client, fenêtre), cumulée sur les fenêtres emboîtées"""
+        return np.bincount(groups, weights=values, minlength=size).reshape(n_clients, n_windows).cumsum(axis=1)
+
+    counts = window_sum(np.ones(len(rows)))
+    credits = window_sum(np.where(is_credit, amounts, 0.0))
+    debits = window_sum(np.where(is_credit, 0.0, amounts))
+    balance_sums = window_sum(balances)
+
+    balance_min = np.full(size, np.inf)
+    np.minimum.at(balance_min, groups, balances)
+    balance_min = np.minimum.accumulate(balance_min.reshape(n_clients, n_windows), axis=1)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        balance_avg = np.where(counts > 0, balance_sums / counts, 0.0)
+
+        # Écarts à la moyenne de chaque fenêtre englobant la transaction
+        squared_deviations = np.zeros((n_clients, n_windows))
+        for j in range(n_windows):
+            inside = window_index <= j
+            deviations = balances[inside] - balance_avg[client_index[inside], j]
+            squared_deviations[:, j] = np.bincount(
+                client_index[inside], weights=deviations * deviations, minlength=n_clients
+            )
+        variance = np.where(counts > 0, squared_deviations / counts, 0.0)
+    balance_volatility = np.sqrt(variance)
+    balance_min = np.where(counts > 0, balance_min, 0.0)
+
+    # Régularité du salaire : mois distincts avec un crédit de salaire.
+    # Les lignes étant triées par (client, date), un mois est une suite de
+    # lignes consécutives ; il est compté à sa transaction la plus récente.
+    is_salary = is_credit & np.fromiter(
+        ((category or '').lower() in SALARY_CATEGORIES for category in categories), dtype=bool, count=len(rows)
+    )
+    salary_months = np.zeros((n_clients, n_windows))
+    if is_salary.any():
+        salary_groups = groups[is_salary]
+        month_keys = client_index[is_salary] * 100000 + np.fromiter(
+            (d.year * 12 + d.month for d, salary in zip(dates, is_salary) if salary), dtype=np.int64
+        )
+        last_of_month = np.append(month_keys[1:] != month_keys[:-1], True)
+        salary_months = (
+            np.bincount(salary_groups[last_of_month], minlength=size)
+            .reshape(n_clients, n_windows)
+            .cumsum(axis=1)
+        )
+
+    expected_months = np.array([max(1, round(window / 30)) for window in windows], dtype=np.float64)
+    salary_regularity = np.minimum(salary_months / expected_months, 1.0)
+
+    columns = {
+        'transaction_count': counts,
+        'credits': credits,
+        'debits': debits,
+        'balance_min': balance_min,
+        'balance_avg': balance_avg,
+        'balance_volatility': balance_volatility,
+        'salary_regularity': salary_regularity,
+    }
+
+    features = {}
+    for i, client_id in enumerate(client_ids.tolist()):
+        client_features = {}
+        for j, window in enumerate(windows):
+            for name in WINDOW_FEATURES:
+                value = columns[name][i, j]
+                client_features[f'{name}_{window}d'] = (
+                    int(value) if name == 'transaction_count' else round(float(value), 2)
+                )
+        features[client_id] = client_features
+    return features
+
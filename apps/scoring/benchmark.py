@@ -0,0 +1,278 @@
+"""
+Banc d'essai du pipeline de scoring
+
+Génère un jeu de données synthétique (clients, profils, paiements,
+transactions, demandes) par bulk_create, puis mesure chaque étape du
+pipeline : durée et nombre de requêtes SQL, ramenés à la demande.
+Utilisé par la commande benchmark_scoring, dans une base jetable.
+"""
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+import numpy as np
+
+from core.instrumentation import measure
+
+EMPLOYMENT_STATUSES = ['EMPLOYEE', 'CIVIL_SERVANT', 'SELF_EMPLOYED', 'UNEMPLOYED']
+MARITAL_STATUSES = ['SINGLE', 'MARRIED', 'DIVORCED', 'WIDOWED']
+CREDIT_TYPES = ['CONSUMPTION', 'REAL_ESTATE', 'AUTO', 'BUSINESS']
+PAYMENT_STATUSES = ['ON_TIME', 'LATE', 'DEFAULT']
+
+# Règles métier créées dans la base jetable (une par type évalué par le moteur)
+BENCHMARK_RULES = [
+    ('Âge 21-65 ans', 'AGE_LIMIT', {'min_age': 21, 'max_age': 65}, None),
+    ('Revenu minimum', 'INCOME_REQUIREMENT', {}, 75000),
+    ('Endettement maximum', 'DEBT_RATIO', {}, 40),
+    ('Montant autorisé', 'AMOUNT_LIMIT', {'min_amount': 100000, 'max_amount': 50000000}, None),
+    ('Durée autorisée', 'DURATION_LIMIT', {'min_duration': 6, 'max_duration': 240}, None),
+    ('Score minimum', 'SCORING_THRESHOLD', {}, 400),
+]
+
+
+# ============================================
+# Jeu de données synthétique
+# ============================================
+
+def build_dataset(n_clients, demands_per_client=1, payments_per_client=6,
+                  transactions_per_client=24, seed=42, chunk_size=5000, progress=None):
+    """
+    Crée n_clients clients complets par lots de chunk_size (bulk_create).
+
+    Les signaux post_save ne sont pas déclenchés par bulk_create : les
+    snapshots de features sont reconstruits lot par lot.
+    """
+    from apps.rules.models import BusinessRule
+
+    rng = np.random.default_rng(seed)
+
+    BusinessRule.objects.bulk_create([
+        BusinessRule(name=name, rule_type=rule_type, condition=condition, threshold_value=threshold)
+        for name, rule_type, condition, threshold in BENCHMARK_RULES
+    ])
+
+    for start in range(0, n_clients, chunk_size):
+        size = min(chunk_size, n_clients - start)
+        build_chunk(rng, start, size, demands_per_client, payments_per_client, transactions_per_client)
+        if progress:
+            progress(start + size, n_clients)
+
+
+def build_chunk(rng, start, size, demands_per_client, payments_per_client, transactions_per_client):
+    """Un lot de clients avec profils, historique et demandes"""
+    from apps.accounts.models import User, ClientProfile
+    from apps.demands.models import CreditDemand
+    from .models import PaymentHistory, Transaction
+    from .services import rebuild_feature_snapshots
+
+    today = date.today()
+
+    users = User.objects.bulk_create([
+        User(username=f'bench_{start + i:07d}', password='!', role='CLIENT',
+             first_name='Client', last_name=f'{start + i}')
+        for i in range(size)
+    ])
+
+    # Profils : distributions simples, tirées en une fois pour le lot
+    ages = rng.uniform(21, 65, size)
+    incomes = np.round(rng.lognormal(12.3, 0.6, size), -3)
+    debt_shares = rng.uniform(0, 0.6, size)
+    employment = rng.choice(EMPLOYMENT_STATUSES, size, p=[0.5, 0.25, 0.2, 0.05])
+    marital = rng.choice(MARITAL_STATUSES, size)
+    dependents = rng.integers(0, 6, size)
+    seniority = np.round(rng.uniform(0, 20, size), 1)
+    bank_seniority = rng.integers(0, 240, size)
+    existing_credits = rng.integers(0, 4, size)
+
+    ClientProfile.objects.bulk_create([
+        ClientProfile(
+            user=user,
+            cni_number=f'CM{start + i:09d}',
+            birth_date=today - timedelta(days=int(ages[i] * 365.25)),
+            birth_place='Yaoundé',
+            address='Adresse synthétique',
+            marital_status=marital[i],
+            dependents=int(dependents[i]),
+            employment_status=employment[i],
+            seniority_years=float(seniority[i]),
+            monthly_income=float(incomes[i]),
+            existing_credits=int(existing_credits[i]),
+            monthly_debt_payment=round(float(incomes[i] * debt_shares[i]), 2),
+            bank_seniority_months=int(bank_seniority[i]),
+        )
+        for i, user in enumerate(users)
+    ])
+
+    # Historique de paiements
+    n_payments = size * payments_per_client
+    owners = np.repeat(np.arange(size), payments_per_client)
+    statuses = rng.choice(PAYMENT_STATUSES, n_payments, p=[0.8, 0.15, 0.05])
+    days_late = np.where(statuses == 'ON_TIME', 0, rng.integers(1, 90, n_payments))
+    due_offsets = rng.integers(1, 720, n_payments)
+    amounts = np.round(rng.uniform(10000, 500000, n_payments), 2)
+
+    PaymentHistory.objects.bulk_create([
+        PaymentHistory(
+            client=users[owners[k]],
+            credit_type='CONSUMPTION',
+            amount=float(amounts[k]),
+            due_date=today - timedelta(days=int(due_offsets[k])),
+            payment_date=today - timedelta(days=int(due_offsets[k] - days_late[k])),
+            days_late=int(days_late[k]),
+            status=statuses[k],
+        )
+        for k in range(n_payments)
+    ], batch_size=5000)
+
+    # Transactions bancaires
+    n_transactions = size * transactions_per_client
+    owners = np.repeat(np.arange(size), transactions_per_client)
+    is_credit = rng.random(n_transactions) < 0.4
+    amounts = np.round(rng.uniform(1000, 400000, n_transactions), 2)
+    balances = np.round(rng.uniform(0, 2000000, n_transactions), 2)
+    offsets = rng.integers(0, 365, n_transactions)
+
+    Transaction.objects.bulk_create([
+        Transaction(
+            client=users[owners[k]],
+            transaction_date=today - timedelta(days=int(offsets[k])),
+            amount=float(amounts[k]),
+            transaction_type='CREDIT' if is_credit[k] else 'DEBIT',
+            category='SALARY' if is_credit[k] else 'OTHER',
+            balance_after=float(balances[k]),
+        )
+        for k in range(n_transactions)
+    ], batch_size=5000)
+
+    # Demandes
+    n_demands = size * demands_per_client
+    owners = np.repeat(np.arange(size), demands_per_client)
+    credit_types = rng.choice(CREDIT_TYPES, n_demands)
+    demand_amounts = np.round(rng.uniform(100000, 20000000, n_demands), -3)
+    durations = rng.choice([6, 12, 24, 36, 60, 120, 240], n_demands)
+
+    CreditDemand.objects.bulk_create([
+        CreditDemand(
+            client=users[owners[k]],
+            reference=f'BENCH-{start:07d}-{k:07d}',
+            credit_type=credit_types[k],
+            amount=float(demand_amounts[k]),
+            duration_months=int(durations[k]),
+            purpose='Benchmark',
+        )
+        for k in range(n_demands)
+    ], batch_size=5000)
+
+    rebuild_feature_snapshots([user.id for user in users])
+
+
+# ============================================
+# Mesure des étapes
+# ============================================
+
+class StageTimer:
+    """Durée et nombre de requêtes SQL cumulés par étape"""
+
+    def __init__(self):
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name, demands):
+        measured = {}
+        with measure(measured):
+            yield
+
+        stage = self.stages.setdefault(name, {'seconds': 0.0, 'demands': 0, 'queries': 0})
+        stage['seconds'] += measured['ms'] / 1000
+        stage['demands'] += demands
+        stage['queries'] += measured['queries']
+
+    def summary(self):
+        summary = {}
+        for name, stage in self.stages.items():
+            demands = stage['demands'] or 1
+            summary[name] = {
+                'seconds': round(stage['seconds'], 4),
+                'demands': stage['demands'],
+                'queries': stage['queries'],
+                'ms_per_demand': round(stage['seconds'] * 1000 / demands, 4),
+                'queries_per_demand': round(stage['queries'] / demands, 4),
+                'demands_per_second': round(stage['demands'] / stage['seconds'], 1) if stage['seconds'] else None,
+            }
+        return summary
+
+
+def run_pipeline(timer, batch_size=1000, rules_sample=1000, single_sample=200, progress=None):
+    """
+    Mesure le pipeline sur toutes les demandes de la base, par lots.
+
+    Étapes : chargement, extraction des features, scoring, facteurs,
+    écriture des scores ; puis, sur des échantillons, calculate_score
+    demande par demande, évaluation des règles (unitaire, fail_fast et en lot) et rapports.
+    """
+    from apps.demands.models import CreditDemand
+    from apps.reports.services import generate_portfolio_report, generate_risk_report
+    from apps.rules.engine import evaluate_all_rules, evaluate_rules_batch, load_demands_for_rules
+    from .engine import generate_recommendations_batch, score_batch
+    from .scorecard import get_active_scorecard
+    from .services import (
+        build_score_values, calculate_score, compute_features_hash, extract_features_bulk, save_scores_bulk,
+    )
+
+    scorecard = get_active_scorecard()
+    demand_ids = list(CreditDemand.objects.order_by('id').values_list('id', flat=True))
+
+    for start in range(0, len(demand_ids), batch_size):
+        ids = demand_ids[start:start + batch_size]
+
+        with timer.stage('load', len(ids)):
+            demands = list(CreditDemand.objects.filter(id__in=ids).select_related('client').order_by('id'))
+
+        with timer.stage('feature_extraction', len(ids)):
+            features_by_demand = extract_features_bulk(demands)
+
+        scored = [demand for demand in demands if features_by_demand[demand.id] is not None]
+        features_list = [features_by_demand[demand.id] for demand in scored]
+
+        with timer.stage('scoring', len(scored)):
+            evaluation = scorecard.evaluate(features_list, with_factors=False)
+            generate_recommendations_batch(evaluation['scores'], features_list)
+
+        with timer.stage('factors', len(scored)):
+            scorecard.factors_batch(features_list)
+
+        # Préparation des lignes à écrire (non mesurée : déjà couverte ci-dessus)
+        values_by_demand = {
+            demand.id: build_score_values(features, result, compute_features_hash(features))
+            for demand, features, result in zip(scored, features_list, score_batch(features_list, scorecard))
+        }
+
+        with timer.stage('persistence', len(scored)):
+            save_scores_bulk(scored, values_by_demand)
+
+        if progress:
+            progress(min(start + batch_size, len(demand_ids)), len(demand_ids))
+
+    # Chemin unitaire (création de demande, endpoint calculate)
+    sample = list(CreditDemand.objects.select_related('client').order_by('id')[:single_sample])
+    with timer.stage('calculate_score', len(sample)):
+        for demand in sample:
+            calculate_score(demand, force=True)
+
+    sample = list(
+        CreditDemand.objects.select_related('client__client_profile', 'score').order_by('id')[:rules_sample]
+    )
+    with timer.stage('rule_evaluation', len(sample)):
+        for demand in sample:
+            evaluate_all_rules(demand, mode='full')
+
+    with timer.stage('rule_evaluation_fail_fast', len(sample)):
+        for demand in sample:
+            evaluate_all_rules(demand, mode='fail_fast')
+
+    with timer.stage('rule_evaluation_batch', len(sample)):
+        evaluate_rules_batch(load_demands_for_rules([demand.id for demand in sample]), mode='full')
+
+    today = date.today()
+    with timer.stage('reports', len(demand_ids)):
+        generate_portfolio_report(today - timedelta(days=30), today)
+        generate_risk_report(today - timedelta(days=30), today)
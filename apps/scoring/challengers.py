@@ -0,0 +1,247 @@
+"""
+Scoring champion / challenger (shadow)
+
+Une version challenger (grille de score ou artefact ML) est scorée en
+parallèle de la version en production (champion) sur le trafic réel, sans
+influencer la décision : calculate_scores ne fait qu'insérer des tâches
+SHADOW pour les demandes rescorées, traitées par run_scoring_worker après
+les tâches SCORE, avec le moteur batch. Les résultats vont dans la table
+challenger_scores (une ligne par demande et par challenger, avec le
+résultat du champion au même instant).
+
+La part de CPU du worker consacrée au shadow est plafonnée par
+SCORING_SHADOW_CPU_SHARE (voir ShadowBudget).
+"""
+import time
+
+from django.conf import settings
+from django.db.models import Avg, Count, F, Max, Min, Q
+from django.db.models.functions import Abs
+from django.utils import timezone
+
+from .engine import generate_recommendations_batch
+from .ml import registry
+from .scorecard import get_active_scorecard, get_scorecard
+from .versions import VersionedCache, bump_config_version
+
+# Écart de score au-delà duquel une demande compte comme « fortement divergente »
+LARGE_DELTA = 50
+
+# Relus quand un challenger est modifié, dans n'importe quel processus (voir versions.py)
+CHALLENGERS_VERSION = 'challengers'
+
+_active = VersionedCache(CHALLENGERS_VERSION)
+
+
+def load_active_challengers():
+    from .models import Challenger
+
+    return list(Challenger.objects.filter(is_active=True).order_by('id'))
+
+
+def get_active_challengers():
+    """Challengers actifs, lus une fois par version de la configuration"""
+    return _active.get('challengers', load_active_challengers)
+
+
+def invalidate_challenger_cache():
+    """Challenger modifié : nouvelle version pour tous les processus, cache local vidé"""
+    bump_config_version(CHALLENGERS_VERSION)
+    _active.clear()
+
+
+def register_challenger(version, kind='SCORECARD', description=''):
+    """Déclare (ou réactive) une version challenger"""
+    from .models import Challenger
+
+    challenger, _ = Challenger.objects.update_or_create(
+        version=version,
+        defaults={'kind': kind, 'is_active': True, 'description': description},
+    )
+    return challenger
+
+
+def enqueue_shadow_scoring(demand_ids):
+    """Une tâche SHADOW par demande rescorée (sans doublon en attente) ; rien sans challenger actif"""
+    from .models import ScoringJob
+
+    if not demand_ids or not get_active_challengers():
+        return 0
+
+    pending = set(
+        ScoringJob.objects.filter(demand_id__in=demand_ids, kind='SHADOW', status='PENDING')
+        .values_list('demand_id', flat=True)
+    )
+    jobs = [ScoringJob(demand_id=demand_id, kind='SHADOW') for demand_id in demand_ids if demand_id not in pending]
+    ScoringJob.objects.bulk_create(jobs)
+    return len(jobs)
+
+
+def shadow_results(challenger, features_list):
+    """Score, niveau de risque et recommandation d'un challenger pour un lot de features"""
+    if challenger.kind == 'MODEL':
+        model = registry.get(challenger.version)
+        if model is None:
+            raise ValueError(f"Artefact ML '{challenger.version}' introuvable")
+        scores = model.predict_scores(features_list)
+        risk_levels = get_active_scorecard().risk_levels(scores)
+    else:
+        evaluation = get_scorecard(challenger.version).evaluate(features_list, with_factors=False)
+        scores = evaluation['scores']
+        risk_levels = evaluation['risk_levels']
+
+    recommendations, _ = generate_recommendations_batch(scores, features_list)
+    return scores, risk_levels, recommendations
+
+
+def run_shadow_jobs(jobs):
+    """
+    Score un lot de tâches SHADOW pour tous les challengers actifs.
+
+    Features extraites en masse (comme pour le champion), un passage batch
+    par challenger, une écriture groupée (upsert) dans challenger_scores.
+    """
+    from .jobs import finish_jobs
+    from .models import ChallengerScore, CreditScore
+    from .services import extract_features_bulk
+
+    started = time.perf_counter()
+    failed = {}
+    challengers = get_active_challengers()
+
+    demands = [job.demand for job in jobs]
+    features_by_demand = extract_features_bulk(demands)
+    champions = {score.demand_id: score for score in CreditScore.objects.filter(demand__in=demands)}
+
+    # Sans profil client ou sans score champion, il n'y a rien à comparer
+    rows = [
+        (job, features_by_demand[job.demand_id], champions[job.demand_id])
+        for job in jobs
+        if features_by_demand.get(job.demand_id) is not None and job.demand_id in champions
+    ]
+    features_list = [features for _, features, _ in rows]
+
+    to_save = []
+    for challenger in challengers if rows else []:
+        try:
+            scores, risk_levels, recommendations = shadow_results(challenger, features_list)
+        except Exception as e:
+            for job, _, _ in rows:
+                failed[job.id] = f'{challenger.version}: {e}'
+            continue
+
+        for i, (job, _, champion) in enumerate(rows):
+            to_save.append(ChallengerScore(
+                demand_id=job.demand_id,
+                version=challenger.version,
+                score_value=int(scores[i]),
+                risk_level=risk_levels[i],
+                ai_recommendation=recommendations[i],
+                champion_version=champion.model_version,
+                champion_score_value=champion.score_value,
+                champion_risk_level=champion.risk_level,
+                champion_recommendation=champion.ai_recommendation,
+                scored_at=timezone.now(),
+            ))
+
+    ChallengerScore.objects.bulk_create(
+        to_save,
+        update_conflicts=True,
+        unique_fields=['demand', 'version'],
+        update_fields=[
+            'score_value', 'risk_level', 'ai_recommendation',
+            'champion_version', 'champion_score_value', 'champion_risk_level', 'champion_recommendation',
+            'scored_at',
+        ],
+    )
+
+    batch_ms = (time.perf_counter() - started) * 1000
+    finish_jobs(jobs, failed, batch_ms)
+
+    return {
+        'count': len(jobs),
+        'done': len(jobs) - len(failed),
+        'failed': len(failed),
+        'batch_ms': batch_ms,
+    }
+
+
+class ShadowBudget:
+    """
+    Plafond de la part de CPU consacrée au shadow (rapport cyclique).
+
+    Après un lot ayant consommé c secondes de CPU, le lot suivant n'est
+    autorisé qu'après c * (1 - part) / part secondes : sur la durée, le
+    shadow n'occupe pas plus de `part` du temps du worker.
+    """
+
+    def __init__(self, share=None):
+        self.share = settings.SCORING_SHADOW_CPU_SHARE if share is None else share
+        self.next_allowed = 0.0
+
+    def allows(self):
+        return self.share > 0 and time.monotonic() >= self.next_allowed
+
+    def remaining(self):
+        return max(0.0, self.next_allowed - time.monotonic())
+
+    def run(self, function, *args, **kwargs):
+        """Exécute un lot shadow et calcule le prochain créneau autorisé"""
+        cpu_started = time.process_time()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            cpu = time.process_time() - cpu_started
+            share = min(self.share, 1.0)
+            self.next_allowed = time.monotonic() + cpu * (1 - share) / share
+
+
+def challenger_report(version=None):
+    """
+    Comparaison challenger / champion, une requête agrégée par challenger.
+
+    Taux d'accord (recommandation, niveau de risque) et écarts de score
+    (challenger - champion).
+    """
+    from .models import ChallengerScore
+
+    scores = ChallengerScore.objects.all()
+    if version:
+        scores = scores.filter(version=version)
+
+    delta = F('score_value') - F('champion_score_value')
+    rows = (
+        scores.values('version')
+        .annotate(
+            count=Count('id'),
+            same_recommendation=Count('id', filter=Q(ai_recommendation=F('champion_recommendation'))),
+            same_risk_level=Count('id', filter=Q(risk_level=F('champion_risk_level'))),
+            large_deltas=Count('id', filter=(
+                Q(score_value__gt=F('champion_score_value') + LARGE_DELTA)
+                | Q(score_value__lt=F('champion_score_value') - LARGE_DELTA)
+            )),
+            mean_delta=Avg(delta),
+            mean_abs_delta=Avg(Abs(delta)),
+            min_delta=Min(delta),
+            max_delta=Max(delta),
+            last_scored_at=Max('scored_at'),
+        )
+        .order_by('version')
+    )
+
+    report = []
+    for row in rows:
+        count = row['count']
+        report.append({
+            'version': row['version'],
+            'count': count,
+            'recommendation_agreement': round(row['same_recommendation'] / count * 100, 2),
+            'risk_level_agreement': round(row['same_risk_level'] / count * 100, 2),
+            'mean_delta': round(float(row['mean_delta']), 2),
+            'mean_abs_delta': round(float(row['mean_abs_delta']), 2),
+            'min_delta': row['min_delta'],
+            'max_delta': row['max_delta'],
+            'large_delta_rate': round(row['large_deltas'] / count * 100, 2),
+            'last_scored_at': row['last_scored_at'],
+        })
+    return report
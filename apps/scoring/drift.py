@@ -0,0 +1,243 @@
+"""
+Suivi de dérive des scores et des features (PSI / KS)
+
+Les scores écrits sont ajoutés à des histogrammes à classes fixes, un par
+(model_version, jour, feature) : table score_histograms, quelques lignes par
+jour. Les indicateurs de dérive entre une période de référence et une
+période courante sont calculés à partir de ces seuls histogrammes, sans
+relire credit_scores.
+
+L'agrégation est faite hors du chemin d'écriture des scores : chaque calcul
+est déjà ajouté à credit_score_history ; aggregate_score_histograms reprend
+l'historique après le dernier calcul agrégé (curseur en base, un seul
+agrégateur à la fois). Elle est appelée par run_scoring_worker quand la
+file est vide ; l'endpoint drift/ ne fait que lire les histogrammes. Les calculs de
+moins de SCORING_DRIFT_AGGREGATION_LAG secondes attendent le passage
+suivant : une transaction de scoring encore ouverte ne peut pas être
+dépassée par le curseur.
+"""
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction as db_transaction
+from django.utils import timezone
+
+# Nom de la ligne de curseur (table drift_cursors)
+HISTOGRAMS_CURSOR = 'score_histograms'
+
+# Bornes des classes par feature suivie ; n bornes => n + 1 classes
+DRIFT_BINS = {
+    'score_value': list(range(50, 1000, 50)),
+    'monthly_income': [50000, 75000, 100000, 150000, 200000, 300000, 500000, 1000000, 2000000],
+    'debt_ratio': [5, 10, 15, 20, 25, 30, 33, 40, 50, 60],
+    'payment_capacity': [10, 20, 30, 40, 50, 60, 80, 100],
+    'loan_to_income_ratio': [0.1, 0.2, 0.3, 0.4, 0.6, 0.8, 1, 2],
+    'on_time_rate': [50, 60, 70, 80, 85, 90, 95, 99.99],
+    'avg_balance': [50000, 100000, 200000, 500000, 1000000, 2000000],
+    'age': [25, 30, 35, 40, 45, 50, 55, 60],
+}
+
+# Seuils usuels d'interprétation du PSI
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+
+# Lissage des classes vides (évite log(0))
+EPSILON = 1e-4
+
+
+def bin_counts(feature, values):
+    """Effectifs par classe d'une série de valeurs"""
+    edges = DRIFT_BINS[feature]
+    indices = np.searchsorted(np.asarray(edges, dtype=np.float64), np.asarray(values, dtype=np.float64), side='right')
+    return np.bincount(indices, minlength=len(edges) + 1)
+
+
+def record_score_histograms(values_list, day=None):
+    """
+    Ajoute un lot de scores écrits aux histogrammes d'un jour.
+
+    values_list : valeurs des CreditScore écrits (score_value, model_version,
+    features_used). Une lecture et au plus deux écritures groupées par lot.
+    À appeler par un seul écrivain à la fois (aggregate_score_histograms).
+    """
+    from .models import ScoreHistogram
+
+    if not values_list:
+        return
+
+    day = day or timezone.now().date()
+
+    by_version = {}
+    for values in values_list:
+        by_version.setdefault(values['model_version'], []).append(values)
+
+    increments = {}
+    for model_version, rows in by_version.items():
+        increments[(model_version, 'score_value')] = bin_counts('score_value', [v['score_value'] for v in rows])
+        for feature in DRIFT_BINS:
+            if feature == 'score_value':
+                continue
+            column = [v['features_used'][feature] for v in rows if feature in v['features_used']]
+            if column:
+                increments[(model_version, feature)] = bin_counts(feature, column)
+
+    with db_transaction.atomic():
+        existing = {
+            (histogram.model_version, histogram.feature): histogram
+            for histogram in ScoreHistogram.objects.select_for_update().filter(
+                day=day, model_version__in=list(by_version)
+            )
+        }
+
+        to_create = []
+        to_update = []
+        for (model_version, feature), counts in increments.items():
+            histogram = existing.get((model_version, feature))
+            if histogram is None:
+                to_create.append(ScoreHistogram(
+                    model_version=model_version,
+                    day=day,
+                    feature=feature,
+                    counts=counts.tolist(),
+                    total=int(counts.sum()),
+                ))
+                continue
+
+            # Classes modifiées depuis la création de la ligne : on repart de zéro pour ce jour
+            if len(histogram.counts) == len(counts):
+                counts = np.asarray(histogram.counts) + counts
+            histogram.counts = counts.tolist()
+            histogram.total = int(counts.sum())
+            to_update.append(histogram)
+
+        ScoreHistogram.objects.bulk_create(to_create)
+        ScoreHistogram.objects.bulk_update(to_update, ['counts', 'total'])
+
+
+def aggregate_score_histograms(batch_size=5000):
+    """
+    Ajoute aux histogrammes les calculs historisés depuis le dernier passage.
+
+    Le curseur (dernier id de credit_score_history agrégé) est verrouillé
+    pendant chaque paquet : deux agrégateurs concurrents ne comptent pas
+    deux fois les mêmes calculs, et les écritures de scores ne sont jamais
+    bloquées. Retourne le nombre de calculs agrégés.
+    """
+    from .models import CreditScoreHistory, DriftCursor
+
+    DriftCursor.objects.bulk_create([DriftCursor(name=HISTOGRAMS_CURSOR)], ignore_conflicts=True)
+    cutoff = timezone.now() - timedelta(seconds=settings.SCORING_DRIFT_AGGREGATION_LAG)
+    aggregated = 0
+
+    while True:
+        with db_transaction.atomic():
+            cursor = DriftCursor.objects.select_for_update().get(name=HISTOGRAMS_CURSOR)
+            rows = list(
+                CreditScoreHistory.objects.filter(id__gt=cursor.last_id)
+                .order_by('id')
+                .values_list('id', 'calculated_at', 'model_version', 'score_value', 'features_used__data')
+                [:batch_size]
+            )
+
+            # Le curseur n'avance que sur des calculs assez anciens et consécutifs
+            ready = []
+            for row in rows:
+                if row[1] > cutoff:
+                    break
+                ready.append(row)
+            if not ready:
+                return aggregated
+
+            by_day = {}
+            for _, calculated_at, model_version, score_value, features_used in ready:
+                by_day.setdefault(calculated_at.date(), []).append({
+                    'model_version': model_version,
+                    'score_value': score_value,
+                    'features_used': features_used,
+                })
+            for day, values_list in by_day.items():
+                record_score_histograms(values_list, day=day)
+
+            cursor.last_id = ready[-1][0]
+            cursor.save(update_fields=['last_id', 'updated_at'])
+
+        aggregated += len(ready)
+        if len(ready) < batch_size:
+            return aggregated
+
+
+def aggregate_histograms(model_version, start, end, features=None):
+    """Somme des histogrammes journaliers sur [start, end], par feature"""
+    from .models import ScoreHistogram
+
+    histograms = ScoreHistogram.objects.filter(model_version=model_version, day__range=[start, end])
+    if features:
+        histograms = histograms.filter(feature__in=features)
+
+    totals = {}
+    for feature, counts in histograms.values_list('feature', 'counts'):
+        if feature not in DRIFT_BINS or len(counts) != len(DRIFT_BINS[feature]) + 1:
+            continue
+        totals[feature] = totals.get(feature, 0) + np.asarray(counts, dtype=np.float64)
+    return totals
+
+
+def population_stability_index(reference, current):
+    """PSI entre deux histogrammes de mêmes classes"""
+    reference = np.maximum(reference / reference.sum(), EPSILON)
+    current = np.maximum(current / current.sum(), EPSILON)
+    return float(np.sum((current - reference) * np.log(current / reference)))
+
+
+def ks_statistic(reference, current):
+    """Statistique de Kolmogorov-Smirnov sur les fonctions de répartition par classe"""
+    return float(np.max(np.abs(np.cumsum(reference) / reference.sum() - np.cumsum(current) / current.sum())))
+
+
+def compute_drift(model_version, reference_start, reference_end, current_start, current_end, features=None):
+    """PSI et KS par feature entre une période de référence et une période courante"""
+    reference = aggregate_histograms(model_version, reference_start, reference_end, features)
+    current = aggregate_histograms(model_version, current_start, current_end, features)
+
+    results = {}
+    for feature in DRIFT_BINS:
+        if features and feature not in features:
+            continue
+        ref = reference.get(feature)
+        cur = current.get(feature)
+        if ref is None or cur is None or not ref.sum() or not cur.sum():
+            results[feature] = {
+                'psi': None,
+                'ks': None,
+                'reference_count': int(ref.sum()) if ref is not None else 0,
+                'current_count': int(cur.sum()) if cur is not None else 0,
+                'status': 'insufficient_data',
+            }
+            continue
+
+        psi = population_stability_index(ref, cur)
+        if psi >= PSI_SIGNIFICANT:
+            drift_status = 'significant'
+        elif psi >= PSI_MODERATE:
+            drift_status = 'moderate'
+        else:
+            drift_status = 'stable'
+
+        results[feature] = {
+            'psi': round(psi, 4),
+            'ks': round(ks_statistic(ref, cur), 4),
+            'reference_count': int(ref.sum()),
+            'current_count': int(cur.sum()),
+            'status': drift_status,
+        }
+    return results
+
+
+def default_drift_periods(today=None, current_days=7, reference_days=30):
+    """Période courante : les current_days derniers jours ; référence : les reference_days précédents"""
+    today = today or timezone.now().date()
+    current_start = today - timedelta(days=current_days - 1)
+    reference_end = current_start - timedelta(days=1)
+    reference_start = reference_end - timedelta(days=reference_days - 1)
+    return reference_start, reference_end, current_start, today
@@ -0,0 +1,87 @@
+"""
+Export en flux des scores et de leurs features (NDJSON ou CSV)
+
+Les lignes sont lues par paquets de chunk_size avec .iterator() et écrites
+au fur et à mesure : la mémoire utilisée ne dépend pas de la taille de la
+table. Utilisé par l'endpoint scores/export/ (StreamingHttpResponse) et par
+la commande export_scores.
+
+NDJSON : un objet JSON par ligne, features dans 'features_used'.
+CSV : une colonne par feature (préfixe 'f_'), d'après les features d'un
+score complet ; une feature absente d'une ligne donne une cellule vide.
+"""
+import csv
+import json
+
+from django.conf import settings
+
+EXPORT_FORMATS = ['ndjson', 'csv']
+
+SCORE_COLUMNS = [
+    'demand_id', 'score_value', 'risk_level', 'ai_recommendation', 'confidence_level',
+    'model_version', 'features_hash', 'calculated_at',
+]
+
+
+def filter_scores(start=None, end=None, model_version=None, risk_level=None):
+    """Scores à exporter : période de calcul (dates incluses), version du modèle, niveau de risque"""
+    from .models import CreditScore
+
+    scores = CreditScore.objects.all()
+    if start:
+        scores = scores.filter(calculated_at__date__gte=start)
+    if end:
+        scores = scores.filter(calculated_at__date__lte=end)
+    if model_version:
+        scores = scores.filter(model_version=model_version)
+    if risk_level:
+        scores = scores.filter(risk_level=risk_level)
+    return scores.order_by('id')
+
+
+def iter_rows(scores, chunk_size=None):
+    """Lignes (dict) de l'export, lues par paquets sans instancier de modèles"""
+    chunk_size = chunk_size or settings.SCORING_EXPORT_CHUNK_SIZE
+    for values in scores.values_list(*SCORE_COLUMNS, 'features_used').iterator(chunk_size=chunk_size):
+        row = dict(zip(SCORE_COLUMNS, values))
+        row['confidence_level'] = float(row['confidence_level'])
+        row['calculated_at'] = row['calculated_at'].isoformat()
+        row['features_used'] = values[-1]
+        yield row
+
+
+def iter_ndjson(scores, chunk_size=None):
+    for row in iter_rows(scores, chunk_size):
+        yield json.dumps(row, default=str, ensure_ascii=False) + '\n'
+
+
+class _Echo:
+    """Pseudo-fichier pour csv.writer : renvoie la ligne au lieu de l'écrire"""
+
+    def write(self, value):
+        return value
+
+
+def feature_columns(scores):
+    """Features d'un score complet de la sélection (une requête)"""
+    features = scores.exclude(features_used={}).values_list('features_used', flat=True).first()
+    return sorted(features or {})
+
+
+def iter_csv(scores, chunk_size=None):
+    features = feature_columns(scores)
+    writer = csv.writer(_Echo())
+
+    yield writer.writerow(SCORE_COLUMNS + [f'f_{name}' for name in features])
+    for row in iter_rows(scores, chunk_size):
+        values = row['features_used']
+        yield writer.writerow(
+            [row[column] for column in SCORE_COLUMNS] + [values.get(name, '') for name in features]
+        )
+
+
+def iter_export(scores, export_format='ndjson', chunk_size=None):
+    """Lignes de texte de l'export, au format demandé"""
+    if export_format == 'csv':
+        return iter_csv(scores, chunk_size)
+    return iter_ndjson(scores, chunk_size)
@@ -0,0 +1,87 @@
+"""
+Historique des scores en ajout seul (table credit_score_history)
+
+credit_scores ne garde que le dernier calcul de chaque demande (lecture
+directe par les serializers) ; chaque score écrit y est aussi ajouté à
+l'historique, avec sa version de modèle et l'empreinte de ses features.
+
+Les JSON répétitifs (facteurs, features, contributions) sont stockés une
+seule fois dans score_payloads, la clé étant le SHA-256 de leur contenu :
+deux calculs identiques ne coûtent qu'une ligne d'historique. Un lot de
+scores est historisé en deux insertions groupées.
+"""
+import hashlib
+import json
+
+from django.utils import timezone
+
+# Champs JSON de CreditScore externalisés dans score_payloads
+PAYLOAD_FIELDS = ['factors_positive', 'factors_negative', 'features_used', 'shap_values']
+
+
+def content_hash(data):
+    """Empreinte (SHA-256) du JSON canonique (clés triées)"""
+    payload = json.dumps(data, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def record_score_history(scores, calculated_at=None):
+    """Ajoute un lot de CreditScore écrits à l'historique (deux requêtes par lot)"""
+    from .models import CreditScoreHistory, ScorePayload
+
+    if not scores:
+        return []
+
+    calculated_at = calculated_at or timezone.now()
+    payloads = {}
+    rows = []
+
+    for score in scores:
+        hashes = {}
+        for field in PAYLOAD_FIELDS:
+            data = getattr(score, field)
+            digest = content_hash(data)
+            payloads.setdefault(digest, data)
+            hashes[f'{field}_id'] = digest
+
+        rows.append(CreditScoreHistory(
+            demand_id=score.demand_id,
+            score_value=score.score_value,
+            risk_level=score.risk_level,
+            ai_recommendation=score.ai_recommendation,
+            confidence_level=score.confidence_level,
+            model_version=score.model_version,
+            features_hash=score.features_hash,
+            calculated_at=calculated_at,
+            **hashes,
+        ))
+
+    # Contenus déjà connus : ignorés par la base (clé primaire = empreinte)
+    ScorePayload.objects.bulk_create(
+        [ScorePayload(hash=digest, data=data) for digest, data in payloads.items()],
+        ignore_conflicts=True,
+    )
+    return CreditScoreHistory.objects.bulk_create(rows)
+
+
+def score_history(demand_id):
+    """Calculs successifs d'une demande (plus récent d'abord), JSON reconstitués"""
+    from .models import CreditScoreHistory
+
+    entries = CreditScoreHistory.objects.filter(demand_id=demand_id).select_related(
+        *PAYLOAD_FIELDS
+    )
+    return [
+        {
+            'id': entry.id,
+            'score_value': entry.score_value,
+            'risk_level': entry.risk_level,
+            'ai_recommendation': entry.ai_recommendation,
+            'confidence_level': entry.confidence_level,
+            'model_version': entry.model_version,
+            'features_hash': entry.features_hash,
+            'calculated_at': entry.calculated_at,
+            **{field: getattr(entry, field).data for field in PAYLOAD_FIELDS},
+        }
+        for entry in entries
+    ]
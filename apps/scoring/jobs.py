@@ -0,0 +1,222 @@
+"""
+File d'attente des calculs de score (table scoring_jobs)
+
+La création d'une demande ne fait qu'insérer une tâche ; le calcul est fait
+par la commande run_scoring_worker, qui réserve les tâches par lots et les
+score avec l'extraction de features en masse. Une tâche en erreur est
+reprogrammée avec un délai doublé à chaque tentative (backoff exponentiel),
+puis marquée FAILED après SCORING_JOB_MAX_ATTEMPTS tentatives.
+
+Rescoring automatique : une modification du profil, des paiements ou des
+transactions d'un client marque le client (table scoring_dirty_clients,
+une ligne par client quel que soit le nombre de modifications). Le worker
+met en file ses demandes PENDING_ANALYST une fois le client stable depuis
+SCORING_RESCORE_DEBOUNCE secondes (au plus tard SCORING_RESCORE_MAX_DELAY
+après la première modification).
+"""
+import os
+import socket
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction as db_transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ScoringDirtyClient, ScoringJob
+
+
+def enqueue_scoring(demand, force=False):
+    """Ajoute une tâche de scoring pour la demande (sans doublon en attente)"""
+    job = ScoringJob.objects.filter(demand=demand, kind='SCORE', status='PENDING').first()
+    if job is not None:
+        if force and not job.force:
+            job.force = True
+            job.save(update_fields=['force'])
+        return job
+    return ScoringJob.objects.create(demand=demand, force=force)
+
+
+def make_worker_id():
+    """Identifiant unique d'un worker (hôte, pid, suffixe aléatoire)"""
+    return f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+
+
+def retry_delay(attempts):
+    """Délai avant la prochaine tentative : base * 2^(tentatives - 1), plafonné"""
+    delay = settings.SCORING_JOB_RETRY_DELAY * 2 ** max(0, attempts - 1)
+    return timedelta(seconds=min(delay, settings.SCORING_JOB_MAX_RETRY_DELAY))
+
+
+def release_stale_jobs():
+    """Remet en attente les tâches d'un worker arrêté en cours de lot"""
+    limit = timezone.now() - timedelta(seconds=settings.SCORING_JOB_LOCK_TIMEOUT)
+    return ScoringJob.objects.filter(status='RUNNING', locked_at__lt=limit).update(
+        status='PENDING', locked_by='', locked_at=None
+    )
+
+
+def claim_jobs(worker_id, batch_size, kind='SCORE'):
+    """
+    Réserve jusqu'à batch_size tâches prêtes de ce type pour ce worker.
+
+    La réservation est un UPDATE conditionnel (status='PENDING') : deux
+    workers concurrents ne peuvent pas obtenir la même tâche.
+    """
+    now = timezone.now()
+    with db_transaction.atomic():
+        ids = list(
+            ScoringJob.objects.filter(status='PENDING', kind=kind, run_after__lte=now)
+            .order_by('id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return []
+        ScoringJob.objects.filter(id__in=ids, status='PENDING').update(
+            status='RUNNING', locked_by=worker_id, locked_at=now, started_at=now
+        )
+
+    return list(
+        ScoringJob.objects.filter(id__in=ids, status='RUNNING', locked_by=worker_id)
+        .select_related('demand', 'demand__client')
+        .order_by('id')
+    )
+
+
+def run_jobs(jobs, mode=None):
+    """
+    Score un lot de tâches réservées.
+
+    Un seul passage vectorisé pour tout le lot ; en cas d'erreur, repli
+    demande par demande pour n'échouer que les lignes en cause.
+    Retourne un résumé : nombre de tâches, succès, erreurs, durée (ms).
+    """
+    from .services import calculate_scores
+
+    started = time.perf_counter()
+    failed = {}
+
+    forced = [job.demand for job in jobs if job.force]
+    regular = [job.demand for job in jobs if not job.force]
+
+    try:
+        with db_transaction.atomic():
+            if regular:
+                calculate_scores(regular, mode=mode)
+            if forced:
+                calculate_scores(forced, force=True, mode=mode)
+    except Exception:
+        for job in jobs:
+            try:
+                calculate_scores([job.demand], force=job.force, mode=mode)
+            except Exception as e:
+                failed[job.id] = str(e)
+
+    batch_ms = (time.perf_counter() - started) * 1000
+    finish_jobs(jobs, failed, batch_ms)
+
+    return {
+        'count': len(jobs),
+        'done': len(jobs) - len(failed),
+        'failed': len(failed),
+        'batch_ms': batch_ms,
+    }
+
+
+def finish_jobs(jobs, failed, batch_ms):
+    """Enregistre l'issue du lot : DONE, nouvel essai différé ou FAILED"""
+    now = timezone.now()
+
+    for job in jobs:
+        job.attempts += 1
+        job.locked_by = ''
+        job.locked_at = None
+        job.timings = {
+            'wait_ms': round((job.started_at - job.created_at).total_seconds() * 1000, 1),
+            'batch_ms': round(batch_ms, 1),
+            'batch_size': len(jobs),
+        }
+
+        if job.id not in failed:
+            job.status = 'DONE'
+            job.last_error = ''
+            job.finished_at = now
+        elif job.attempts >= settings.SCORING_JOB_MAX_ATTEMPTS:
+            job.status = 'FAILED'
+            job.last_error = failed[job.id]
+            job.finished_at = now
+        else:
+            job.status = 'PENDING'
+            job.last_error = failed[job.id]
+            job.run_after = now + retry_delay(job.attempts)
+
+    ScoringJob.objects.bulk_update(
+        jobs,
+        ['status', 'attempts', 'run_after', 'last_error', 'locked_by', 'locked_at', 'finished_at', 'timings'],
+    )
+
+
+def mark_clients_dirty(client_ids):
+    """
+    Marque des clients à rescorer : une écriture (upsert), même pour une rafale de modifications.
+
+    Le marquage est fait après le commit de la transaction en cours, pour les
+    seuls clients qui existent encore : la suppression d'un client (cascade
+    sur ses paiements, transactions et profil) ne marque rien.
+    """
+    client_ids = set(client_ids)
+    if client_ids:
+        db_transaction.on_commit(lambda: _mark_existing_clients(client_ids))
+
+
+def _mark_existing_clients(client_ids):
+    from apps.accounts.models import User
+
+    now = timezone.now()
+    existing = User.objects.filter(id__in=client_ids).values_list('id', flat=True)
+    ScoringDirtyClient.objects.bulk_create(
+        [ScoringDirtyClient(client_id=client_id, first_marked_at=now, marked_at=now) for client_id in existing],
+        update_conflicts=True,
+        unique_fields=['client'],
+        update_fields=['marked_at'],
+    )
+
+
+def enqueue_dirty_demands(limit=1000):
+    """
+    Met en file les demandes PENDING_ANALYST des clients marqués et stables.
+
+    Un client est pris quand sa dernière modification date d'au moins
+    SCORING_RESCORE_DEBOUNCE secondes, ou sa première d'au moins
+    SCORING_RESCORE_MAX_DELAY secondes. Retourne le nombre de tâches créées.
+    """
+    from apps.demands.models import CreditDemand
+
+    now = timezone.now()
+    ready = Q(marked_at__lte=now - timedelta(seconds=settings.SCORING_RESCORE_DEBOUNCE)) | Q(
+        first_marked_at__lte=now - timedelta(seconds=settings.SCORING_RESCORE_MAX_DELAY)
+    )
+
+    with db_transaction.atomic():
+        client_ids = list(
+            ScoringDirtyClient.objects.filter(ready).order_by('marked_at').values_list('client_id', flat=True)[:limit]
+        )
+        if not client_ids:
+            return 0
+
+        # Un client modifié à nouveau entre-temps reste marqué pour le passage suivant
+        ScoringDirtyClient.objects.filter(client_id__in=client_ids, marked_at__lte=now).delete()
+
+        demand_ids = set(
+            CreditDemand.objects.filter(client_id__in=client_ids, status='PENDING_ANALYST')
+            .values_list('id', flat=True)
+        )
+        demand_ids -= set(
+            ScoringJob.objects.filter(demand_id__in=demand_ids, kind='SCORE', status='PENDING')
+            .values_list('demand_id', flat=True)
+        )
+        ScoringJob.objects.bulk_create([ScoringJob(demand_id=demand_id) for demand_id in sorted(demand_ids)])
+
+    return len(demand_ids)
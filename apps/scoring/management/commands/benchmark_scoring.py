@@ -0,0 +1,176 @@
+"""
+Banc d'essai du pipeline de scoring sur une base jetable
+Usage: python manage.py benchmark_scoring [--clients 10000] [--output bench.json]
+"""
+
+import json
+import platform
+import subprocess
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+from apps.scoring.benchmark import StageTimer, build_dataset, run_pipeline
+
+
+class Command(BaseCommand):
+    help = 'Mesure les étapes du pipeline de scoring sur un jeu de données synthétique'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--clients',
+            type=int,
+            default=10000,
+            help='Nombre de clients synthétiques (ex: 10000, 100000, 1000000)',
+        )
+
+        parser.add_argument(
+            '--demands-per-client',
+            type=int,
+            default=1,
+            help='Demandes par client (défaut: 1)',
+        )
+
+        parser.add_argument(
+            '--payments-per-client',
+            type=int,
+            default=6,
+            help='Paiements par client (défaut: 6)',
+        )
+
+        parser.add_argument(
+            '--transactions-per-client',
+            type=int,
+            default=24,
+            help='Transactions par client (défaut: 24)',
+        )
+
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Demandes par lot de scoring (défaut: 1000)',
+        )
+
+        parser.add_argument(
+            '--rules-sample',
+            type=int,
+            default=1000,
+            help='Demandes utilisées pour mesurer l\'évaluation des règles (défaut: 1000)',
+        )
+
+        parser.add_argument(
+            '--single-sample',
+            type=int,
+            default=200,
+            help='Demandes scorées une à une avec calculate_score (défaut: 200)',
+        )
+
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=42,
+            help='Graine du générateur aléatoire (défaut: 42)',
+        )
+
+        parser.add_argument(
+            '--scratch-db',
+            default=None,
+            help='Nom/fichier de la base jetable (défaut: base de test Django)',
+        )
+
+        parser.add_argument(
+            '--keep-db',
+            action='store_true',
+            help='Conserver la base jetable après la mesure',
+        )
+
+        parser.add_argument(
+            '--output',
+            default=None,
+            help='Fichier JSON du résumé (défaut: sortie standard)',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('=== BENCHMARK DU SCORING ===\n'))
+
+        old_name = connection.settings_dict['NAME']
+        if options['scratch_db']:
+            connection.settings_dict['TEST']['NAME'] = options['scratch_db']
+
+        # Jamais la base de travail : base de test créée et migrée pour l'occasion
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False, keepdb=options['keep_db'])
+        self.stdout.write(f'🗄️  Base jetable: {connection.settings_dict["NAME"]}')
+
+        try:
+            summary = self.run(options)
+        finally:
+            if not options['keep_db']:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        report = json.dumps(summary, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(report)
+            self.stdout.write(self.style.SUCCESS(f'\n✅ Résumé écrit dans {options["output"]}'))
+        else:
+            self.stdout.write(report)
+
+    def run(self, options):
+        started = time.perf_counter()
+        build_dataset(
+            options['clients'],
+            demands_per_client=options['demands_per_client'],
+            payments_per_client=options['payments_per_client'],
+            transactions_per_client=options['transactions_per_client'],
+            seed=options['seed'],
+            progress=self.progress('Génération'),
+        )
+        build_seconds = time.perf_counter() - started
+        self.stdout.write(f'\n📊 Jeu de données généré en {build_seconds:.1f}s')
+
+        timer = StageTimer()
+        run_pipeline(
+            timer,
+            batch_size=max(1, options['batch_size']),
+            rules_sample=options['rules_sample'],
+            single_sample=options['single_sample'],
+            progress=self.progress('Scoring'),
+        )
+        self.stdout.write('')
+
+        return {
+            'benchmark': 'scoring',
+            'created_at': timezone.now().isoformat(),
+            'git_commit': self.git_commit(),
+            'python': platform.python_version(),
+            'database': connection.vendor,
+            'debug': settings.DEBUG,
+            'dataset': {
+                'clients': options['clients'],
+                'demands': options['clients'] * options['demands_per_client'],
+                'payments': options['clients'] * options['payments_per_client'],
+                'transactions': options['clients'] * options['transactions_per_client'],
+                'seed': options['seed'],
+                'build_seconds': round(build_seconds, 2),
+            },
+            'stages': timer.summary(),
+        }
+
+    def progress(self, label):
+        def report(done, total):
+            percent = done / total * 100 if total else 100
+            self.stdout.write(f'  ✓ {label}: [{done}/{total}] {percent:.1f}%')
+        return report
+
+    def git_commit(self):
+        """Commit courant, pour comparer les exécutions entre versions"""
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', 'HEAD'],
+                cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
@@ -0,0 +1,93 @@
+"""
+Export des scores et de leurs features (NDJSON ou CSV)
+Usage: python manage.py export_scores [--format csv] [--start 2025-01-01] [--output scores.ndjson]
+"""
+
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from apps.scoring.export import EXPORT_FORMATS, filter_scores, iter_export
+from apps.scoring.models import CreditScore
+
+
+class Command(BaseCommand):
+    help = 'Exporte les scores et les features utilisées, en flux (mémoire constante)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format',
+            choices=EXPORT_FORMATS,
+            default='ndjson',
+            help='Format de sortie (défaut: ndjson)',
+        )
+
+        parser.add_argument(
+            '--start',
+            default=None,
+            help='Scores calculés à partir de cette date (AAAA-MM-JJ)',
+        )
+
+        parser.add_argument(
+            '--end',
+            default=None,
+            help='Scores calculés jusqu\'à cette date incluse (AAAA-MM-JJ)',
+        )
+
+        parser.add_argument(
+            '--model-version',
+            default=None,
+            help='Version du modèle ou de la grille',
+        )
+
+        parser.add_argument(
+            '--risk-level',
+            choices=[choice for choice, _ in CreditScore.RISK_LEVEL_CHOICES],
+            default=None,
+            help='Niveau de risque',
+        )
+
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=None,
+            help='Lignes lues par paquet (défaut: settings.SCORING_EXPORT_CHUNK_SIZE)',
+        )
+
+        parser.add_argument(
+            '--output',
+            default=None,
+            help='Fichier de sortie (défaut: sortie standard)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            start = self.parse_date(options['start'])
+            end = self.parse_date(options['end'])
+        except ValueError:
+            raise CommandError('Format de date invalide (AAAA-MM-JJ)')
+
+        scores = filter_scores(
+            start=start,
+            end=end,
+            model_version=options['model_version'],
+            risk_level=options['risk_level'],
+        )
+        lines = iter_export(scores, options['format'], chunk_size=options['chunk_size'])
+
+        if not options['output']:
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+
+        count = 0
+        with open(options['output'], 'w', encoding='utf-8', newline='') as f:
+            for line in lines:
+                f.write(line)
+                count += 1
+
+        if options['format'] == 'csv':
+            count -= 1  # en-tête
+        self.stdout.write(self.style.SUCCESS(f'✅ {count} scores exportés dans {options["output"]}'))
+
+    def parse_date(self, value):
+        return datetime.strptime(value, '%Y-%m-%d').date() if value else None
@@ -0,0 +1,52 @@
+"""
+Commande Django pour reconstruire les snapshots de features clients
+Usage: python manage.py rebuild_feature_snapshots
+"""
+
+from django.core.management.base import BaseCommand
+from apps.accounts.models import User
+from apps.scoring.models import ClientFeatureSnapshot
+from apps.scoring.services import rebuild_feature_snapshots
+
+
+class Command(BaseCommand):
+    help = 'Recalcule les snapshots de features à partir de l\'historique complet'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--client-id',
+            type=int,
+            help='Reconstruire le snapshot d\'un client spécifique',
+        )
+        
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Nombre de clients recalculés par lot (défaut: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('=== RECONSTRUCTION DES SNAPSHOTS DE FEATURES ===\n'))
+        
+        if options['client_id']:
+            rebuild_feature_snapshots([options['client_id']])
+            self.stdout.write(self.style.SUCCESS(f'✅ Snapshot reconstruit pour le client #{options["client_id"]}'))
+            return
+        
+        # Pas de suppression globale : les snapshots sont réécrits en place (upsert),
+        # les mises à jour incrémentales (signaux) et les lectures continuent pendant la reconstruction.
+        # Seuls les snapshots d'utilisateurs qui ne sont plus clients sont retirés.
+        deleted, _ = ClientFeatureSnapshot.objects.exclude(client__role='CLIENT').delete()
+        self.stdout.write(f'🗑️  {deleted} snapshots d\'utilisateurs non clients supprimés')
+        
+        client_ids = list(User.objects.filter(role='CLIENT').order_by('id').values_list('id', flat=True))
+        total = len(client_ids)
+        batch_size = max(1, options['batch_size'])
+        self.stdout.write(f'📊 {total} clients à traiter\n')
+        
+        for start in range(0, total, batch_size):
+            rebuild_feature_snapshots(client_ids[start:start + batch_size])
+            self.stdout.write(f'  ✓ {min(start + batch_size, total)}/{total} clients')
+        
+        self.stdout.write(self.style.SUCCESS(f'\n✅ Terminé: {total} snapshots reconstruits'))
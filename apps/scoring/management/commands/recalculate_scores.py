@@ -1,11 +1,22 @@
 """
 Commande Django pour recalculer les scores
-Usage: python manage.py recalculate_scores
+Usage: python manage.py recalculate_scores [--all] [--force] [--workers 4] [--resume]
 """
 
+import json
+import multiprocessing
+import time
+from pathlib import Path
+
+from django.conf import settings
 from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils import timezone
 from apps.demands.models import CreditDemand
 from apps.scoring.services import calculate_score
+from apps.scoring.parallel import init_worker, score_demand_range, split_id_range
+
+DEFAULT_CHECKPOINT = 'recalculate_scores.checkpoint.json'
 
 
 class Command(BaseCommand):
@@ -18,11 +29,50 @@ class Command(BaseCommand):
             help='Recalculer même les scores existants',
         )
         
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Rescorer même si les features et la version du modèle sont inchangées',
+        )
+        
+        parser.add_argument(
+            '--mode',
+            choices=['rules', 'model'],
+            default=None,
+            help='Grille de score ou modèle ML (défaut: settings.SCORING_MODE)',
+        )
+        
         parser.add_argument(
             '--demand-id',
             type=int,
             help='Recalculer le score pour une demande spécifique',
         )
+        
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Nombre de demandes scorées par passe vectorisée (défaut: 500)',
+        )
+        
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Nombre de processus pour le recalcul (défaut: 1, sans pool)',
+        )
+        
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Reprendre après le dernier id enregistré dans le checkpoint',
+        )
+        
+        parser.add_argument(
+            '--checkpoint',
+            default=None,
+            help=f'Fichier de checkpoint (défaut: BASE_DIR/{DEFAULT_CHECKPOINT})',
+        )
 
     def handle(self, *args, **options):
         self.stdout.write(self.style.SUCCESS('=== RECALCUL DES SCORES ===\n'))
@@ -31,7 +81,7 @@ class Command(BaseCommand):
             # Recalculer pour une demande spécifique
             try:
                 demand = CreditDemand.objects.get(id=options['demand_id'])
-                score = calculate_score(demand)
+                score = calculate_score(demand, force=options['force'], mode=options['mode'])
                 self.stdout.write(
                     self.style.SUCCESS(
                         f'✅ Score recalculé pour demande #{demand.id}: {score.score_value}'
@@ -50,27 +100,100 @@ class Command(BaseCommand):
             # Seulement celles sans score
             demands = CreditDemand.objects.exclude(status='DRAFT').filter(score__isnull=True)
         
-        total = demands.count()
+        checkpoint_path = Path(options['checkpoint'] or Path(settings.BASE_DIR) / DEFAULT_CHECKPOINT)
+        
+        if options['resume']:
+            last_id = self.read_checkpoint(checkpoint_path, options['all'])
+            if last_id:
+                demands = demands.filter(id__gt=last_id)
+                self.stdout.write(f'⏩ Reprise après la demande #{last_id}')
+        
+        # Les ids sont figés avant écriture : on ne modifie pas la table parcourue
+        demand_ids = list(demands.order_by('id').values_list('id', flat=True))
+        total = len(demand_ids)
         self.stdout.write(f'📊 {total} demandes à traiter\n')
         
-        success = 0
+        tasks = [
+            (first_id, last_id, not options['all'], options['force'], options['mode'])
+            for first_id, last_id in split_id_range(demand_ids, max(1, options['batch_size']))
+        ]
+        workers = max(1, options['workers'])
+        
+        processed = 0
         errors = 0
+        started = time.perf_counter()
         
-        for i, demand in enumerate(demands, 1):
-            try:
-                score = calculate_score(demand)
-                self.stdout.write(
-                    self.style.SUCCESS(
-                        f'✅ [{i}/{total}] Demande #{demand.id} - Score: {score.score_value}'
+        pool = None
+        if workers > 1:
+            # Chaque processus ouvre sa propre connexion
+            connections.close_all()
+            pool = multiprocessing.Pool(workers, initializer=init_worker)
+        
+        try:
+            results = pool.imap(score_demand_range, tasks) if pool is not None else map(score_demand_range, tasks)
+            
+            # imap conserve l'ordre des tranches : le checkpoint avance sans trou
+            for result in results:
+                processed += result['count']
+                errors += len(result['errors'])
+                
+                for error in result['errors']:
+                    self.stdout.write(
+                        self.style.ERROR(f'❌ Demande #{error["demand_id"]} - Erreur: {error["error"]}')
                     )
-                )
-                success += 1
-            except Exception as e:
+                
+                self.write_checkpoint(checkpoint_path, result['last_id'], options['all'])
+                
+                elapsed = time.perf_counter() - started
+                rate = processed / elapsed if elapsed > 0 else 0
+                percent = processed / total * 100 if total else 100
                 self.stdout.write(
-                    self.style.ERROR(
-                        f'❌ [{i}/{total}] Demande #{demand.id} - Erreur: {str(e)}'
-                    )
+                    f'  ✓ [{processed}/{total}] {percent:.1f}% - {rate:.0f} demandes/s '
+                    f'- jusqu\'à la demande #{result["last_id"]}'
                 )
-                errors += 1
+        except BaseException:
+            # Ctrl-C ou erreur : arrêt immédiat, sans attendre les tranches en file
+            # (le checkpoint permet de reprendre avec --resume)
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+            raise
+        
+        if pool is not None:
+            pool.close()
+            pool.join()
+        
+        elapsed = time.perf_counter() - started
+        rate = processed / elapsed if elapsed > 0 else 0
         
-        self.stdout.write(self.style.SUCCESS(f'\n✅ Terminé: {success} succès, {errors} erreurs'))
\ No newline at end of file
+        # Recalcul complet : le checkpoint n'est plus utile
+        if checkpoint_path.exists():
+            checkpoint_path.unlink()
+        
+        self.stdout.write(self.style.SUCCESS(
+            f'\n✅ Terminé: {processed - errors} succès, {errors} erreurs '
+            f'en {elapsed:.1f}s ({rate:.0f} demandes/s, {workers} processus)'
+        ))
+
+    def read_checkpoint(self, path, all_scores):
+        """Dernier id traité lors d'une exécution interrompue"""
+        if not path.exists():
+            self.stdout.write(self.style.WARNING('⚠️  Aucun checkpoint, recalcul depuis le début'))
+            return None
+        
+        checkpoint = json.loads(path.read_text())
+        if checkpoint.get('all') != all_scores:
+            self.stdout.write(self.style.WARNING('⚠️  Checkpoint d\'un autre mode (--all), ignoré'))
+            return None
+        
+        return checkpoint['last_id']
+
+    def write_checkpoint(self, path, last_id, all_scores):
+        """Enregistre le dernier id traité (écriture atomique)"""
+        tmp_path = path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps({
+            'last_id': last_id,
+            'all': all_scores,
+            'updated_at': timezone.now().isoformat(),
+        }))
+        tmp_path.replace(path)
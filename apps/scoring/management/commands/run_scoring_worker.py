@@ -0,0 +1,115 @@
+"""
+Worker de la file de scoring
+Usage: python manage.py run_scoring_worker [--batch-size 100] [--once]
+
+Les demandes ouvertes des clients modifiés sont remises en file (rescoring
+automatique, voir apps/scoring/jobs.py). Les tâches SCORE passent toujours
+en premier ; les tâches SHADOW (challengers) ne sont traitées que dans la
+limite de SCORING_SHADOW_CPU_SHARE. File vide : agrégation des
+histogrammes de dérive (voir apps/scoring/drift.py).
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from apps.scoring.challengers import ShadowBudget, run_shadow_jobs
+from apps.scoring.drift import aggregate_score_histograms
+from apps.scoring.jobs import claim_jobs, enqueue_dirty_demands, make_worker_id, release_stale_jobs, run_jobs
+from apps.scoring.models import ScoringJob
+
+
+class Command(BaseCommand):
+    help = 'Traite les tâches de scoring en attente, par lots'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Nombre de tâches réservées et scorées par lot (défaut: 100)',
+        )
+        
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=2.0,
+            help='Attente (secondes) quand la file est vide (défaut: 2)',
+        )
+        
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Vider la file puis s\'arrêter',
+        )
+        
+        parser.add_argument(
+            '--mode',
+            choices=['rules', 'model'],
+            default=None,
+            help='Grille de score ou modèle ML (défaut: settings.SCORING_MODE)',
+        )
+
+    def handle(self, *args, **options):
+        worker_id = make_worker_id()
+        batch_size = max(1, options['batch_size'])
+        
+        self.stdout.write(self.style.SUCCESS(f'=== WORKER DE SCORING ({worker_id}) ===\n'))
+        
+        released = release_stale_jobs()
+        if released:
+            self.stdout.write(self.style.WARNING(f'⚠️  {released} tâches abandonnées remises en attente'))
+        
+        budget = ShadowBudget()
+        processed = 0
+        failed = 0
+        started = time.perf_counter()
+        
+        try:
+            while True:
+                rescored = enqueue_dirty_demands()
+                if rescored:
+                    self.stdout.write(f'  🔄 {rescored} demandes à rescorer (clients modifiés)')
+                
+                jobs = claim_jobs(worker_id, batch_size)
+                
+                if jobs:
+                    result = run_jobs(jobs, mode=options['mode'])
+                    self.report(result)
+                    processed += result['count']
+                    failed += result['failed']
+                    continue
+                
+                if budget.allows():
+                    jobs = claim_jobs(worker_id, batch_size, kind='SHADOW')
+                    if jobs:
+                        result = budget.run(run_shadow_jobs, jobs)
+                        self.report(result, label='shadow')
+                        processed += result['count']
+                        failed += result['failed']
+                        continue
+                elif ScoringJob.objects.filter(kind='SHADOW', status='PENDING').exists():
+                    # Budget CPU du shadow épuisé : on attend le prochain créneau
+                    time.sleep(min(budget.remaining(), options['sleep']))
+                    continue
+                
+                # File vide : histogrammes de dérive mis à jour depuis l'historique
+                aggregated = aggregate_score_histograms()
+                if aggregated:
+                    self.stdout.write(f'  📊 {aggregated} calculs ajoutés aux histogrammes de dérive')
+                
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('\n⏹️  Arrêt demandé'))
+        
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'\n✅ Terminé: {processed} tâches traitées, {failed} erreurs en {elapsed:.1f}s'
+        ))
+    
+    def report(self, result, label='tâches'):
+        self.stdout.write(
+            f'  ✓ Lot de {result["count"]} {label} en {result["batch_ms"]:.0f} ms '
+            f'({result["done"]} succès, {result["failed"]} erreurs)'
+        )
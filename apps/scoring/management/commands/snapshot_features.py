@@ -0,0 +1,69 @@
+"""
+Instantané colonnaire (Parquet / Feather) des features et des étiquettes
+Usage: python manage.py snapshot_features [--format feather] [--output-dir feature_snapshots] [--full]
+"""
+
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from apps.scoring.training_data import SNAPSHOT_FORMATS, write_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Exporte les features des demandes scorées et leurs étiquettes en fichiers Parquet/Feather'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output-dir',
+            default=str(Path(settings.BASE_DIR) / 'feature_snapshots'),
+            help='Dossier de l\'instantané (défaut: feature_snapshots/)',
+        )
+
+        parser.add_argument(
+            '--format',
+            choices=SNAPSHOT_FORMATS,
+            default='parquet',
+            help='Format des fichiers (défaut: parquet ; feather pour la lecture en mémoire mappée)',
+        )
+
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=10000,
+            help='Lignes par fichier écrit (défaut: 10000)',
+        )
+
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Reconstruire tout l\'instantané au lieu d\'ajouter les nouvelles demandes et les demandes modifiées',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise CommandError('pyarrow est requis pour cet export (pip install pyarrow)')
+
+        self.stdout.write(self.style.SUCCESS('=== INSTANTANÉ DES FEATURES ===\n'))
+
+        def progress(rows):
+            self.stdout.write(f'  ✓ {rows} lignes écrites')
+
+        try:
+            manifest = write_snapshot(
+                options['output_dir'],
+                file_format=options['format'],
+                chunk_size=max(1, options['chunk_size']),
+                full=options['full'],
+                progress=progress,
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\n✅ {manifest["last_run_rows"]} lignes écrites, dont {manifest["last_run_updated"]} mises à jour '
+            f'({manifest["rows"]} au total, '
+            f'{len(manifest["parts"])} fichiers) dans {options["output_dir"]}'
+        ))
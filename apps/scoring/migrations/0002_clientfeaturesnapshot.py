@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scoring', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClientFeatureSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_payments', models.IntegerField(default=0)),
+                ('late_payments', models.IntegerField(default=0)),
+                ('default_payments', models.IntegerField(default=0)),
+                ('on_time_payments', models.IntegerField(default=0)),
+                ('sum_days_late', models.BigIntegerField(default=0)),
+                ('transaction_count', models.IntegerField(default=0)),
+                ('sum_balance_after', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('total_credits', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('total_debits', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('client', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='feature_snapshot', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Snapshot de features client',
+                'verbose_name_plural': 'Snapshots de features client',
+                'db_table': 'client_feature_snapshots',
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scoring', '0002_clientfeaturesnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Scorecard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.CharField(max_length=50, unique=True)),
+                ('definition', models.JSONField(help_text='Grille : seuils, points et facteurs par feature')),
+                ('is_active', models.BooleanField(default=False, help_text='Grille utilisée pour le scoring')),
+                ('description', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Grille de score',
+                'verbose_name_plural': 'Grilles de score',
+                'db_table': 'scorecards',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
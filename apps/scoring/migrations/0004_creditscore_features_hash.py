@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scoring', '0003_scorecard'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='creditscore',
+            name='features_hash',
+            field=models.CharField(blank=True, default='', max_length=64, verbose_name='Empreinte des features'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:36
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('demands', '0002_remove_creditdemand_submitted_at_and_more'),
+        ('scoring', '0004_creditscore_features_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoringJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('PENDING', 'En attente'), ('RUNNING', 'En cours'), ('DONE', 'Terminé'), ('FAILED', 'Échec')], default='PENDING', max_length=20)),
+                ('force', models.BooleanField(default=False, help_text='Rescorer même si les features sont inchangées')),
+                ('attempts', models.IntegerField(default=0)),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now, help_text='Pas de traitement avant cette date (backoff)')),
+                ('last_error', models.TextField(blank=True)),
+                ('locked_by', models.CharField(blank=True, max_length=100)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('timings', models.JSONField(blank=True, default=dict, help_text='Attente et durée du lot (ms)')),
+                ('demand', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='scoring_jobs', to='demands.creditdemand')),
+            ],
+            options={
+                'verbose_name': 'Tâche de scoring',
+                'verbose_name_plural': 'Tâches de scoring',
+                'db_table': 'scoring_jobs',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['status', 'run_after'], name='scoring_job_status_c18b83_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scoring', '0005_scoringjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='creditscore',
+            name='timings',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scoring', '0006_creditscore_timings'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoreHistogram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_version', models.CharField(max_length=50)),
+                ('day', models.DateField()),
+                ('feature', models.CharField(help_text="'score_value' ou nom de feature", max_length=50)),
+                ('counts', models.JSONField(default=list, help_text='Effectifs par classe (voir drift.DRIFT_BINS)')),
+                ('total', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Histogramme de score',
+                'verbose_name_plural': 'Histogrammes de score',
+                'db_table': 'score_histograms',
+                'ordering': ['-day', 'model_version', 'feature'],
+                'unique_together': {('model_version', 'day', 'feature')},
+            },
+        ),
+    ]
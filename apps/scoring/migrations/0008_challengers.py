@@ -0,0 +1,78 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('demands', '0002_remove_creditdemand_submitted_at_and_more'),
+        ('scoring', '0007_scorehistogram'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Challenger',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.CharField(help_text="Version de la grille (Scorecard) ou de l'artefact ML", max_length=50, unique=True)),
+                ('kind', models.CharField(choices=[('SCORECARD', 'Grille de score'), ('MODEL', 'Modèle ML')], default='SCORECARD', max_length=10)),
+                ('is_active', models.BooleanField(default=True)),
+                ('description', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Challenger',
+                'verbose_name_plural': 'Challengers',
+                'db_table': 'scoring_challengers',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ChallengerScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.CharField(max_length=50)),
+                ('score_value', models.SmallIntegerField()),
+                ('risk_level', models.CharField(max_length=20)),
+                ('ai_recommendation', models.CharField(max_length=20)),
+                ('champion_version', models.CharField(max_length=50)),
+                ('champion_score_value', models.SmallIntegerField()),
+                ('champion_risk_level', models.CharField(max_length=20)),
+                ('champion_recommendation', models.CharField(max_length=20)),
+                ('scored_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Score challenger',
+                'verbose_name_plural': 'Scores challenger',
+                'db_table': 'challenger_scores',
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name='scoringjob',
+            name='scoring_job_status_c18b83_idx',
+        ),
+        migrations.AddField(
+            model_name='scoringjob',
+            name='kind',
+            field=models.CharField(choices=[('SCORE', 'Calcul du score'), ('SHADOW', 'Scoring challenger (shadow)')], default='SCORE', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='scoringjob',
+            index=models.Index(fields=['status', 'kind', 'run_after'], name='scoring_job_status_ea143a_idx'),
+        ),
+        migrations.AddField(
+            model_name='challengerscore',
+            name='demand',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='challenger_scores', to='demands.creditdemand'),
+        ),
+        migrations.AddIndex(
+            model_name='challengerscore',
+            index=models.Index(fields=['version', 'scored_at'], name='challenger__version_cc054b_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='challengerscore',
+            unique_together={('demand', 'version')},
+        ),
+    ]
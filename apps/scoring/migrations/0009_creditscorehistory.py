@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:50
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('demands', '0002_remove_creditdemand_submitted_at_and_more'),
+        ('scoring', '0008_challengers'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScorePayload',
+            fields=[
+                ('hash', models.CharField(help_text='SHA-256 du JSON canonique', max_length=64, primary_key=True, serialize=False)),
+                ('data', models.JSONField()),
+            ],
+            options={
+                'verbose_name': 'Contenu de score',
+                'verbose_name_plural': 'Contenus de score',
+                'db_table': 'score_payloads',
+            },
+        ),
+        migrations.CreateModel(
+            name='CreditScoreHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score_value', models.IntegerField()),
+                ('risk_level', models.CharField(choices=[('LOW', 'Risque Faible'), ('MEDIUM', 'Risque Modéré'), ('HIGH', 'Risque Élevé'), ('VERY_HIGH', 'Risque Très Élevé')], max_length=20)),
+                ('ai_recommendation', models.CharField(max_length=20)),
+                ('confidence_level', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('model_version', models.CharField(max_length=50)),
+                ('features_hash', models.CharField(max_length=64)),
+                ('calculated_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('demand', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='score_history', to='demands.creditdemand')),
+                ('factors_negative', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='scoring.scorepayload')),
+                ('factors_positive', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='scoring.scorepayload')),
+                ('features_used', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='scoring.scorepayload')),
+                ('shap_values', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='scoring.scorepayload')),
+            ],
+            options={
+                'verbose_name': 'Historique de score',
+                'verbose_name_plural': 'Historique des scores',
+                'db_table': 'credit_score_history',
+                'ordering': ['-calculated_at', '-id'],
+                'indexes': [models.Index(fields=['demand', 'calculated_at'], name='credit_scor_demand__c44405_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:51
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scoring', '0009_creditscorehistory'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoringDirtyClient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('first_marked_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('marked_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('client', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Client à rescorer',
+                'verbose_name_plural': 'Clients à rescorer',
+                'db_table': 'scoring_dirty_clients',
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scoring', '0010_scoringdirtyclient'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConfigVersion',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('version', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Version de configuration',
+                'verbose_name_plural': 'Versions de configuration',
+                'db_table': 'config_versions',
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:23
+
+from django.db import migrations, models
+
+
+def start_after_existing_history(apps, schema_editor):
+    """L'historique existant est déjà compté dans les histogrammes (ancienne écriture synchrone)"""
+    CreditScoreHistory = apps.get_model('scoring', 'CreditScoreHistory')
+    DriftCursor = apps.get_model('scoring', 'DriftCursor')
+    last = CreditScoreHistory.objects.order_by('-id').values_list('id', flat=True).first() or 0
+    DriftCursor.objects.create(name='score_histograms', last_id=last)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scoring', '0011_configversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DriftCursor',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('last_id', models.BigIntegerField(default=0, help_text='Dernier calcul historisé déjà agrégé')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Curseur de dérive',
+                'verbose_name_plural': 'Curseurs de dérive',
+                'db_table': 'drift_cursors',
+            },
+        ),
+        migrations.RunPython(start_after_existing_history, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scoring', '0012_driftcursor'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clientfeaturesnapshot',
+            name='behaviour',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='clientfeaturesnapshot',
+            name='behaviour_as_of',
+            field=models.DateField(blank=True, help_text='Vide : à recalculer (transaction modifiée)', null=True),
+        ),
+    ]
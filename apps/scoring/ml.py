@@ -0,0 +1,108 @@
+"""
+Registre des modèles ML (scikit-learn / xgboost) pour le scoring
+
+Les artefacts sont des fichiers joblib déposés dans SCORING_MODELS_DIR, un
+fichier par version : {model_version}.joblib. Un artefact contient soit
+l'estimateur entraîné, soit un dictionnaire :
+    {'model': estimateur, 'features': ['monthly_income', ...]}
+
+Chaque artefact est chargé au premier usage puis gardé en mémoire pour la
+durée de vie du processus (worker) : les appels suivants ne touchent plus
+le disque. Un artefact absent n'est pas mémorisé : déposé plus tard, il est
+pris en compte sans redémarrer le worker.
+"""
+import threading
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+
+class ScoringModel:
+    """Un artefact chargé : estimateur, liste des features et version"""
+
+    def __init__(self, version, estimator, feature_names):
+        self.version = version
+        self.estimator = estimator
+        self.feature_names = list(feature_names)
+
+    def predict_default_proba(self, features_list):
+        """Probabilité de défaut (classe 1) pour N lignes de features, en un appel"""
+        import pandas as pd
+
+        frame = pd.DataFrame.from_records(
+            [[features[name] for name in self.feature_names] for features in features_list],
+            columns=self.feature_names,
+        ).astype(np.float64)
+        return self.estimator.predict_proba(frame)[:, 1]
+
+    def predict_scores(self, features_list):
+        """Score (0-1000) : probabilité de bon remboursement ramenée sur 1000"""
+        proba = self.predict_default_proba(features_list)
+        return np.rint((1.0 - proba) * 1000).astype(np.int64)
+
+
+def load_model(path, version):
+    """Charge un artefact joblib"""
+    import joblib
+
+    artifact = joblib.load(path)
+    if isinstance(artifact, dict):
+        estimator = artifact['model']
+        feature_names = artifact.get('features')
+    else:
+        estimator = artifact
+        feature_names = None
+
+    if feature_names is None:
+        feature_names = getattr(estimator, 'feature_names_in_', None)
+    if feature_names is None:
+        raise ValueError(f"Artefact {path.name}: liste des features introuvable")
+
+    return ScoringModel(version, estimator, feature_names)
+
+
+class ModelRegistry:
+    """Modèles chargés une seule fois par processus, indexés par model_version"""
+
+    def __init__(self):
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def artifact_path(self, version):
+        return Path(settings.SCORING_MODELS_DIR) / f'{version}.joblib'
+
+    def get(self, version):
+        """Modèle de cette version, ou None si aucun artefact n'existe (encore)"""
+        model = self._models.get(version)
+        if model is not None:
+            return model
+
+        with self._lock:
+            if version not in self._models:
+                path = self.artifact_path(version)
+                if not path.exists():
+                    return None
+                self._models[version] = load_model(path, version)
+        return self._models[version]
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+
+
+registry = ModelRegistry()
+
+
+def get_scoring_model(mode=None):
+    """
+    Modèle à utiliser pour le mode de scoring demandé.
+
+    mode='model' : artefact de la version SCORING_MODEL_VERSION ; None s'il
+    n'existe pas, le scoring retombe alors sur la grille de score.
+    mode='rules' (défaut de SCORING_MODE) : toujours None.
+    """
+    mode = mode or settings.SCORING_MODE
+    if mode != 'model' or not settings.SCORING_MODEL_VERSION:
+        return None
+    return registry.get(settings.SCORING_MODEL_VERSION)
@@ -1,6 +1,8 @@
 
 from django.db import models
+from django.utils import timezone
 from apps.demands.models import CreditDemand
+from .scorecard import compile_scorecard
 
 class CreditScore(models.Model):
     RISK_LEVEL_CHOICES = [
@@ -21,6 +23,7 @@ class CreditScore(models.Model):
     # Détails techniques
     model_version = models.CharField(max_length=50, default='v1.0')
     features_used = models.JSONField(default=dict, verbose_name="Features utilisées")
+    features_hash = models.CharField(max_length=64, blank=True, default='', verbose_name="Empreinte des features")
     shap_values = models.JSONField(default=dict, verbose_name="Valeurs SHAP")
     
     # Recommandation IA
@@ -31,6 +34,9 @@ class CreditScore(models.Model):
     ])
     confidence_level = models.DecimalField(max_digits=5, decimal_places=2, verbose_name="Niveau de confiance (%)")
     
+    # Mesures du calcul (SCORING_STORE_TIMINGS) : durée et requêtes par étape
+    timings = models.JSONField(default=dict, blank=True)
+    
     calculated_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
@@ -81,4 +87,284 @@ class Transaction(models.Model):
         ordering = ['-transaction_date']
     
     def __str__(self):
-        return f"{self.transaction_type} - {self.amount} FCFA - {self.transaction_date}"
\ No newline at end of file
+        return f"{self.transaction_type} - {self.amount} FCFA - {self.transaction_date}"
+
+
+class ClientFeatureSnapshot(models.Model):
+    """Agrégats d'historique par client, maintenus de façon incrémentale (feature store)"""
+    client = models.OneToOneField('accounts.User', on_delete=models.CASCADE, related_name='feature_snapshot')
+    
+    # Historique paiements
+    total_payments = models.IntegerField(default=0)
+    late_payments = models.IntegerField(default=0)
+    default_payments = models.IntegerField(default=0)
+    on_time_payments = models.IntegerField(default=0)
+    sum_days_late = models.BigIntegerField(default=0)
+    
+    # Transactions bancaires
+    transaction_count = models.IntegerField(default=0)
+    sum_balance_after = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    total_credits = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    total_debits = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    
+    # Features sur fenêtres glissantes (behaviour.py), valables pour la date behaviour_as_of
+    behaviour = models.JSONField(default=dict, blank=True)
+    behaviour_as_of = models.DateField(null=True, blank=True, help_text="Vide : à recalculer (transaction modifiée)")
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'client_feature_snapshots'
+        verbose_name = 'Snapshot de features client'
+        verbose_name_plural = 'Snapshots de features client'
+    
+    def __str__(self):
+        return f"Snapshot client #{self.client_id} - {self.total_payments} paiements, {self.transaction_count} transactions"
+    
+    @property
+    def avg_days_late(self):
+        """Retard moyen (jours)"""
+        if self.total_payments > 0:
+            return self.sum_days_late / self.total_payments
+        return None
+    
+    @property
+    def avg_balance(self):
+        """Solde moyen après transaction"""
+        if self.transaction_count > 0:
+            return self.sum_balance_after / self.transaction_count
+        return None
+
+
+
+class Scorecard(models.Model):
+    """Grille de score versionnée : seuils, points et facteurs par feature"""
+    version = models.CharField(max_length=50, unique=True)
+    definition = models.JSONField(help_text="Grille : seuils, points et facteurs par feature")
+    is_active = models.BooleanField(default=False, help_text="Grille utilisée pour le scoring")
+    description = models.TextField(blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'scorecards'
+        ordering = ['-created_at']
+        verbose_name = 'Grille de score'
+        verbose_name_plural = 'Grilles de score'
+    
+    def __str__(self):
+        return f"Grille {self.version}{' (active)' if self.is_active else ''}"
+    
+    def clean(self):
+        """Validation : la grille doit se compiler"""
+        super().clean()
+        compile_scorecard(self.definition, version=self.version)
+    
+    def save(self, *args, **kwargs):
+        # Une seule grille active à la fois
+        if self.is_active:
+            Scorecard.objects.filter(is_active=True).exclude(pk=self.pk).update(is_active=False)
+        super().save(*args, **kwargs)
+
+
+class ScoringJob(models.Model):
+    """File d'attente locale des calculs de score (traitée par run_scoring_worker)"""
+    STATUS_CHOICES = [
+        ('PENDING', 'En attente'),
+        ('RUNNING', 'En cours'),
+        ('DONE', 'Terminé'),
+        ('FAILED', 'Échec'),
+    ]
+    
+    KIND_CHOICES = [
+        ('SCORE', 'Calcul du score'),
+        ('SHADOW', 'Scoring challenger (shadow)'),
+    ]
+    
+    demand = models.ForeignKey(CreditDemand, on_delete=models.CASCADE, related_name='scoring_jobs')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, default='SCORE')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    force = models.BooleanField(default=False, help_text="Rescorer même si les features sont inchangées")
+    
+    # Reprise sur erreur
+    attempts = models.IntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now, help_text="Pas de traitement avant cette date (backoff)")
+    last_error = models.TextField(blank=True)
+    
+    # Réservation par un worker
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    
+    # Mesures
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    timings = models.JSONField(default=dict, blank=True, help_text="Attente et durée du lot (ms)")
+    
+    class Meta:
+        db_table = 'scoring_jobs'
+        ordering = ['id']
+        indexes = [models.Index(fields=['status', 'kind', 'run_after'])]
+        verbose_name = 'Tâche de scoring'
+        verbose_name_plural = 'Tâches de scoring'
+    
+    def __str__(self):
+        return f"Scoring demande #{self.demand_id} - {self.status}"
+
+
+class ScoreHistogram(models.Model):
+    """Histogramme journalier à classes fixes d'un score ou d'une feature (suivi de dérive)"""
+    model_version = models.CharField(max_length=50)
+    day = models.DateField()
+    feature = models.CharField(max_length=50, help_text="'score_value' ou nom de feature")
+    counts = models.JSONField(default=list, help_text="Effectifs par classe (voir drift.DRIFT_BINS)")
+    total = models.IntegerField(default=0)
+    
+    class Meta:
+        db_table = 'score_histograms'
+        unique_together = ['model_version', 'day', 'feature']
+        ordering = ['-day', 'model_version', 'feature']
+        verbose_name = 'Histogramme de score'
+        verbose_name_plural = 'Histogrammes de score'
+    
+    def __str__(self):
+        return f"{self.feature} - {self.model_version} - {self.day} ({self.total})"
+
+
+class Challenger(models.Model):
+    """Version challenger (grille ou modèle ML) scorée en shadow à côté du champion"""
+    KIND_CHOICES = [
+        ('SCORECARD', 'Grille de score'),
+        ('MODEL', 'Modèle ML'),
+    ]
+    
+    version = models.CharField(max_length=50, unique=True, help_text="Version de la grille (Scorecard) ou de l'artefact ML")
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, default='SCORECARD')
+    is_active = models.BooleanField(default=True)
+    description = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'scoring_challengers'
+        ordering = ['-created_at']
+        verbose_name = 'Challenger'
+        verbose_name_plural = 'Challengers'
+    
+    def __str__(self):
+        return f"Challenger {self.version} ({self.get_kind_display()})"
+
+
+class ChallengerScore(models.Model):
+    """Résultat shadow d'un challenger pour une demande, avec le champion au même instant"""
+    demand = models.ForeignKey(CreditDemand, on_delete=models.CASCADE, related_name='challenger_scores')
+    version = models.CharField(max_length=50)
+    
+    score_value = models.SmallIntegerField()
+    risk_level = models.CharField(max_length=20)
+    ai_recommendation = models.CharField(max_length=20)
+    
+    champion_version = models.CharField(max_length=50)
+    champion_score_value = models.SmallIntegerField()
+    champion_risk_level = models.CharField(max_length=20)
+    champion_recommendation = models.CharField(max_length=20)
+    
+    scored_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'challenger_scores'
+        unique_together = ['demand', 'version']
+        indexes = [models.Index(fields=['version', 'scored_at'])]
+        verbose_name = 'Score challenger'
+        verbose_name_plural = 'Scores challenger'
+    
+    def __str__(self):
+        return f"Challenger {self.version} - Demande #{self.demand_id}: {self.score_value} (champion {self.champion_score_value})"
+
+
+class ScorePayload(models.Model):
+    """Contenu JSON partagé de l'historique (facteurs, features), stocké une seule fois par empreinte"""
+    hash = models.CharField(max_length=64, primary_key=True, help_text="SHA-256 du JSON canonique")
+    data = models.JSONField()
+    
+    class Meta:
+        db_table = 'score_payloads'
+        verbose_name = 'Contenu de score'
+        verbose_name_plural = 'Contenus de score'
+    
+    def __str__(self):
+        return self.hash[:12]
+
+
+class CreditScoreHistory(models.Model):
+    """Historique en ajout seul : une ligne par calcul de score écrit"""
+    demand = models.ForeignKey(CreditDemand, on_delete=models.CASCADE, related_name='score_history')
+    score_value = models.IntegerField()
+    risk_level = models.CharField(max_length=20, choices=CreditScore.RISK_LEVEL_CHOICES)
+    ai_recommendation = models.CharField(max_length=20)
+    confidence_level = models.DecimalField(max_digits=5, decimal_places=2)
+    model_version = models.CharField(max_length=50)
+    features_hash = models.CharField(max_length=64)
+    
+    # JSON volumineux et répétitifs : référencés par empreinte
+    factors_positive = models.ForeignKey(ScorePayload, on_delete=models.PROTECT, related_name='+')
+    factors_negative = models.ForeignKey(ScorePayload, on_delete=models.PROTECT, related_name='+')
+    features_used = models.ForeignKey(ScorePayload, on_delete=models.PROTECT, related_name='+')
+    shap_values = models.ForeignKey(ScorePayload, on_delete=models.PROTECT, related_name='+')
+    
+    calculated_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        db_table = 'credit_score_history'
+        ordering = ['-calculated_at', '-id']
+        indexes = [models.Index(fields=['demand', 'calculated_at'])]
+        verbose_name = 'Historique de score'
+        verbose_name_plural = 'Historique des scores'
+    
+    def __str__(self):
+        return f"Score {self.score_value} ({self.model_version}) - Demande #{self.demand_id} - {self.calculated_at}"
+
+
+class ScoringDirtyClient(models.Model):
+    """Client dont le profil ou l'historique a changé depuis le dernier rescoring de ses demandes ouvertes"""
+    client = models.OneToOneField('accounts.User', on_delete=models.CASCADE, related_name='+')
+    first_marked_at = models.DateTimeField(default=timezone.now)
+    marked_at = models.DateTimeField(default=timezone.now, db_index=True)
+    
+    class Meta:
+        db_table = 'scoring_dirty_clients'
+        verbose_name = 'Client à rescorer'
+        verbose_name_plural = 'Clients à rescorer'
+    
+    def __str__(self):
+        return f"Client #{self.client_id} modifié le {self.marked_at}"
+
+
+class ConfigVersion(models.Model):
+    """Compteur de version d'une configuration (grilles, challengers, règles), partagé par tous les processus"""
+    name = models.CharField(max_length=50, primary_key=True)
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'config_versions'
+        verbose_name = 'Version de configuration'
+        verbose_name_plural = 'Versions de configuration'
+    
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+
+class DriftCursor(models.Model):
+    """Position de l'agrégation des histogrammes de dérive dans credit_score_history"""
+    name = models.CharField(max_length=50, primary_key=True)
+    last_id = models.BigIntegerField(default=0, help_text="Dernier calcul historisé déjà agrégé")
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'drift_cursors'
+        verbose_name = 'Curseur de dérive'
+        verbose_name_plural = 'Curseurs de dérive'
+    
+    def __str__(self):
+        return f"{self.name} (historique #{self.last_id})"
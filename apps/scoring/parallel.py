@@ -0,0 +1,58 @@
+"""
+Recalcul des scores en parallèle, par tranches d'ids de demandes
+
+Les fonctions de ce module sont exécutées dans les processus du pool : elles
+n'importent les modèles qu'après l'initialisation de Django, ce qui reste
+compatible avec le démarrage des processus par "spawn" (Windows).
+"""
+import time
+
+
+def init_worker():
+    """Initialisation d'un processus du pool"""
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+
+    # Ne jamais réutiliser la connexion héritée du processus parent (fork)
+    from django.db import connections
+    connections.close_all()
+
+
+def score_demand_range(task):
+    """
+    Score toutes les demandes dont l'id est dans [first_id, last_id].
+
+    Retourne un résumé de la tranche (nombre de demandes, erreurs, durée).
+    """
+    from apps.demands.models import CreditDemand
+    from .services import calculate_scores_or_errors
+
+    first_id, last_id, only_missing, force, mode = task
+    started = time.perf_counter()
+
+    demands = CreditDemand.objects.exclude(status='DRAFT').filter(id__gte=first_id, id__lte=last_id)
+    if only_missing:
+        demands = demands.filter(score__isnull=True)
+    demands = list(demands.select_related('client').order_by('id'))
+
+    # Repli demande par demande pour isoler les lignes en erreur
+    _, errors = calculate_scores_or_errors(demands, force=force, mode=mode)
+
+    return {
+        'first_id': first_id,
+        'last_id': last_id,
+        'count': len(demands),
+        'errors': [{'demand_id': demand_id, 'error': error} for demand_id, error in errors.items()],
+        'elapsed': time.perf_counter() - started,
+    }
+
+
+def split_id_range(demand_ids, chunk_size):
+    """Découpe une liste d'ids triés en tranches contiguës [first_id, last_id]"""
+    return [
+        (demand_ids[start], demand_ids[min(start + chunk_size, len(demand_ids)) - 1])
+        for start in range(0, len(demand_ids), chunk_size)
+    ]
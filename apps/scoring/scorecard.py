@@ -0,0 +1,563 @@
+"""
+Grille de score déclarative (scorecard)
+
+La grille est une donnée versionnée : pour chaque feature, des seuils
+(breakpoints), les points de chaque tranche et les facteurs explicatifs
+associés. Au chargement, elle est compilée en tableaux triés parcourus par
+recherche dichotomique (np.searchsorted en batch, bisect en scalaire), de
+sorte que score, niveau de risque et facteurs sortent d'une seule passe.
+
+Format d'une tranche numérique :
+    {'breakpoints': [b1, ..., bk], 'values': [v0, ..., vk], 'right': False}
+    - values[0] s'applique à x < b1, values[i] à bi <= x < bi+1
+    - right=True : la valeur égale au seuil reste dans la tranche basse
+      (bi < x <= bi+1) ; right peut aussi être une liste, seuil par seuil.
+
+Format d'une feature catégorielle :
+    {'categories': {'VALEUR': points, ...}, 'default': points}
+
+Clé optionnelle d'une feature : 'baseline' (défaut 0), points du profil de
+référence. La contribution d'une feature à un score (valeurs stockées dans
+CreditScore.shap_values) vaut ses points moins cette référence.
+La grille par défaut ne fixe aucune référence : ses points sont déjà
+centrés sur base_score (0 = sans effet), les contributions sont donc les
+points eux-mêmes et leur somme vaut score - base_score avant bornage
+(min_score, max_score).
+"""
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+from django.core.exceptions import ValidationError
+
+from .history import content_hash
+from .versions import VersionedCache, bump_config_version
+
+
+# ============================================
+# Mise en forme des valeurs des facteurs
+# ============================================
+
+VALUE_FORMATTERS = {
+    'fcfa': lambda value, features: f"{value:,.0f} FCFA",
+    'fcfa_average': lambda value, features: f"{value:,.0f} FCFA en moyenne",
+    'years': lambda value, features: f"{value:.1f} années",
+    'years_short': lambda value, features: f"{value:.1f} année(s)",
+    'percent': lambda value, features: f"{value:.1f}%",
+    'income_share': lambda value, features: f"{value:.1f}% du revenu disponible",
+    'on_time_rate': lambda value, features: f"{value:.1f}% à temps",
+    'on_time_rate_count': lambda value, features: f"{value:.1f}% à temps ({features['total_payments']} paiements)",
+    'defaults': lambda value, features: f"{value} défaut(s)",
+    'months': lambda value, features: f"{value} mois",
+    'months_years': lambda value, features: f"{value} mois ({value//12} ans)",
+}
+
+
+# ============================================
+# Grille par défaut (v1.1-advanced)
+# ============================================
+
+DEFAULT_SCORECARD = {
+    'version': 'v1.1-advanced',
+    'base_score': 500,
+    'min_score': 0,
+    'max_score': 1000,
+    'risk_levels': {
+        'breakpoints': [350, 550, 750],
+        'values': ['VERY_HIGH', 'HIGH', 'MEDIUM', 'LOW'],
+    },
+    'features': [
+        # REVENUS ET STABILITÉ
+        {
+            'feature': 'monthly_income',
+            'points': {
+                'breakpoints': [75000, 150000, 300000, 500000, 1000000],
+                'values': [-50, 30, 60, 90, 120, 150],
+            },
+            'factors': {
+                'breakpoints': [100000, 300000, 500000],
+                'values': [
+                    {'factor': 'Revenu mensuel insuffisant', 'impact': -100, 'format': 'fcfa'},
+                    None,
+                    {'factor': 'Bon revenu mensuel', 'impact': 90, 'format': 'fcfa'},
+                    {'factor': 'Revenu mensuel très élevé', 'impact': 120, 'format': 'fcfa'},
+                ],
+            },
+        },
+        {
+            'feature': 'seniority_years',
+            'points': {
+                'breakpoints': [1, 3, 5, 10],
+                'values': [-30, 20, 40, 60, 80],
+            },
+            'factors': {
+                'breakpoints': [1, 5],
+                'values': [
+                    {'factor': 'Ancienneté professionnelle faible', 'impact': -80, 'format': 'years_short'},
+                    None,
+                    {'factor': 'Excellente stabilité professionnelle', 'impact': 60, 'format': 'years'},
+                ],
+            },
+        },
+        # ENDETTEMENT
+        {
+            'feature': 'debt_ratio',
+            'points': {
+                'breakpoints': [15, 25, 33, 40, 50],
+                'values': [125, 100, 50, -50, -100, -200],
+            },
+            'factors': {
+                'breakpoints': [25, 33, 40],
+                'right': [False, True, True],
+                'values': [
+                    {'factor': 'Excellent taux d\'endettement', 'impact': 100, 'format': 'percent'},
+                    None,
+                    {'factor': 'Taux d\'endettement élevé', 'impact': -50, 'format': 'percent'},
+                    {'factor': 'Taux d\'endettement très élevé', 'impact': -200, 'format': 'percent'},
+                ],
+            },
+        },
+        # HISTORIQUE PAIEMENTS
+        {
+            'feature': 'on_time_rate',
+            # Sans historique (total_payments = 0), seul 'otherwise' s'applique
+            'when_positive': 'total_payments',
+            'otherwise': -50,
+            'points': {
+                'breakpoints': [60, 75, 85, 95],
+                'values': [-150, -50, 50, 100, 150],
+            },
+            'factors': {
+                'breakpoints': [75, 95],
+                'values': [
+                    {'factor': 'Historique de retards fréquents', 'impact': -150, 'format': 'on_time_rate'},
+                    None,
+                    {'factor': 'Excellent historique de paiements', 'impact': 150, 'format': 'on_time_rate_count'},
+                ],
+            },
+        },
+        {
+            'feature': 'default_payments',
+            'points': {
+                'breakpoints': [1, 2, 3],
+                'values': [0, -200, -300, -400],
+            },
+            'factors': {
+                'breakpoints': [0],
+                'right': True,
+                'values': [
+                    None,
+                    {'factor': 'Historique de défauts de paiement', 'impact_per_unit': -200, 'format': 'defaults'},
+                ],
+            },
+        },
+        # ANCIENNETÉ BANQUE
+        {
+            'feature': 'bank_seniority_months',
+            'points': {
+                'breakpoints': [12, 24, 36, 60],
+                'values': [-20, 15, 30, 45, 60],
+            },
+            'factors': {
+                'breakpoints': [12, 36],
+                'values': [
+                    {'factor': 'Relation bancaire récente', 'impact': -20, 'format': 'months'},
+                    None,
+                    {'factor': 'Client fidèle de longue date', 'impact': 45, 'format': 'months_years'},
+                ],
+            },
+        },
+        # CAPACITÉ DE PAIEMENT
+        {
+            'feature': 'payment_capacity',
+            'points': {
+                'breakpoints': [20, 30, 40, 60],
+                'values': [80, 50, 20, -30, -100],
+            },
+            'factors': {
+                'breakpoints': [30, 60],
+                'right': [False, True],
+                'values': [
+                    {'factor': 'Excellente capacité de remboursement', 'impact': 50, 'format': 'income_share'},
+                    None,
+                    {'factor': 'Capacité de remboursement limitée', 'impact': -100, 'format': 'income_share'},
+                ],
+            },
+        },
+        # STATUT EMPLOI
+        {
+            'feature': 'employment_status',
+            'points': {
+                'categories': {'CIVIL_SERVANT': 50, 'EMPLOYEE': 30, 'SELF_EMPLOYED': 10},
+                'default': -100,
+            },
+            'factors': {
+                'categories': {
+                    'CIVIL_SERVANT': {'factor': 'Statut fonctionnaire (stabilité)', 'impact': 50, 'value': 'Fonctionnaire'},
+                },
+                'default': None,
+            },
+        },
+        # COMPORTEMENT BANCAIRE
+        {
+            'feature': 'avg_balance',
+            'points': {
+                'breakpoints': [200000, 500000, 1000000],
+                'right': True,
+                'values': [0, 15, 25, 40],
+            },
+            'factors': {
+                'breakpoints': [500000],
+                'right': True,
+                'values': [
+                    None,
+                    {'factor': 'Solde bancaire confortable', 'impact': 25, 'format': 'fcfa_average'},
+                ],
+            },
+        },
+        {
+            'feature': 'avg_days_late',
+            'points': {
+                'breakpoints': [7, 15, 30],
+                'right': True,
+                'values': [0, -20, -50, -100],
+            },
+        },
+        # CARACTÉRISTIQUES DU PRÊT
+        {
+            'feature': 'loan_to_income_ratio',
+            'points': {
+                'breakpoints': [0.2, 0.4, 0.6, 0.8],
+                'values': [40, 20, 0, -30, -80],
+            },
+        },
+        {
+            'feature': 'amount_to_annual_income',
+            'points': {
+                'breakpoints': [0.5, 1, 2, 4],
+                'values': [30, 15, 0, -40, -100],
+            },
+        },
+        {
+            'feature': 'credit_type',
+            'points': {
+                'categories': {'REAL_ESTATE': 20, 'AUTO': 10},
+                'default': 0,
+            },
+        },
+        # ÂGE : 30-50 ans inclus, 25-30 et ]50-55]
+        {
+            'feature': 'age',
+            'points': {
+                'breakpoints': [25, 30, 50, 55, 60],
+                'right': [False, False, True, True, True],
+                'values': [-30, 10, 20, 10, 0, -40],
+            },
+        },
+        # CHARGES FAMILIALES
+        {
+            'feature': 'dependents',
+            'points': {
+                'breakpoints': [0, 1, 3, 5],
+                'values': [0, 10, 0, -20, -40],
+            },
+        },
+    ],
+}
+
+
+# ============================================
+# Compilation
+# ============================================
+
+class BandTable:
+    """Tranches numériques triées, recherche dichotomique"""
+
+    def __init__(self, breakpoints, values, right=False):
+        if isinstance(right, bool):
+            right = [right] * len(breakpoints)
+
+        if len(values) != len(breakpoints) + 1:
+            raise ValidationError(f"{len(breakpoints)} seuils exigent {len(breakpoints) + 1} valeurs")
+        if len(right) != len(breakpoints):
+            raise ValidationError("'right' doit avoir autant d'éléments que 'breakpoints'")
+        if any(a >= b for a, b in zip(breakpoints, breakpoints[1:])):
+            raise ValidationError("Les seuils doivent être strictement croissants")
+
+        self.breakpoints = [float(b) for b in breakpoints]
+        self.values = list(values)
+
+        # Seuils dont la valeur égale bascule dans la tranche haute (>=)
+        self.lower_inclusive = [b for b, r in zip(self.breakpoints, right) if not r]
+
+        self._breakpoints_array = np.array(self.breakpoints, dtype=np.float64)
+        self._lower_inclusive_array = np.array(self.lower_inclusive, dtype=np.float64)
+
+    def index(self, x):
+        """Indice de tranche pour une valeur (bisect)"""
+        idx = bisect_left(self.breakpoints, x)
+        idx += bisect_right(self.lower_inclusive, x) - bisect_left(self.lower_inclusive, x)
+        return idx
+
+    def indices(self, column):
+        """Indices de tranche pour une colonne (np.searchsorted)"""
+        idx = np.searchsorted(self._breakpoints_array, column, side='left')
+        if len(self._lower_inclusive_array):
+            idx += (
+                np.searchsorted(self._lower_inclusive_array, column, side='right')
+                - np.searchsorted(self._lower_inclusive_array, column, side='left')
+            )
+        return idx
+
+
+class CategoryTable:
+    """Table de correspondance pour une feature catégorielle"""
+
+    def __init__(self, categories, default):
+        self.categories = dict(categories)
+        self.default = default
+        self.values = list(self.categories.values()) + [default]
+        self._codes = {category: i for i, category in enumerate(self.categories)}
+
+    def index(self, x):
+        return self._codes.get(x, len(self.values) - 1)
+
+    def indices(self, column):
+        uniques, inverse = np.unique(column.astype(str), return_inverse=True)
+        codes = np.array([self.index(value) for value in uniques], dtype=np.int64)
+        return codes[inverse]
+
+
+def build_table(spec):
+    """Construit la table (numérique ou catégorielle) décrite par spec"""
+    if 'categories' in spec:
+        return CategoryTable(spec['categories'], spec.get('default'))
+    return BandTable(spec['breakpoints'], spec['values'], spec.get('right', False))
+
+
+class CompiledFeature:
+    """Une ligne de la grille : points et facteurs d'une feature"""
+
+    def __init__(self, spec):
+        self.name = spec['feature']
+        self.categorical = 'categories' in spec['points']
+        self.points_table = build_table(spec['points'])
+        self.points = np.array(self.points_table.values, dtype=np.int64)
+        self.factors_table = build_table(spec['factors']) if spec.get('factors') else None
+        self.when_positive = spec.get('when_positive')
+        self.otherwise = int(spec.get('otherwise', 0))
+        # Points du profil de référence : les contributions sont relatives à cette valeur
+        self.baseline = int(spec.get('baseline', 0))
+
+        if self.factors_table is not None:
+            for label in self.factors_table.values:
+                if label and 'value' not in label and label.get('format') not in VALUE_FORMATTERS:
+                    raise ValidationError(f"{self.name}: format inconnu '{label.get('format')}'")
+
+    def column(self, features_list):
+        dtype = object if self.categorical else np.float64
+        return np.array([features[self.name] for features in features_list], dtype=dtype)
+
+
+class CompiledScorecard:
+    """Grille compilée : évaluation scalaire (bisect) et batch (searchsorted)"""
+
+    def __init__(self, definition, version=None):
+        self.version = version or definition.get('version', 'custom')
+        self.base_score = int(definition.get('base_score', 500))
+        self.min_score = int(definition.get('min_score', 0))
+        self.max_score = int(definition.get('max_score', 1000))
+        self.risk_table = BandTable(
+            definition['risk_levels']['breakpoints'],
+            definition['risk_levels']['values'],
+            definition['risk_levels'].get('right', False),
+        )
+        self.features = [CompiledFeature(spec) for spec in definition['features']]
+        self.feature_names = [feature.name for feature in self.features]
+        self.baselines = np.array([feature.baseline for feature in self.features], dtype=np.int64)
+        # Empreinte de la définition : une grille modifiée sans changer de version n'a pas la même
+        self.digest = content_hash(definition)
+
+    # ---------- scalaire ----------
+
+    def _applies(self, feature, features):
+        return feature.when_positive is None or features[feature.when_positive] > 0
+
+    def score(self, features):
+        """Score (0-1000) d'une ligne de features"""
+        score = self.base_score
+        for feature in self.features:
+            if self._applies(feature, features):
+                score += int(feature.points[feature.points_table.index(features[feature.name])])
+            else:
+                score += feature.otherwise
+        return max(self.min_score, min(self.max_score, int(score)))
+
+    def risk_level(self, score):
+        """Niveau de risque d'un score"""
+        return self.risk_table.values[self.risk_table.index(score)]
+
+    def factors(self, features):
+        """Facteurs positifs et négatifs d'une ligne de features"""
+        positive = []
+        negative = []
+        for feature in self.features:
+            if feature.factors_table is None or not self._applies(feature, features):
+                continue
+            label = feature.factors_table.values[feature.factors_table.index(features[feature.name])]
+            self._add_factor(label, features[feature.name], features, positive, negative)
+        return positive, negative
+
+    def scoring_key(self, features):
+        """
+        Ce dont dépendent score, niveau de risque et facteurs d'une ligne :
+        définition de la grille (points, seuils, score de base), tranche de
+        points de chaque feature (None si la feature ne s'applique pas) et
+        facteurs produits. Deux lignes de même clé ont le même résultat,
+        même si leurs valeurs brutes diffèrent.
+        """
+        bands = [
+            feature.points_table.index(features[feature.name]) if self._applies(feature, features) else None
+            for feature in self.features
+        ]
+        positive, negative = self.factors(features)
+        return {
+            'definition': self.digest,
+            'bands': bands,
+            'factors_positive': positive,
+            'factors_negative': negative,
+        }
+
+    def _add_factor(self, label, value, features, positive, negative):
+        if not label:
+            return
+
+        if 'impact_per_unit' in label:
+            impact = int(value * label['impact_per_unit'])
+        else:
+            impact = label['impact']
+
+        factor = {
+            'factor': label['factor'],
+            'value': label['value'] if 'value' in label else VALUE_FORMATTERS[label['format']](value, features),
+            'impact': impact,
+        }
+        (positive if impact > 0 else negative).append(factor)
+
+    # ---------- batch ----------
+
+    def risk_levels(self, scores):
+        """Niveaux de risque d'un tableau de scores"""
+        risk_values = np.array(self.risk_table.values, dtype=object)
+        return risk_values[self.risk_table.indices(scores)]
+
+    def evaluate(self, features_list, with_factors=True):
+        """
+        Évalue N lignes en une passe : une recherche dichotomique vectorisée
+        par feature donne les points de chaque ligne.
+
+        Retourne scores, niveaux de risque, matrice des points (N x features),
+        contributions additives (points moins la référence de chaque feature)
+        et facteurs (positifs, négatifs) par ligne (None si with_factors=False).
+        """
+        n = len(features_list)
+        points = np.zeros((n, len(self.features)), dtype=np.int64)
+
+        for j, feature in enumerate(self.features):
+            column = feature.column(features_list)
+            points[:, j] = feature.points[feature.points_table.indices(column)]
+
+            if feature.when_positive is not None:
+                applies = self._applies_batch(feature, features_list)
+                points[:, j] = np.where(applies, points[:, j], feature.otherwise)
+
+        scores = np.clip(self.base_score + points.sum(axis=1), self.min_score, self.max_score)
+        risk_levels = self.risk_levels(scores)
+
+        return {
+            'scores': scores,
+            'risk_levels': risk_levels,
+            'points': points,
+            'contributions': points - self.baselines,
+            'factors': self.factors_batch(features_list) if with_factors else None,
+        }
+
+    def _applies_batch(self, feature, features_list):
+        return np.array([f[feature.when_positive] for f in features_list], dtype=np.float64) > 0
+
+    def factors_batch(self, features_list):
+        """Facteurs (positifs, négatifs) de N lignes : un code de tranche par feature et par ligne"""
+        factor_codes = []
+        for feature in self.features:
+            if feature.factors_table is None:
+                continue
+            codes = feature.factors_table.indices(feature.column(features_list))
+            if feature.when_positive is not None:
+                codes = np.where(self._applies_batch(feature, features_list), codes, -1)
+            factor_codes.append((feature, codes))
+
+        factors = []
+        for i, features in enumerate(features_list):
+            positive = []
+            negative = []
+            for feature, codes in factor_codes:
+                if codes[i] >= 0:
+                    label = feature.factors_table.values[codes[i]]
+                    self._add_factor(label, features[feature.name], features, positive, negative)
+            factors.append((positive, negative))
+        return factors
+
+
+def compile_scorecard(definition, version=None):
+    """Compile une définition de grille ; lève ValidationError si elle est invalide"""
+    try:
+        return CompiledScorecard(definition, version=version)
+    except ValidationError:
+        raise
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValidationError(f"Grille de score invalide: {e!r}")
+
+
+# ============================================
+# Chargement et cache en mémoire
+# ============================================
+
+# Recompilées quand une grille est modifiée, dans n'importe quel processus (voir versions.py)
+SCORECARDS_VERSION = 'scorecards'
+
+_compiled = VersionedCache(SCORECARDS_VERSION)
+
+
+def load_active_scorecard():
+    from .models import Scorecard
+
+    row = Scorecard.objects.filter(is_active=True).order_by('-updated_at').first()
+    if row is not None:
+        return compile_scorecard(row.definition, version=row.version)
+    return compile_scorecard(DEFAULT_SCORECARD)
+
+
+def load_scorecard(version):
+    from .models import Scorecard
+
+    row = Scorecard.objects.filter(version=version).first()
+    if row is not None:
+        return compile_scorecard(row.definition, version=row.version)
+    if version == DEFAULT_SCORECARD['version']:
+        return compile_scorecard(DEFAULT_SCORECARD)
+    raise ValidationError(f"Grille de score '{version}' introuvable")
+
+
+def get_active_scorecard():
+    """Grille active (base de données, sinon grille par défaut), compilée une fois par version"""
+    return _compiled.get('active', load_active_scorecard)
+
+
+def get_scorecard(version):
+    """Grille d'une version donnée, compilée une fois par version"""
+    return _compiled.get(('version', version), lambda: load_scorecard(version))
+
+
+def invalidate_scorecard_cache():
+    """Grille modifiée : nouvelle version pour tous les processus, cache local vidé"""
+    bump_config_version(SCORECARDS_VERSION)
+    _compiled.clear()
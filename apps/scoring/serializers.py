@@ -1,4 +1,6 @@
+from django.conf import settings
 from rest_framework import serializers
+from apps.demands.models import CreditDemand
 from .models import CreditScore, PaymentHistory, Transaction
 
 class CreditScoreSerializer(serializers.ModelSerializer):
@@ -24,4 +26,82 @@ class TransactionSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Transaction
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+class SimulationCandidateSerializer(serializers.Serializer):
+    amount = serializers.DecimalField(max_digits=12, decimal_places=2, min_value=100000, max_value=100000000)
+    duration_months = serializers.IntegerField(min_value=6, max_value=360)
+    credit_type = serializers.ChoiceField(choices=CreditDemand.CREDIT_TYPE_CHOICES)
+
+
+class SimulationRequestSerializer(serializers.Serializer):
+    """
+    Simulation what-if : un client et une grille de variantes.
+    
+    Soit 'candidates' (liste explicite), soit le produit cartésien
+    amounts x durations x credit_types. Chaque liste, comme la grille
+    obtenue, est limitée à SCORING_SIMULATION_MAX_CANDIDATES éléments ;
+    la taille du produit est vérifiée avant de le construire.
+    """
+    client_id = serializers.IntegerField()
+    candidates = SimulationCandidateSerializer(
+        many=True, required=False, max_length=settings.SCORING_SIMULATION_MAX_CANDIDATES,
+    )
+    amounts = serializers.ListField(
+        child=serializers.DecimalField(max_digits=12, decimal_places=2, min_value=100000, max_value=100000000),
+        required=False,
+        max_length=settings.SCORING_SIMULATION_MAX_CANDIDATES,
+    )
+    durations = serializers.ListField(
+        child=serializers.IntegerField(min_value=6, max_value=360),
+        required=False,
+        max_length=settings.SCORING_SIMULATION_MAX_CANDIDATES,
+    )
+    credit_types = serializers.ListField(
+        child=serializers.ChoiceField(choices=CreditDemand.CREDIT_TYPE_CHOICES),
+        required=False,
+        max_length=len(CreditDemand.CREDIT_TYPE_CHOICES),
+    )
+    
+    def validate(self, data):
+        max_candidates = settings.SCORING_SIMULATION_MAX_CANDIDATES
+        
+        if data.get('candidates'):
+            size = len(data['candidates'])
+        elif data.get('amounts') and data.get('durations'):
+            credit_types = data.get('credit_types') or ['CONSUMPTION']
+            size = len(data['amounts']) * len(data['durations']) * len(credit_types)
+        else:
+            raise serializers.ValidationError("Fournir 'candidates' ou 'amounts' et 'durations'")
+        
+        # Taille vérifiée avant de construire la grille
+        if size > max_candidates:
+            raise serializers.ValidationError(f"Grille trop grande ({size} variantes, maximum {max_candidates})")
+        
+        if data.get('candidates'):
+            candidates = [
+                (float(c['amount']), c['duration_months'], c['credit_type'])
+                for c in data['candidates']
+            ]
+        else:
+            candidates = [
+                (float(amount), duration, credit_type)
+                for credit_type in credit_types
+                for duration in data['durations']
+                for amount in data['amounts']
+            ]
+        
+        data['grid'] = candidates
+        return data
+
+
+class CalculateBatchSerializer(serializers.Serializer):
+    """Calcul des scores d'un lot de demandes (au plus SCORING_BATCH_MAX_DEMANDS)"""
+    demand_ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False)
+    force = serializers.BooleanField(default=False)
+    
+    def validate_demand_ids(self, value):
+        max_demands = settings.SCORING_BATCH_MAX_DEMANDS
+        if len(value) > max_demands:
+            raise serializers.ValidationError(f"Trop de demandes ({len(value)}, maximum {max_demands})")
+        return list(dict.fromkeys(value))
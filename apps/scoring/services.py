@@ -1,71 +1,275 @@
+import logging
 import numpy as np
 from datetime import datetime, timedelta
-from django.db.models import Avg, Count, Sum
-from .models import CreditScore, PaymentHistory, Transaction
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.db import DataError, IntegrityError, transaction as db_transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+from core.instrumentation import StageRecorder
+from .models import CreditScore, PaymentHistory, Transaction, ClientFeatureSnapshot
+from .behaviour import behaviour_feature_names, compute_behaviour_features
+from .challengers import enqueue_shadow_scoring
+from .history import content_hash, record_score_history
+from .engine import score_batch
+from .ml import get_scoring_model
+from .scorecard import get_active_scorecard
 
-def calculate_score(demand):
-    """Calcul du score de crédit pour une demande - VERSION AMÉLIORÉE"""
+logger = logging.getLogger(__name__)
+
+def calculate_score(demand, force=False, mode=None):
+    """Calcul du score de crédit pour une demande - VERSION AMÉLIORÉE
+    
+    Le score existant est conservé tel quel si les features et la version
+    du modèle n'ont pas changé (force=True pour recalculer quand même).
+    mode : 'rules' (grille de score) ou 'model' (artefact ML), défaut
+    settings.SCORING_MODE.
+    """
+    return calculate_scores([demand], force=force, mode=mode, metric_name='calculate_score')[0]
+
+
+def calculate_scores(demands, force=False, mode=None, metric_name='calculate_scores'):
+    """Calcul des scores pour plusieurs demandes en une seule passe vectorisée
+    
+    Features extraites en masse, scoring batch et écriture par
+    bulk_create/bulk_update : le nombre de requêtes ne dépend pas de la
+    taille du lot. Les demandes dont l'empreinte des features et la version
+    du modèle sont inchangées ne sont ni rescorées ni réécrites.
+    
+    Durée et requêtes de chaque étape (features, scoring, factors,
+    persistence) sont enregistrées dans le registre de mesures sous
+    metric_name ; avec SCORING_STORE_TIMINGS, elles sont aussi copiées sur
+    les scores écrits (étapes antérieures à l'écriture).
+    
+    Si des challengers sont actifs, les demandes rescorées sont mises en
+    file pour le scoring shadow (voir challengers.py).
+    """
+    
+    recorder = StageRecorder(metric_name)
+    values_by_demand = {}
+    to_score = []
+    
+    with recorder.stage('features'):
+        features_by_demand = extract_features_bulk(demands)
+        existing = {
+            score.demand_id: score
+            for score in CreditScore.objects.filter(demand__in=demands)
+        }
+        model = get_scoring_model(mode)
+        scorecard = get_active_scorecard()
+        model_version = model.version if model is not None else scorecard.version
+        
+        for demand in demands:
+            features = features_by_demand[demand.id]
+            if features is None:
+                values = default_score_values()
+                if force or not is_score_current(existing.get(demand.id), values['features_hash'], values['model_version']):
+                    values_by_demand[demand.id] = values
+                continue
+            
+            features_hash = compute_features_hash(features, scorecard, model)
+            if force or not is_score_current(existing.get(demand.id), features_hash, model_version):
+                to_score.append((demand, features, features_hash))
+    
+    results = score_batch([features for _, features, _ in to_score], scorecard=scorecard, model=model, recorder=recorder)
+    
+    for (demand, features, features_hash), result in zip(to_score, results):
+        values_by_demand[demand.id] = build_score_values(features, result, features_hash)
+    
+    if settings.SCORING_STORE_TIMINGS and values_by_demand:
+        timings = {**recorder.as_dict(), 'batch_size': len(demands)}
+        for values in values_by_demand.values():
+            values['timings'] = timings
+    
+    with recorder.stage('persistence'):
+        scores = save_scores_bulk(demands, values_by_demand, existing)
+        
+        # Challengers : scorés plus tard par le worker, hors du chemin critique
+        enqueue_shadow_scoring([demand_id for demand_id, values in values_by_demand.items() if values['features_used']])
     
-    client = demand.client
+    recorder.finish()
+    return scores
+
+
+# Erreurs propres à une demande (données inattendues) : les autres demandes du lot
+# peuvent être scorées. Une autre erreur (base indisponible, ...) est propagée.
+ROW_ERRORS = (
+    ValueError, TypeError, KeyError, ArithmeticError, ObjectDoesNotExist, ValidationError, DataError, IntegrityError,
+)
+
+
+def calculate_scores_or_errors(demands, force=False, mode=None):
+    """calculate_scores avec repli demande par demande en cas d'erreur sur une demande
     
-    # Vérifier si le profil existe
+    Retourne (scores par demand_id, erreurs par demand_id) : une demande en
+    erreur n'empêche pas l'écriture des autres. Les erreurs qui ne tiennent
+    pas à une demande (ROW_ERRORS exclues) sont propagées sans repli.
+    """
     try:
-        profile = client.client_profile
-    except:
-        # Si pas de profil, créer un score par défaut
-        score = CreditScore.objects.create(
-            demand=demand,
-            score_value=400,
-            risk_level='VERY_HIGH',
-            factors_positive=[],
-            factors_negative=[{'factor': 'Profil client incomplet', 'value': 'N/A', 'impact': -200}],
-            model_version='v1.0-mvp',
-            features_used={},
-            shap_values={},
-            ai_recommendation='MANUAL_REVIEW',
-            confidence_level=50.0,
-        )
-        return score
-    
-    # Extraction des features
-    features = extract_features(client, profile, demand)
-    
-    # Calcul du score (algorithme amélioré)
-    score_value = compute_advanced_score(features)
-    
-    # Détermination du niveau de risque
-    risk_level = determine_risk_level(score_value)
-    
-    # Identification des facteurs
-    factors_positive, factors_negative = identify_factors(features, score_value)
-    
-    # Recommandation IA
-    ai_recommendation, confidence = generate_recommendation(score_value, features)
-    
-    # Calcul SHAP values (simulé mais réaliste)
-    shap_values = simulate_shap_values(features)
-    
-    # Sauvegarde du score
-    score, created = CreditScore.objects.update_or_create(
-        demand=demand,
-        defaults={
-            'score_value': score_value,
-            'risk_level': risk_level,
-            'factors_positive': factors_positive,
-            'factors_negative': factors_negative,
-            'model_version': 'v1.1-advanced',
-            'features_used': features,
-            'shap_values': shap_values,
-            'ai_recommendation': ai_recommendation,
-            'confidence_level': confidence,
+        with db_transaction.atomic():
+            scores = calculate_scores(demands, force=force, mode=mode)
+        return {demand.id: score for demand, score in zip(demands, scores)}, {}
+    except ROW_ERRORS:
+        logger.exception("Échec du calcul groupé de %d demandes, repli demande par demande", len(demands))
+    
+    scores = {}
+    errors = {}
+    for demand in demands:
+        try:
+            with db_transaction.atomic():
+                scores[demand.id] = calculate_scores([demand], force=force, mode=mode)[0]
+        except ROW_ERRORS as e:
+            errors[demand.id] = str(e)
+    return scores, errors
+
+
+# Features dérivées de la date du jour, arrondies dans l'empreinte des entrées d'un modèle ML
+ROUNDED_MODEL_FEATURES = {'age': int}
+
+
+def compute_features_hash(features, scorecard=None, model=None):
+    """Empreinte (SHA-256) de ce dont dépend le résultat du scoring
+    
+    Pas des features brutes : l'âge et les fenêtres glissantes changent
+    chaque jour sans que le score change. Avec la grille : sa définition,
+    tranches de points et facteurs produits (scorecard.scoring_key) et
+    entrées de la recommandation. Avec un modèle ML, s'y ajoutent ses features d'entrée,
+    l'âge en années entières.
+    """
+    if not features:
+        return content_hash(features)
+    
+    scorecard = scorecard or get_active_scorecard()
+    inputs = {
+        'scorecard': scorecard.scoring_key(features),
+        'recommendation': [features['default_payments'], features['debt_ratio'] > 50],
+    }
+    if model is not None:
+        inputs['model'] = {
+            name: ROUNDED_MODEL_FEATURES.get(name, lambda value: value)(features[name])
+            for name in model.feature_names
         }
+    return content_hash(inputs)
+
+
+def is_score_current(score, features_hash, model_version):
+    """Le score enregistré correspond-il déjà à ces features et à ce modèle ?"""
+    return (
+        score is not None
+        and score.features_hash == features_hash
+        and score.model_version == model_version
     )
+
+
+def build_score_values(features, result, features_hash=None):
+    """Valeurs d'un CreditScore à partir du résultat du moteur de scoring"""
+    
+    return {
+        'score_value': result['score_value'],
+        'risk_level': result['risk_level'],
+        'factors_positive': result['factors_positive'],
+        'factors_negative': result['factors_negative'],
+        'model_version': result['model_version'],
+        'features_used': features,
+        'features_hash': features_hash or compute_features_hash(features),
+        'shap_values': result['contributions'],
+        'ai_recommendation': result['ai_recommendation'],
+        'confidence_level': result['confidence_level'],
+        'timings': {},
+    }
+
+
+def default_score_values():
+    """Valeurs du score par défaut lorsque le profil client est absent"""
+    return {
+        'score_value': 400,
+        'risk_level': 'VERY_HIGH',
+        'factors_positive': [],
+        'factors_negative': [{'factor': 'Profil client incomplet', 'value': 'N/A', 'impact': -200}],
+        'model_version': 'v1.0-mvp',
+        'features_used': {},
+        'features_hash': compute_features_hash({}),
+        'shap_values': {},
+        'ai_recommendation': 'MANUAL_REVIEW',
+        'confidence_level': 50.0,
+        'timings': {},
+    }
+
+
+# Champs écrits par bulk_update lors d'un recalcul
+SCORE_FIELDS = list(default_score_values())
+
+
+def save_scores_bulk(demands, values_by_demand, existing=None):
+    """Écrit les scores d'un lot : bulk_update des existants, bulk_create des nouveaux
+    
+    Les demandes absentes de values_by_demand gardent leur score actuel.
+    Chaque score écrit est aussi ajouté à l'historique (voir history.py).
+    """
     
-    return score
+    if existing is None:
+        existing = {
+            score.demand_id: score
+            for score in CreditScore.objects.filter(demand__in=demands)
+        }
+    
+    scores = []
+    to_create = []
+    to_update = []
+    
+    for demand in demands:
+        score = existing.get(demand.id)
+        values = values_by_demand.get(demand.id)
+        
+        if values is None:
+            scores.append(score)
+            continue
+        
+        if score is None:
+            score = CreditScore(demand=demand, **values)
+            to_create.append(score)
+        else:
+            for field, value in values.items():
+                setattr(score, field, value)
+            to_update.append(score)
+        
+        scores.append(score)
+    
+    if to_create or to_update:
+        with db_transaction.atomic():
+            CreditScore.objects.bulk_create(to_create)
+            CreditScore.objects.bulk_update(to_update, SCORE_FIELDS)
+            
+            # Historique en ajout seul : chaque calcul écrit est conservé
+            # (source des histogrammes de dérive, agrégés hors de ce chemin, voir drift.py)
+            record_score_history(to_create + to_update)
+    
+    return scores
 
 
-def extract_features(client, profile, demand):
-    """Extraction des features pour le scoring - VERSION AMÉLIORÉE"""
+def extract_features(profile, demand, payment_stats=None, transaction_stats=None, behaviour=None):
+    """Extraction des features pour le scoring - VERSION AMÉLIORÉE
+    
+    Les statistiques peuvent être fournies (calcul en masse), sinon elles
+    sont lues dans le snapshot de features du client.
+    """
+    
+    client_features = extract_client_features(profile, payment_stats, transaction_stats, behaviour)
+    
+    return add_demand_features(
+        client_features,
+        float(demand.amount),
+        demand.duration_months,
+        demand.credit_type,
+    )
+
+
+def extract_client_features(profile, payment_stats=None, transaction_stats=None, behaviour=None):
+    """Features ne dépendant que du client (profil, historique, comportement bancaire)
+    
+    behaviour : features sur fenêtres glissantes (voir behaviour.py),
+    lues dans le snapshot du client si elles ne sont pas fournies.
+    """
     
     # Features profil
     age = (datetime.now().date() - profile.birth_date).days / 365.25
@@ -73,26 +277,22 @@ def extract_features(client, profile, demand):
     monthly_income = float(profile.monthly_income)
     seniority_years = float(profile.seniority_years)
     
-    # Features demande
-    requested_amount = float(demand.amount)
-    duration_months = demand.duration_months
-    loan_to_income_ratio = (requested_amount / duration_months) / monthly_income if monthly_income > 0 else 999
+    # Historique paiements et transactions (snapshot incrémental)
+    if payment_stats is None or transaction_stats is None or behaviour is None:
+        snapshot = get_feature_snapshots_bulk([profile.user_id])[profile.user_id]
     
-    # Ratio montant/revenu annuel
-    amount_to_annual_income = requested_amount / (monthly_income * 12) if monthly_income > 0 else 999
+    if payment_stats is None:
+        payment_stats = snapshot_payment_statistics(snapshot)
     
-    # Historique paiements
-    payment_stats = get_payment_statistics(client)
+    if transaction_stats is None:
+        transaction_stats = snapshot_transaction_statistics(snapshot)
     
-    # Transactions bancaires
-    transaction_stats = get_transaction_statistics(client)
+    if behaviour is None:
+        behaviour = get_behaviour_features_bulk({profile.user_id: snapshot})[profile.user_id]
     
-    # Capacité de remboursement
-    monthly_payment_estimate = requested_amount / duration_months * 1.08
     available_income = monthly_income - float(profile.monthly_debt_payment)
-    payment_capacity = (monthly_payment_estimate / available_income * 100) if available_income > 0 else 200
     
-    features = {
+    return {
         # Démographiques
         'age': float(age),
         'dependents': int(profile.dependents),
@@ -110,14 +310,6 @@ def extract_features(client, profile, demand):
         'monthly_debt_payment': float(profile.monthly_debt_payment),
         'bank_seniority_months': int(profile.bank_seniority_months),
         'available_income': float(available_income),
-        'payment_capacity': float(payment_capacity),
-        
-        # Demande
-        'requested_amount': float(requested_amount),
-        'duration_months': int(duration_months),
-        'loan_to_income_ratio': float(loan_to_income_ratio),
-        'amount_to_annual_income': float(amount_to_annual_income),
-        'credit_type': str(demand.credit_type),
         
         # Historique
         'total_payments': int(payment_stats['total']),
@@ -131,337 +323,202 @@ def extract_features(client, profile, demand):
         'total_credits': float(transaction_stats['total_credits']),
         'total_debits': float(transaction_stats['total_debits']),
         'transaction_count': int(transaction_stats['transaction_count']),
+        
+        # Comportement sur fenêtres glissantes (30/90/180/365 jours)
+        **behaviour,
     }
+
+
+def add_demand_features(client_features, requested_amount, duration_months, credit_type):
+    """Complète les features client avec celles de la demande (montant, durée, type)"""
     
-    return features
+    monthly_income = client_features['monthly_income']
+    available_income = client_features['available_income']
+    
+    loan_to_income_ratio = (requested_amount / duration_months) / monthly_income if monthly_income > 0 else 999
+    
+    # Ratio montant/revenu annuel
+    amount_to_annual_income = requested_amount / (monthly_income * 12) if monthly_income > 0 else 999
+    
+    # Capacité de remboursement
+    monthly_payment_estimate = requested_amount / duration_months * 1.08
+    payment_capacity = (monthly_payment_estimate / available_income * 100) if available_income > 0 else 200
+    
+    return {
+        **client_features,
+        'payment_capacity': float(payment_capacity),
+        'requested_amount': float(requested_amount),
+        'duration_months': int(duration_months),
+        'loan_to_income_ratio': float(loan_to_income_ratio),
+        'amount_to_annual_income': float(amount_to_annual_income),
+        'credit_type': str(credit_type),
+    }
 
 
-def compute_advanced_score(features):
-    """Calcul AVANCÉ du score (0-1000) avec pondérations réalistes"""
-    
-    score = 500
-    
-    # REVENUS ET STABILITÉ (30% du score)
-    income = features['monthly_income']
-    if income >= 1000000:
-        score += 150
-    elif income >= 500000:
-        score += 120
-    elif income >= 300000:
-        score += 90
-    elif income >= 150000:
-        score += 60
-    elif income >= 75000:
-        score += 30
-    else:
-        score -= 50
-    
-    # Ancienneté emploi
-    seniority = features['seniority_years']
-    if seniority >= 10:
-        score += 80
-    elif seniority >= 5:
-        score += 60
-    elif seniority >= 3:
-        score += 40
-    elif seniority >= 1:
-        score += 20
-    else:
-        score -= 30
-    
-    # Statut emploi
-    if features['employment_status'] == 'CIVIL_SERVANT':
-        score += 50
-    elif features['employment_status'] == 'EMPLOYEE':
-        score += 30
-    elif features['employment_status'] == 'SELF_EMPLOYED':
-        score += 10
-    else:
-        score -= 100
-    
-    # ENDETTEMENT (25% du score)
-    debt_ratio = features['debt_ratio']
-    if debt_ratio < 15:
-        score += 125
-    elif debt_ratio < 25:
-        score += 100
-    elif debt_ratio < 33:
-        score += 50
-    elif debt_ratio < 40:
-        score -= 50
-    elif debt_ratio < 50:
-        score -= 100
-    else:
-        score -= 200
-    
-    # Capacité de paiement
-    payment_capacity = features['payment_capacity']
-    if payment_capacity < 20:
-        score += 80
-    elif payment_capacity < 30:
-        score += 50
-    elif payment_capacity < 40:
-        score += 20
-    elif payment_capacity < 60:
-        score -= 30
-    else:
-        score -= 100
-    
-    # HISTORIQUE PAIEMENTS (30% du score)
-    late_payments = features['late_payments']
-    default_payments = features['default_payments']
-    total_payments = features['total_payments']
-    on_time_rate = features['on_time_rate']
-    
-    if default_payments >= 3:
-        score -= 400
-    elif default_payments == 2:
-        score -= 300
-    elif default_payments == 1:
-        score -= 200
-    
-    if total_payments > 0:
-        if on_time_rate >= 95:
-            score += 150
-        elif on_time_rate >= 85:
-            score += 100
-        elif on_time_rate >= 75:
-            score += 50
-        elif on_time_rate >= 60:
-            score -= 50
-        else:
-            score -= 150
-    else:
-        score -= 50
-    
-    avg_days_late = features['avg_days_late']
-    if avg_days_late > 30:
-        score -= 100
-    elif avg_days_late > 15:
-        score -= 50
-    elif avg_days_late > 7:
-        score -= 20
-    
-    # ANCIENNETÉ BANQUE (10% du score)
-    bank_seniority = features['bank_seniority_months']
-    if bank_seniority >= 60:
-        score += 60
-    elif bank_seniority >= 36:
-        score += 45
-    elif bank_seniority >= 24:
-        score += 30
-    elif bank_seniority >= 12:
-        score += 15
-    else:
-        score -= 20
-    
-    # CARACTÉRISTIQUES DU PRÊT (5% du score)
-    loan_to_income = features['loan_to_income_ratio']
-    if loan_to_income < 0.2:
-        score += 40
-    elif loan_to_income < 0.4:
-        score += 20
-    elif loan_to_income < 0.6:
-        score += 0
-    elif loan_to_income < 0.8:
-        score -= 30
-    else:
-        score -= 80
-    
-    amount_to_annual = features['amount_to_annual_income']
-    if amount_to_annual < 0.5:
-        score += 30
-    elif amount_to_annual < 1:
-        score += 15
-    elif amount_to_annual < 2:
-        score += 0
-    elif amount_to_annual < 4:
-        score -= 40
-    else:
-        score -= 100
-    
-    if features['credit_type'] == 'REAL_ESTATE':
-        score += 20
-    elif features['credit_type'] == 'AUTO':
-        score += 10
-    
-    # COMPORTEMENT BANCAIRE
-    avg_balance = features['avg_balance']
-    if avg_balance > 1000000:
-        score += 40
-    elif avg_balance > 500000:
-        score += 25
-    elif avg_balance > 200000:
-        score += 15
-    
-    # ÂGE
-    age = features['age']
-    if 30 <= age <= 50:
-        score += 20
-    elif 25 <= age < 30 or 50 < age <= 55:
-        score += 10
-    elif age < 25:
-        score -= 30
-    elif age > 60:
-        score -= 40
-    
-    # CHARGES FAMILIALES
-    dependents = features['dependents']
-    if dependents == 0:
-        score += 10
-    elif dependents <= 2:
-        score += 0
-    elif dependents <= 4:
-        score -= 20
+# Features produites par extract_features (hors fenêtres glissantes, voir behaviour.py)
+CLIENT_FEATURE_NAMES = [
+    'age', 'dependents', 'marital_status',
+    'employment_status', 'monthly_income', 'seniority_years', 'sector',
+    'debt_ratio', 'existing_credits', 'monthly_debt_payment', 'bank_seniority_months', 'available_income',
+    'total_payments', 'late_payments', 'default_payments', 'avg_days_late', 'on_time_rate',
+    'avg_balance', 'total_credits', 'total_debits', 'transaction_count',
+]
+DEMAND_FEATURE_NAMES = [
+    'payment_capacity', 'requested_amount', 'duration_months', 'loan_to_income_ratio',
+    'amount_to_annual_income', 'credit_type',
+]
+
+
+def feature_names():
+    """Noms de toutes les features d'une demande (validation des expressions de règles)"""
+    return CLIENT_FEATURE_NAMES + behaviour_feature_names() + DEMAND_FEATURE_NAMES
+
+
+# Features catégorielles (chaînes) ; toutes les autres sont numériques
+CATEGORICAL_FEATURES = {'marital_status', 'employment_status', 'sector', 'credit_type'}
+
+
+def feature_types():
+    """Type de chaque feature ('string' ou 'number'), pour la vérification des expressions de règles"""
+    return {name: 'string' if name in CATEGORICAL_FEATURES else 'number' for name in feature_names()}
+
+
+def expand_demand_features(client_features, amounts, durations, credit_types):
+    """
+    Équivalent vectorisé de add_demand_features pour N variantes de demande.
+    
+    Les features client sont calculées une fois ; seuls les ratios dépendant
+    du montant et de la durée sont calculés, en NumPy, pour toute la grille.
+    """
+    
+    amounts = np.asarray(amounts, dtype=np.float64)
+    durations = np.asarray(durations, dtype=np.int64)
+    
+    monthly_income = client_features['monthly_income']
+    available_income = client_features['available_income']
+    
+    # Mêmes opérations, dans le même ordre, que la version scalaire
+    if monthly_income > 0:
+        loan_to_income_ratio = (amounts / durations) / monthly_income
+        amount_to_annual_income = amounts / (monthly_income * 12)
     else:
-        score -= 40
+        loan_to_income_ratio = np.full(len(amounts), 999.0)
+        amount_to_annual_income = np.full(len(amounts), 999.0)
     
-    score = max(0, min(1000, int(score)))
+    monthly_payment_estimate = amounts / durations * 1.08
+    if available_income > 0:
+        payment_capacity = monthly_payment_estimate / available_income * 100
+    else:
+        payment_capacity = np.full(len(amounts), 200.0)
+    
+    return [
+        {
+            **client_features,
+            'payment_capacity': payment,
+            'requested_amount': amount,
+            'duration_months': duration,
+            'loan_to_income_ratio': ratio,
+            'amount_to_annual_income': annual_ratio,
+            'credit_type': str(credit_type),
+        }
+        for payment, amount, duration, ratio, annual_ratio, credit_type in zip(
+            payment_capacity.tolist(),
+            amounts.tolist(),
+            durations.tolist(),
+            loan_to_income_ratio.tolist(),
+            amount_to_annual_income.tolist(),
+            credit_types,
+        )
+    ]
+
+
+def simulate_scores(client, candidates, mode=None):
+    """
+    Surface de score pour un client et une grille de variantes (montant, durée, type).
+    
+    Aucune demande n'est créée ni aucun score enregistré : features client
+    lues une fois (profil + snapshot), ratios de la demande vectorisés,
+    puis une seule passe du moteur de scoring pour toute la grille.
+    candidates : liste de tuples (amount, duration_months, credit_type).
+    """
+    
+    profile = client.client_profile
+    client_features = extract_client_features(profile)
+    
+    amounts, durations, credit_types = zip(*candidates) if candidates else ((), (), ())
+    features_list = expand_demand_features(client_features, amounts, durations, credit_types)
+    
+    results = score_batch(features_list, model=get_scoring_model(mode))
+    
+    return [
+        {
+            'amount': features['requested_amount'],
+            'duration_months': features['duration_months'],
+            'credit_type': features['credit_type'],
+            'monthly_payment_estimate': round(features['requested_amount'] / features['duration_months'] * 1.08, 2),
+            'payment_capacity': round(features['payment_capacity'], 2),
+            'loan_to_income_ratio': round(features['loan_to_income_ratio'], 4),
+            'score_value': result['score_value'],
+            'risk_level': result['risk_level'],
+            'ai_recommendation': result['ai_recommendation'],
+            'confidence_level': result['confidence_level'],
+            'model_version': result['model_version'],
+        }
+        for features, result in zip(features_list, results)
+    ]
+
+
+def extract_features_bulk(demands):
+    """
+    Extraction des features pour une liste de demandes.
+    
+    Profils et snapshots de features sont chargés en une requête chacun
+    pour tout le lot ; les transactions récentes (fenêtres glissantes) ne
+    sont relues que pour les snapshots dont ces features sont périmées.
+    Retourne {demand_id: features}, avec None si le profil est absent.
+    """
+    from apps.accounts.models import ClientProfile
+    
+    client_ids = list({demand.client_id for demand in demands})
+    
+    profiles = {
+        profile.user_id: profile
+        for profile in ClientProfile.objects.filter(user_id__in=client_ids)
+    }
+    snapshots = get_feature_snapshots_bulk(client_ids)
+    behaviour = get_behaviour_features_bulk({client_id: snapshots[client_id] for client_id in profiles})
+    
+    features = {}
+    for demand in demands:
+        profile = profiles.get(demand.client_id)
+        if profile is None:
+            features[demand.id] = None
+            continue
+        # Client identifié par client_id : aucune lecture de demand.client par demande
+        features[demand.id] = extract_features(
+            profile,
+            demand,
+            payment_stats=snapshot_payment_statistics(snapshots[demand.client_id]),
+            transaction_stats=snapshot_transaction_statistics(snapshots[demand.client_id]),
+            behaviour=behaviour[demand.client_id],
+        )
     
-    return score
+    return features
+
+
+def compute_advanced_score(features):
+    """Calcul AVANCÉ du score (0-1000) selon la grille de score active"""
+    return get_active_scorecard().score(features)
 
 
 def determine_risk_level(score):
     """Détermination du niveau de risque"""
-    if score >= 750:
-        return 'LOW'
-    elif score >= 550:
-        return 'MEDIUM'
-    elif score >= 350:
-        return 'HIGH'
-    else:
-        return 'VERY_HIGH'
+    return get_active_scorecard().risk_level(score)
 
 
 def identify_factors(features, score):
     """Identification DÉTAILLÉE des facteurs positifs et négatifs"""
-    
-    positive = []
-    negative = []
-    
-    income = features['monthly_income']
-    if income >= 500000:
-        positive.append({
-            'factor': 'Revenu mensuel très élevé',
-            'value': f"{income:,.0f} FCFA",
-            'impact': 120
-        })
-    elif income >= 300000:
-        positive.append({
-            'factor': 'Bon revenu mensuel',
-            'value': f"{income:,.0f} FCFA",
-            'impact': 90
-        })
-    elif income < 100000:
-        negative.append({
-            'factor': 'Revenu mensuel insuffisant',
-            'value': f"{income:,.0f} FCFA",
-            'impact': -100
-        })
-    
-    seniority = features['seniority_years']
-    if seniority >= 5:
-        positive.append({
-            'factor': 'Excellente stabilité professionnelle',
-            'value': f"{seniority:.1f} années",
-            'impact': 60
-        })
-    elif seniority < 1:
-        negative.append({
-            'factor': 'Ancienneté professionnelle faible',
-            'value': f"{seniority:.1f} année(s)",
-            'impact': -80
-        })
-    
-    debt_ratio = features['debt_ratio']
-    if debt_ratio < 25:
-        positive.append({
-            'factor': 'Excellent taux d\'endettement',
-            'value': f"{debt_ratio:.1f}%",
-            'impact': 100
-        })
-    elif debt_ratio > 40:
-        negative.append({
-            'factor': 'Taux d\'endettement très élevé',
-            'value': f"{debt_ratio:.1f}%",
-            'impact': -200
-        })
-    elif debt_ratio > 33:
-        negative.append({
-            'factor': 'Taux d\'endettement élevé',
-            'value': f"{debt_ratio:.1f}%",
-            'impact': -50
-        })
-    
-    on_time_rate = features['on_time_rate']
-    total_payments = features['total_payments']
-    
-    if total_payments > 0:
-        if on_time_rate >= 95:
-            positive.append({
-                'factor': 'Excellent historique de paiements',
-                'value': f"{on_time_rate:.1f}% à temps ({total_payments} paiements)",
-                'impact': 150
-            })
-        elif on_time_rate < 75:
-            negative.append({
-                'factor': 'Historique de retards fréquents',
-                'value': f"{on_time_rate:.1f}% à temps",
-                'impact': -150
-            })
-    
-    defaults = features['default_payments']
-    if defaults > 0:
-        negative.append({
-            'factor': 'Historique de défauts de paiement',
-            'value': f"{defaults} défaut(s)",
-            'impact': -defaults * 200
-        })
-    
-    bank_seniority = features['bank_seniority_months']
-    if bank_seniority >= 36:
-        positive.append({
-            'factor': 'Client fidèle de longue date',
-            'value': f"{bank_seniority} mois ({bank_seniority//12} ans)",
-            'impact': 45
-        })
-    elif bank_seniority < 12:
-        negative.append({
-            'factor': 'Relation bancaire récente',
-            'value': f"{bank_seniority} mois",
-            'impact': -20
-        })
-    
-    payment_capacity = features['payment_capacity']
-    if payment_capacity < 30:
-        positive.append({
-            'factor': 'Excellente capacité de remboursement',
-            'value': f"{payment_capacity:.1f}% du revenu disponible",
-            'impact': 50
-        })
-    elif payment_capacity > 60:
-        negative.append({
-            'factor': 'Capacité de remboursement limitée',
-            'value': f"{payment_capacity:.1f}% du revenu disponible",
-            'impact': -100
-        })
-    
-    if features['employment_status'] == 'CIVIL_SERVANT':
-        positive.append({
-            'factor': 'Statut fonctionnaire (stabilité)',
-            'value': 'Fonctionnaire',
-            'impact': 50
-        })
-    
-    avg_balance = features['avg_balance']
-    if avg_balance > 500000:
-        positive.append({
-            'factor': 'Solde bancaire confortable',
-            'value': f"{avg_balance:,.0f} FCFA en moyenne",
-            'impact': 25
-        })
-    
-    return positive, negative
+    return get_active_scorecard().factors(features)
 
 
 def generate_recommendation(score, features):
@@ -492,41 +549,10 @@ def generate_recommendation(score, features):
     return recommendation, confidence
 
 
-def simulate_shap_values(features):
-    """Simulation réaliste des valeurs SHAP"""
-    
-    shap = {}
+def format_payment_statistics(row):
+    """Mise en forme d'une ligne d'agrégats de paiements"""
     
-    if features['monthly_income'] > 300000:
-        shap['monthly_income'] = int(np.random.randint(80, 150))
-    else:
-        shap['monthly_income'] = int(np.random.randint(-80, 40))
-    
-    if features['debt_ratio'] > 40:
-        shap['debt_ratio'] = int(np.random.randint(-200, -100))
-    else:
-        shap['debt_ratio'] = int(np.random.randint(50, 120))
-    
-    if features['seniority_years'] > 5:
-        shap['seniority_years'] = int(np.random.randint(40, 80))
-    else:
-        shap['seniority_years'] = int(np.random.randint(-40, 30))
-    
-    if features['late_payments'] > 0:
-        shap['payment_history'] = int(np.random.randint(-250, -80))
-    else:
-        shap['payment_history'] = int(np.random.randint(100, 200))
-    
-    shap['bank_seniority'] = int(np.random.randint(10, 50))
-    
-    return shap
-
-
-def get_payment_statistics(client):
-    """Statistiques COMPLÈTES de l'historique de paiements"""
-    
-    payments = PaymentHistory.objects.filter(client=client)
-    total = payments.count()
+    total = row.get('total') or 0
     
     if total == 0:
         return {
@@ -537,32 +563,189 @@ def get_payment_statistics(client):
             'on_time_rate': 0.0,
         }
     
-    late = payments.filter(status='LATE').count()
-    defaults = payments.filter(status='DEFAULT').count()
-    on_time = payments.filter(status='ON_TIME').count()
-    avg_days = payments.aggregate(Avg('days_late'))['days_late__avg']
+    avg_days = row['avg_days_late']
     
     return {
         'total': total,
-        'late': late,
-        'default': defaults,
+        'late': row['late'],
+        'default': row['default'],
         'avg_days_late': float(avg_days) if avg_days else 0.0,
-        'on_time_rate': float((on_time / total * 100)) if total > 0 else 0.0,
+        'on_time_rate': float((row['on_time'] / total * 100)),
     }
 
 
-def get_transaction_statistics(client):
-    """Statistiques COMPLÈTES des transactions bancaires"""
-    
-    transactions = Transaction.objects.filter(client=client)
+def format_transaction_statistics(row):
+    """Mise en forme d'une ligne d'agrégats de transactions"""
     
-    avg_bal = transactions.aggregate(Avg('balance_after'))['balance_after__avg']
-    total_cred = transactions.filter(transaction_type='CREDIT').aggregate(Sum('amount'))['amount__sum']
-    total_deb = transactions.filter(transaction_type='DEBIT').aggregate(Sum('amount'))['amount__sum']
+    avg_bal = row.get('avg_balance')
+    total_cred = row.get('total_credits')
+    total_deb = row.get('total_debits')
     
     return {
         'avg_balance': float(avg_bal) if avg_bal else 0.0,
         'total_credits': float(total_cred) if total_cred else 0.0,
         'total_debits': float(total_deb) if total_deb else 0.0,
-        'transaction_count': transactions.count(),
-    }
\ No newline at end of file
+        'transaction_count': row.get('transaction_count') or 0,
+    }
+
+
+# ============================================
+# Snapshot de features par client (feature store)
+# ============================================
+
+SNAPSHOT_PAYMENT_AGGREGATES = {
+    'total_payments': Count('id'),
+    'late_payments': Count('id', filter=Q(status='LATE')),
+    'default_payments': Count('id', filter=Q(status='DEFAULT')),
+    'on_time_payments': Count('id', filter=Q(status='ON_TIME')),
+    'sum_days_late': Sum('days_late'),
+}
+
+SNAPSHOT_TRANSACTION_AGGREGATES = {
+    'transaction_count': Count('id'),
+    'sum_balance_after': Sum('balance_after'),
+    'total_credits': Sum('amount', filter=Q(transaction_type='CREDIT')),
+    'total_debits': Sum('amount', filter=Q(transaction_type='DEBIT')),
+}
+
+SNAPSHOT_FIELDS = list(SNAPSHOT_PAYMENT_AGGREGATES) + list(SNAPSHOT_TRANSACTION_AGGREGATES)
+
+
+def get_feature_snapshot(client):
+    """Snapshot de features d'un client (construit à la volée s'il manque)"""
+    return get_feature_snapshots_bulk([client.id])[client.id]
+
+
+def get_feature_snapshots_bulk(client_ids):
+    """Snapshots de plusieurs clients ; les manquants sont reconstruits en masse"""
+    
+    snapshots = {
+        snapshot.client_id: snapshot
+        for snapshot in ClientFeatureSnapshot.objects.filter(client_id__in=client_ids)
+    }
+    
+    missing = [client_id for client_id in client_ids if client_id not in snapshots]
+    if missing:
+        snapshots.update(rebuild_feature_snapshots(missing))
+    
+    return snapshots
+
+
+def rebuild_feature_snapshots(client_ids):
+    """Recalcule entièrement les snapshots des clients donnés (deux GROUP BY)"""
+    
+    payments = {
+        row.pop('client_id'): row
+        for row in PaymentHistory.objects.filter(client_id__in=client_ids)
+        .order_by()
+        .values('client_id')
+        .annotate(**SNAPSHOT_PAYMENT_AGGREGATES)
+    }
+    transactions = {
+        row.pop('client_id'): row
+        for row in Transaction.objects.filter(client_id__in=client_ids)
+        .order_by()
+        .values('client_id')
+        .annotate(**SNAPSHOT_TRANSACTION_AGGREGATES)
+    }
+    
+    snapshots = []
+    for client_id in client_ids:
+        values = {field: 0 for field in SNAPSHOT_FIELDS}
+        for row in (payments.get(client_id, {}), transactions.get(client_id, {})):
+            values.update({field: value or 0 for field, value in row.items()})
+        snapshots.append(ClientFeatureSnapshot(client_id=client_id, behaviour_as_of=None, **values))
+    
+    ClientFeatureSnapshot.objects.bulk_create(
+        snapshots,
+        update_conflicts=True,
+        unique_fields=['client'],
+        update_fields=SNAPSHOT_FIELDS + ['behaviour_as_of', 'updated_at'],
+    )
+    
+    return {snapshot.client_id: snapshot for snapshot in snapshots}
+
+
+def apply_payment_to_snapshot(payment, sign=1):
+    """Ajoute (sign=1) ou retire (sign=-1) un paiement du snapshot de son client"""
+    
+    def delta(status):
+        return sign if payment.status == status else 0
+    
+    # Sans snapshot existant, rien à faire : il sera construit à la première lecture
+    ClientFeatureSnapshot.objects.filter(client_id=payment.client_id).update(
+        total_payments=F('total_payments') + sign,
+        late_payments=F('late_payments') + delta('LATE'),
+        default_payments=F('default_payments') + delta('DEFAULT'),
+        on_time_payments=F('on_time_payments') + delta('ON_TIME'),
+        sum_days_late=F('sum_days_late') + sign * payment.days_late,
+        updated_at=timezone.now(),
+    )
+
+
+def apply_transaction_to_snapshot(transaction, sign=1):
+    """Ajoute (sign=1) ou retire (sign=-1) une transaction du snapshot de son client"""
+    
+    amount = sign * transaction.amount
+    
+    ClientFeatureSnapshot.objects.filter(client_id=transaction.client_id).update(
+        transaction_count=F('transaction_count') + sign,
+        sum_balance_after=F('sum_balance_after') + sign * transaction.balance_after,
+        total_credits=F('total_credits') + (amount if transaction.transaction_type == 'CREDIT' else 0),
+        total_debits=F('total_debits') + (amount if transaction.transaction_type == 'DEBIT' else 0),
+        behaviour_as_of=None,
+        updated_at=timezone.now(),
+    )
+
+
+def get_behaviour_features_bulk(snapshots, as_of=None):
+    """
+    Features sur fenêtres glissantes de plusieurs clients ({client_id: snapshot}).
+    
+    Les features gardées dans un snapshot valent pour leur date
+    (behaviour_as_of) : seuls les snapshots d'un autre jour, ou invalidés par
+    une transaction ajoutée, modifiée ou supprimée, sont recalculés (une
+    lecture des transactions pour eux tous) puis réenregistrés.
+    
+    L'écriture est conditionnelle (updated_at inchangé depuis la lecture ;
+    .update() ne le modifie pas) : un snapshot invalidé entre-temps par une
+    transaction reste invalidé, et sera recalculé à la lecture suivante.
+    """
+    as_of = as_of or datetime.now().date()
+    names = set(behaviour_feature_names())
+    
+    stale = [
+        snapshot for snapshot in snapshots.values()
+        if snapshot.behaviour_as_of != as_of or set(snapshot.behaviour) != names
+    ]
+    if stale:
+        computed = compute_behaviour_features([snapshot.client_id for snapshot in stale], as_of=as_of)
+        for snapshot in stale:
+            ClientFeatureSnapshot.objects.filter(
+                pk=snapshot.pk, updated_at=snapshot.updated_at
+            ).update(behaviour=computed[snapshot.client_id], behaviour_as_of=as_of)
+            snapshot.behaviour = computed[snapshot.client_id]
+            snapshot.behaviour_as_of = as_of
+    
+    return {client_id: snapshot.behaviour for client_id, snapshot in snapshots.items()}
+
+
+def snapshot_payment_statistics(snapshot):
+    """Statistiques de paiements lues depuis un snapshot"""
+    return format_payment_statistics({
+        'total': snapshot.total_payments,
+        'late': snapshot.late_payments,
+        'default': snapshot.default_payments,
+        'on_time': snapshot.on_time_payments,
+        'avg_days_late': snapshot.avg_days_late,
+    })
+
+
+def snapshot_transaction_statistics(snapshot):
+    """Statistiques de transactions lues depuis un snapshot"""
+    return format_transaction_statistics({
+        'avg_balance': snapshot.avg_balance,
+        'total_credits': snapshot.total_credits,
+        'total_debits': snapshot.total_debits,
+        'transaction_count': snapshot.transaction_count,
+    })
@@ -0,0 +1,97 @@
+"""
+Signals Django du scoring - snapshots de features, rescoring automatique,
+cache des grilles de score et des challengers
+"""
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from apps.accounts.models import ClientProfile
+from .models import PaymentHistory, Transaction, Scorecard, Challenger
+from .challengers import invalidate_challenger_cache
+from .jobs import mark_clients_dirty
+from .scorecard import invalidate_scorecard_cache
+from .services import (
+    apply_payment_to_snapshot,
+    apply_transaction_to_snapshot,
+    rebuild_feature_snapshots,
+)
+
+@receiver(pre_save, sender=PaymentHistory)
+@receiver(pre_save, sender=Transaction)
+def remember_previous_client(sender, instance, raw=False, **kwargs):
+    """Ligne modifiée : client d'origine, dont le snapshot est aussi à recalculer si elle change de client"""
+    instance._previous_client_id = None
+    if raw or instance.pk is None:
+        return
+    instance._previous_client_id = (
+        sender.objects.filter(pk=instance.pk).values_list('client_id', flat=True).first()
+    )
+
+
+def modified_clients(instance):
+    """Clients touchés par la modification d'une ligne : le sien et, s'il a changé, l'ancien"""
+    previous = getattr(instance, '_previous_client_id', None)
+    return sorted({instance.client_id, previous} - {None})
+
+
+@receiver(post_save, sender=PaymentHistory)
+def update_snapshot_on_payment_save(sender, instance, created, raw=False, **kwargs):
+    """Paiement ajouté : incrément ; paiement modifié : recalcul du client (et de l'ancien s'il a changé)"""
+    if raw:
+        return
+    
+    if created:
+        apply_payment_to_snapshot(instance, sign=1)
+        mark_clients_dirty([instance.client_id])
+    else:
+        client_ids = modified_clients(instance)
+        rebuild_feature_snapshots(client_ids)
+        mark_clients_dirty(client_ids)
+
+@receiver(post_delete, sender=PaymentHistory)
+def update_snapshot_on_payment_delete(sender, instance, **kwargs):
+    """Paiement supprimé : décrément"""
+    apply_payment_to_snapshot(instance, sign=-1)
+    mark_clients_dirty([instance.client_id])
+
+@receiver(post_save, sender=Transaction)
+def update_snapshot_on_transaction_save(sender, instance, created, raw=False, **kwargs):
+    """Transaction ajoutée : incrément ; transaction modifiée : recalcul du client (et de l'ancien s'il a changé)"""
+    if raw:
+        return
+    
+    if created:
+        apply_transaction_to_snapshot(instance, sign=1)
+        mark_clients_dirty([instance.client_id])
+    else:
+        client_ids = modified_clients(instance)
+        rebuild_feature_snapshots(client_ids)
+        mark_clients_dirty(client_ids)
+
+@receiver(post_delete, sender=Transaction)
+def update_snapshot_on_transaction_delete(sender, instance, **kwargs):
+    """Transaction supprimée : décrément"""
+    apply_transaction_to_snapshot(instance, sign=-1)
+    mark_clients_dirty([instance.client_id])
+
+
+@receiver(post_save, sender=ClientProfile)
+@receiver(post_delete, sender=ClientProfile)
+def mark_client_on_profile_change(sender, instance, raw=False, **kwargs):
+    """Profil modifié : les demandes ouvertes du client seront rescorées (voir jobs.py)"""
+    if raw:
+        return
+    mark_clients_dirty([instance.user_id])
+
+
+@receiver(post_save, sender=Scorecard)
+@receiver(post_delete, sender=Scorecard)
+def reload_scorecard(sender, instance, **kwargs):
+    """Grille modifiée : recompilation au prochain scoring"""
+    invalidate_scorecard_cache()
+
+
+@receiver(post_save, sender=Challenger)
+@receiver(post_delete, sender=Challenger)
+def reload_challengers(sender, instance, **kwargs):
+    """Challenger ajouté, modifié ou retiré : relecture au prochain scoring"""
+    invalidate_challenger_cache()
@@ -1,3 +1,791 @@
-from django.test import TestCase
+import csv
+import json
+import random
+import tempfile
+from io import StringIO
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient, APITestCase
+
+from apps.accounts.models import ClientProfile, User
+from apps.demands.models import CreditDemand
+from . import challengers, scorecard
+from .behaviour import behaviour_feature_names, compute_behaviour_features
+from .drift import aggregate_score_histograms
+from .engine import score_batch
+from .export import SCORE_COLUMNS
+from .history import PAYLOAD_FIELDS, score_history
+from .jobs import claim_jobs, run_jobs
+from .ml import ModelRegistry
+from .models import (
+    Challenger, ClientFeatureSnapshot, CreditScore, CreditScoreHistory, PaymentHistory, Scorecard, ScoreHistogram,
+    ScoringDirtyClient, ScoringJob, ScorePayload, Transaction,
+)
+from .parallel import score_demand_range
+from .services import (
+    SNAPSHOT_FIELDS, calculate_scores, calculate_scores_or_errors, compute_advanced_score, compute_features_hash,
+    determine_risk_level, extract_features_bulk, generate_recommendation, get_behaviour_features_bulk,
+    get_feature_snapshots_bulk, identify_factors, rebuild_feature_snapshots,
+)
+from .training_data import SNAPSHOT_FORMATS, write_snapshot
+from .versions import bump_config_version
+
+
+def make_client(username, monthly_income=350000, with_history=True):
+    """Client avec profil, quelques paiements et transactions"""
+    client = User.objects.create_user(username=username, password='x', role='CLIENT')
+    ClientProfile.objects.create(
+        user=client,
+        cni_number=f'CM-{username}',
+        birth_date=date(1985, 3, 4),
+        birth_place='Yaoundé',
+        address='Bastos',
+        employment_status='EMPLOYEE',
+        seniority_years=Decimal('6'),
+        monthly_income=Decimal(monthly_income),
+        monthly_debt_payment=Decimal(monthly_income) * Decimal('0.2'),
+        bank_seniority_months=48,
+        dependents=2,
+    )
+    if with_history:
+        for days, days_late, status in [(20, 0, 'ON_TIME'), (80, 5, 'LATE'), (300, 0, 'ON_TIME')]:
+            PaymentHistory.objects.create(
+                client=client, credit_type='AUTO', amount=Decimal(50000),
+                payment_date=date.today() - timedelta(days=days), due_date=date.today() - timedelta(days=days),
+                days_late=days_late, status=status,
+            )
+        for days, amount, transaction_type in [(3, 400000, 'CREDIT'), (40, 150000, 'DEBIT'), (200, 90000, 'DEBIT')]:
+            Transaction.objects.create(
+                client=client, transaction_date=date.today() - timedelta(days=days), amount=Decimal(amount),
+                transaction_type=transaction_type, category='Salaire', balance_after=Decimal(800000),
+            )
+    return client
+
+
+def make_demand(client, amount=2000000, duration_months=24, credit_type='AUTO'):
+    return CreditDemand.objects.create(
+        client=client, credit_type=credit_type, amount=Decimal(amount), duration_months=duration_months, purpose='Test',
+    )
+
+
+def boundary_features(count, seed=0):
+    """Lignes de features tirées autour des seuils de la grille par défaut (valeurs égales comprises)"""
+    rng = random.Random(seed)
+    choices = {}
+    for spec in scorecard.DEFAULT_SCORECARD['features']:
+        points = spec['points']
+        if 'categories' in points:
+            choices[spec['feature']] = list(points['categories']) + ['AUTRE']
+        else:
+            choices[spec['feature']] = [b + delta for b in points['breakpoints'] for delta in (-0.01, 0, 0.01)] + [0]
+
+    rows = []
+    for _ in range(count):
+        features = {name: rng.choice(values) for name, values in choices.items()}
+        features['total_payments'] = rng.randint(0, 3)
+        features['default_payments'] = rng.randint(0, 3)
+        rows.append(features)
+    return rows
+
+
+class BatchScoringTests(TestCase):
+    """Moteur vectorisé : mêmes résultats que l'évaluation ligne par ligne"""
+
+    def setUp(self):
+        # Aucune grille en base : grille par défaut des deux côtés
+        scorecard._compiled.clear()
+
+    def test_batch_matches_scalar(self):
+        rows = boundary_features(2000)
+        results = score_batch(rows)
+
+        for features, result in zip(rows, results):
+            score = compute_advanced_score(features)
+            recommendation, confidence = generate_recommendation(score, features)
+            positive, negative = identify_factors(features, score)
+
+            self.assertEqual(result['score_value'], score, features)
+            self.assertEqual(result['risk_level'], determine_risk_level(score), features)
+            self.assertEqual((result['ai_recommendation'], result['confidence_level']), (recommendation, confidence))
+            self.assertEqual((result['factors_positive'], result['factors_negative']), (positive, negative))
+
+    def test_empty_batch(self):
+        self.assertEqual(score_batch([]), [])
+
+
+class ContributionTests(TestCase):
+    """Contributions additives : points de chaque feature moins la référence de la grille"""
+
+    def setUp(self):
+        scorecard._compiled.clear()
+        self.rows = boundary_features(500)
+
+    def test_default_contributions_are_points(self):
+        grid = scorecard.get_active_scorecard()
+        evaluation = grid.evaluate(self.rows, with_factors=False)
+
+        for features, result in zip(self.rows, score_batch(self.rows)):
+            contributions = result['contributions']
+            self.assertEqual(list(contributions), grid.feature_names)
+            raw_score = grid.base_score + sum(contributions.values())
+            self.assertEqual(result['score_value'], min(max(raw_score, grid.min_score), grid.max_score), features)
+        np.testing.assert_array_equal(evaluation['contributions'], evaluation['points'])
+
+    def test_contributions_are_relative_to_baseline(self):
+        definition = {
+            **scorecard.DEFAULT_SCORECARD,
+            'features': [
+                {**spec, 'baseline': 30} if spec['feature'] == 'monthly_income' else spec
+                for spec in scorecard.DEFAULT_SCORECARD['features']
+            ],
+        }
+        default = scorecard.compile_scorecard(scorecard.DEFAULT_SCORECARD).evaluate(self.rows, with_factors=False)
+        relative = scorecard.compile_scorecard(definition).evaluate(self.rows, with_factors=False)
+        column = scorecard.get_active_scorecard().feature_names.index('monthly_income')
+
+        np.testing.assert_array_equal(relative['scores'], default['scores'])
+        np.testing.assert_array_equal(relative['contributions'][:, column], default['points'][:, column] - 30)
+
+
+class ModelScoringTests(TestCase):
+    """Scoring par modèle ML : artefact chargé une fois, grille limitée aux facteurs"""
+
+    def setUp(self):
+        import joblib
+        from sklearn.linear_model import LogisticRegression
+
+        scorecard._compiled.clear()
+        self.rows = boundary_features(50)
+        features = ['monthly_income', 'debt_ratio']
+        estimator = LogisticRegression().fit(
+            [[row[name] for name in features] for row in self.rows],
+            [row['default_payments'] > 0 for row in self.rows],
+        )
+
+        models_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(models_dir.cleanup)
+        self.enterContext(override_settings(SCORING_MODELS_DIR=models_dir.name))
+        self.registry = ModelRegistry()
+        self.dump = lambda: joblib.dump(
+            {'model': estimator, 'features': features}, self.registry.artifact_path('test-model'),
+        )
+
+    def test_missing_artifact_is_not_cached(self):
+        self.assertIsNone(self.registry.get('test-model'))
+
+        self.dump()
+        model = self.registry.get('test-model')
+
+        self.assertEqual(model.version, 'test-model')
+        self.assertIs(self.registry.get('test-model'), model)
+
+    def test_model_mode_skips_scorecard_points(self):
+        self.dump()
+        model = self.registry.get('test-model')
+        grid = scorecard.get_active_scorecard()
+
+        with mock.patch.object(scorecard.CompiledScorecard, 'evaluate') as evaluate:
+            results = score_batch(self.rows, model=model)
+
+        evaluate.assert_not_called()
+        scores = model.predict_scores(self.rows)
+        for i, (result, (positive, negative)) in enumerate(zip(results, grid.factors_batch(self.rows))):
+            self.assertEqual(result['score_value'], scores[i])
+            self.assertEqual(result['risk_level'], grid.risk_level(scores[i]))
+            self.assertEqual((result['factors_positive'], result['factors_negative']), (positive, negative))
+            self.assertEqual((result['model_version'], result['contributions']), ('test-model', {}))
+
+
+@override_settings(SCORING_JOB_MAX_ATTEMPTS=2, SCORING_JOB_RETRY_DELAY=30)
+class ScoringJobTests(TestCase):
+    """File de scoring : réservation exclusive, reprise avec backoff puis FAILED"""
+
+    def setUp(self):
+        # La création d'une demande PENDING_ANALYST met une tâche en file
+        self.demands = [make_demand(make_client(f'job{i}')) for i in range(3)]
+
+    def test_jobs_are_claimed_once(self):
+        first = claim_jobs('worker-1', 2)
+        second = claim_jobs('worker-2', 10)
+
+        self.assertEqual(len(first), 2)
+        self.assertEqual(len(second), 1)
+        self.assertFalse({job.id for job in first} & {job.id for job in second})
+        self.assertEqual(claim_jobs('worker-3', 10), [])
+
+    def test_failing_demand_is_retried_then_failed(self):
+        failing = self.demands[0]
+
+        def calculate_scores(demands, **kwargs):
+            if failing in demands:
+                raise ValueError('features invalides')
+            return []
+
+        with mock.patch('apps.scoring.services.calculate_scores', side_effect=calculate_scores):
+            summary = run_jobs(claim_jobs('worker', 10))
+            self.assertEqual((summary['done'], summary['failed']), (2, 1))
+
+            job = ScoringJob.objects.get(demand=failing)
+            self.assertEqual((job.status, job.attempts, job.last_error), ('PENDING', 1, 'features invalides'))
+            self.assertGreater(job.run_after, timezone.now() + timedelta(seconds=25))
+
+            # Pas de nouvelle tentative avant la fin du délai
+            self.assertEqual(claim_jobs('worker', 10), [])
+
+            ScoringJob.objects.filter(id=job.id).update(run_after=timezone.now())
+            run_jobs(claim_jobs('worker', 10))
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('FAILED', 2))
+        self.assertEqual(ScoringJob.objects.filter(status='DONE').count(), 2)
+
+
+class DirtyClientTests(TestCase):
+    """Marquage des clients à rescorer (jobs.mark_clients_dirty)"""
+
+    def test_payment_marks_client_after_commit(self):
+        client = make_client('dirty', with_history=False)
+        ScoringDirtyClient.objects.all().delete()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            PaymentHistory.objects.create(
+                client=client, credit_type='AUTO', amount=Decimal(50000),
+                payment_date=date.today(), due_date=date.today(), days_late=0, status='ON_TIME',
+            )
+
+        self.assertTrue(ScoringDirtyClient.objects.filter(client=client).exists())
+
+    def test_deleting_client_does_not_mark_it(self):
+        client = make_client('deleted')
+        ScoringDirtyClient.objects.all().delete()
+
+        # La cascade supprime paiements, transactions et profil (signaux post_delete)
+        with self.captureOnCommitCallbacks(execute=True):
+            client.delete()
+
+        self.assertFalse(User.objects.filter(id=client.id).exists())
+        self.assertFalse(ScoringDirtyClient.objects.exists())
+
+
+@override_settings(CONFIG_VERSION_CHECK_INTERVAL=0)
+class ScorecardCacheTests(TestCase):
+    """Grille compilée par processus, recompilée quand sa version change en base"""
+
+    def setUp(self):
+        scorecard._compiled.clear()
+
+    def test_activation_by_another_process_is_seen(self):
+        self.assertEqual(scorecard.get_active_scorecard().version, scorecard.DEFAULT_SCORECARD['version'])
+
+        # Écritures d'un autre processus : pas de signal dans celui-ci
+        Scorecard.objects.bulk_create([
+            Scorecard(version='test-v2', definition=scorecard.DEFAULT_SCORECARD, is_active=True),
+        ])
+        self.assertEqual(scorecard.get_active_scorecard().version, scorecard.DEFAULT_SCORECARD['version'])
+
+        bump_config_version(scorecard.SCORECARDS_VERSION)
+        self.assertEqual(scorecard.get_active_scorecard().version, 'test-v2')
+
+
+@override_settings(CONFIG_VERSION_CHECK_INTERVAL=0)
+class ChallengerCacheTests(TestCase):
+    """Challengers actifs relus quand leur version change en base"""
+
+    def setUp(self):
+        challengers._active.clear()
+
+    def test_activation_by_another_process_is_seen(self):
+        self.assertEqual(challengers.get_active_challengers(), [])
+
+        # Écritures d'un autre processus : pas de signal dans celui-ci
+        Challenger.objects.bulk_create([Challenger(version='test-challenger')])
+        self.assertEqual(challengers.get_active_challengers(), [])
+
+        bump_config_version(challengers.CHALLENGERS_VERSION)
+        self.assertEqual(
+            [challenger.version for challenger in challengers.get_active_challengers()],
+            ['test-challenger'],
+        )
+
+
+class ExtractFeaturesBulkTests(TestCase):
+    """Extraction en masse : nombre de requêtes indépendant du nombre de demandes"""
+
+    def test_queries_do_not_depend_on_batch_size(self):
+        demand_ids = [make_demand(make_client(f'bulk{i}')).id for i in range(6)]
+
+        def count_queries(ids):
+            # Demandes chargées sans select_related('client')
+            demands = list(CreditDemand.objects.filter(id__in=ids))
+            with CaptureQueriesContext(connection) as queries:
+                features = extract_features_bulk(demands)
+            self.assertTrue(all(features[demand_id] is not None for demand_id in ids))
+            return len(queries)
+
+        # Premier passage : construction des snapshots manquants
+        count_queries(demand_ids)
+        self.assertEqual(count_queries(demand_ids), count_queries(demand_ids[:2]))
+
+
+class FeatureSnapshotTests(TestCase):
+    """Snapshots maintenus par les signaux : identiques à un recalcul complet"""
+
+    def setUp(self):
+        self.first = make_client('snapshot-a')
+        self.second = make_client('snapshot-b')
+        get_feature_snapshots_bulk([self.first.id, self.second.id])
+
+    def assertSnapshotsUpToDate(self):
+        client_ids = [self.first.id, self.second.id]
+        stored = {
+            snapshot.client_id: [getattr(snapshot, field) for field in SNAPSHOT_FIELDS]
+            for snapshot in ClientFeatureSnapshot.objects.filter(client_id__in=client_ids)
+        }
+        rebuilt = {
+            client_id: [getattr(snapshot, field) for field in SNAPSHOT_FIELDS]
+            for client_id, snapshot in rebuild_feature_snapshots(client_ids).items()
+        }
+        self.assertEqual(stored, rebuilt)
+
+    def test_incremental_updates_match_rebuild(self):
+        payment = PaymentHistory.objects.create(
+            client=self.first, credit_type='AUTO', amount=Decimal(50000),
+            payment_date=date.today(), due_date=date.today(), days_late=40, status='DEFAULT',
+        )
+        Transaction.objects.create(
+            client=self.first, transaction_date=date.today(), amount=Decimal(120000),
+            transaction_type='DEBIT', category='Loyer', balance_after=Decimal(680000),
+        )
+        Transaction.objects.filter(client=self.first).first().delete()
+        payment.status = 'LATE'
+        payment.save()
+
+        self.assertSnapshotsUpToDate()
+
+    def test_rows_moved_to_another_client(self):
+        payment = PaymentHistory.objects.filter(client=self.first, status='LATE').get()
+        payment.client = self.second
+        payment.save()
+        transaction = Transaction.objects.filter(client=self.first).first()
+        transaction.client = self.second
+        transaction.save()
+
+        self.assertSnapshotsUpToDate()
+        self.assertEqual(ClientFeatureSnapshot.objects.get(client=self.first).late_payments, 0)
+        self.assertEqual(ClientFeatureSnapshot.objects.get(client=self.second).late_payments, 2)
+
+    def test_rebuild_command_updates_in_place(self):
+        before = dict(ClientFeatureSnapshot.objects.values_list('client_id', 'id'))
+        ClientFeatureSnapshot.objects.filter(client=self.first).update(total_payments=99)
+
+        call_command('rebuild_feature_snapshots', stdout=StringIO())
+
+        self.assertEqual(dict(ClientFeatureSnapshot.objects.values_list('client_id', 'id')), before)
+        self.assertSnapshotsUpToDate()
+        self.assertEqual(ClientFeatureSnapshot.objects.get(client=self.first).total_payments, 3)
+
+
+class BehaviourFeaturesTests(TestCase):
+    """Features sur fenêtres glissantes : volatilité stable, gardées dans le snapshot pour la journée"""
+
+    def test_volatility_of_large_balances(self):
+        client = make_client('volatility', with_history=False)
+        balances = [9999999990 + k for k in range(4)]
+        for days, balance in zip([1, 2, 40, 100], balances):
+            Transaction.objects.create(
+                client=client, transaction_date=date.today() - timedelta(days=days), amount=Decimal(1000),
+                transaction_type='DEBIT', category='Courses', balance_after=Decimal(balance),
+            )
+
+        features = compute_behaviour_features([client.id])[client.id]
+
+        self.assertAlmostEqual(features['balance_volatility_30d'], 0.5, places=2)
+        self.assertAlmostEqual(features['balance_volatility_365d'], float(np.std(balances)), places=2)
+
+    def test_snapshot_keeps_features_until_a_transaction_changes(self):
+        demand = make_demand(make_client('behaviour'))
+        features = extract_features_bulk([demand])[demand.id]
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(extract_features_bulk([demand])[demand.id], features)
+        self.assertFalse(any('"transactions"' in query['sql'] for query in queries.captured_queries))
+
+        Transaction.objects.create(
+            client_id=demand.client_id, transaction_date=date.today(), amount=Decimal(250000),
+            transaction_type='CREDIT', category='Salaire', balance_after=Decimal(1050000),
+        )
+        updated = extract_features_bulk([demand])[demand.id]
+
+        self.assertEqual(updated['credits_30d'], features['credits_30d'] + 250000)
+        self.assertEqual(updated['transaction_count_365d'], features['transaction_count_365d'] + 1)
+
+    def test_transaction_during_extraction_is_not_overwritten(self):
+        client = make_client('behaviour-race')
+        snapshots = get_feature_snapshots_bulk([client.id])
+
+        # Transaction enregistrée entre la lecture du snapshot et l'écriture des features
+        Transaction.objects.create(
+            client=client, transaction_date=date.today(), amount=Decimal(250000),
+            transaction_type='CREDIT', category='Salaire', balance_after=Decimal(1050000),
+        )
+        get_behaviour_features_bulk(snapshots)
+
+        self.assertIsNone(ClientFeatureSnapshot.objects.get(client=client).behaviour_as_of)
+        self.assertEqual(get_behaviour_features_bulk(get_feature_snapshots_bulk([client.id]))[client.id][
+            'transaction_count_30d'
+        ], 2)
+
+
+class FeaturesHashTests(TestCase):
+    """Empreinte du résultat du scoring : stable d'un jour à l'autre à données égales"""
+
+    def setUp(self):
+        self.demand = make_demand(make_client('hash'))
+        self.features = extract_features_bulk([self.demand])[self.demand.id]
+
+    def test_date_derived_features_do_not_change_the_hash(self):
+        next_day = dict(self.features)
+        next_day['age'] += 1 / 365.25
+        for name in behaviour_feature_names():
+            next_day[name] = next_day[name] * 0.9
+
+        self.assertEqual(compute_features_hash(next_day), compute_features_hash(self.features))
+
+    def test_band_change_changes_the_hash(self):
+        changed = dict(self.features, default_payments=1)
+
+        self.assertNotEqual(compute_features_hash(changed), compute_features_hash(self.features))
+
+    def test_unchanged_demand_is_not_rescored(self):
+        calculate_scores([self.demand])
+        calculate_scores([self.demand])
+
+        # Un score réécrit est historisé : une seule ligne, celle du premier calcul
+        self.assertEqual(CreditScoreHistory.objects.filter(demand=self.demand).count(), 1)
+
+    def test_scorecard_edited_in_place_rescores(self):
+        scorecard._compiled.clear()
+        grid = Scorecard.objects.create(version='test-edit', definition=scorecard.DEFAULT_SCORECARD, is_active=True)
+        score = calculate_scores([self.demand])[0].score_value
+
+        # Même version, points modifiés
+        grid.definition = dict(scorecard.DEFAULT_SCORECARD, base_score=scorecard.DEFAULT_SCORECARD['base_score'] - 100)
+        grid.save()
+
+        self.assertEqual(calculate_scores([self.demand])[0].score_value, score - 100)
+
+
+class ScoreHistoryTests(TestCase):
+    """Historique des scores : contenus JSON identiques stockés une seule fois"""
+
+    def test_identical_recalculation_shares_payloads(self):
+        demand = make_demand(make_client('history'))
+        calculate_scores([demand])
+        payloads = ScorePayload.objects.count()
+
+        calculate_scores([demand], force=True)
+
+        self.assertEqual(ScorePayload.objects.count(), payloads)
+        first, second = CreditScoreHistory.objects.filter(demand=demand)
+        for field in PAYLOAD_FIELDS:
+            self.assertEqual(getattr(first, f'{field}_id'), getattr(second, f'{field}_id'))
+
+        score = CreditScore.objects.get(demand=demand)
+        entry = score_history(demand.id)[0]
+        self.assertEqual(entry['score_value'], score.score_value)
+        for field in PAYLOAD_FIELDS:
+            self.assertEqual(entry[field], getattr(score, field))
+
+
+@override_settings(SCORING_DRIFT_AGGREGATION_LAG=0)
+class DriftAggregationTests(TestCase):
+    """Histogrammes de dérive agrégés depuis l'historique, hors du chemin d'écriture des scores"""
+
+    def test_history_is_aggregated_once(self):
+        demands = [make_demand(make_client(f'drift{i}')) for i in range(3)]
+        scores = calculate_scores(demands)
+
+        # Rien n'est écrit dans score_histograms pendant le scoring
+        self.assertFalse(ScoreHistogram.objects.exists())
+
+        self.assertEqual(aggregate_score_histograms(), 3)
+        self.assertEqual(aggregate_score_histograms(), 0)
+
+        histogram = ScoreHistogram.objects.get(feature='score_value', model_version=scores[0].model_version)
+        self.assertEqual(histogram.total, 3)
+
+    def test_drift_endpoint_is_read_only(self):
+        calculate_scores([make_demand(make_client('drift-view'))])
+        api = APIClient()
+        api.force_authenticate(User.objects.create_user(username='drift-agent', password='x', role='AGENT'))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = api.get('/api/scoring/drift/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(ScoreHistogram.objects.exists())
+        self.assertFalse([q['sql'] for q in queries.captured_queries if not q['sql'].startswith('SELECT')])
+
+
+class TrainingSnapshotTests(TestCase):
+    """Instantané d'entraînement incrémental : étiquettes à jour, un score par ligne"""
+
+    def read(self, output_dir, file_format):
+        import pyarrow.dataset as ds
+
+        table = ds.dataset(output_dir, format=file_format, partitioning='hive').to_table()
+        return dict(zip(table['demand_id'].to_pylist(), table['label_approved'].to_pylist()))
+
+    def test_decided_demand_is_reexported(self):
+        demands = [make_demand(make_client(f'snapshot{i}')) for i in range(3)]
+        calculate_scores(demands)
+        output_dirs = {file_format: tempfile.TemporaryDirectory() for file_format in SNAPSHOT_FORMATS}
+        for file_format, output_dir in output_dirs.items():
+            self.addCleanup(output_dir.cleanup)
+            write_snapshot(output_dir.name, file_format)
+            self.assertEqual(self.read(output_dir.name, file_format), {demand.id: None for demand in demands})
+
+        decided = demands[0]
+        decided.status = 'APPROVED'
+        decided.save()
+        new = make_demand(make_client('snapshot-new'))
+        calculate_scores([new])
+
+        for file_format, output_dir in output_dirs.items():
+            manifest = write_snapshot(output_dir.name, file_format)
+
+            self.assertEqual((manifest['last_run_rows'], manifest['last_run_updated'], manifest['rows']), (2, 1, 4))
+            self.assertEqual(
+                self.read(output_dir.name, file_format),
+                {**{demand.id: None for demand in demands}, decided.id: 1, new.id: None},
+            )
+            # Rien de modifié depuis : aucune ligne écrite
+            self.assertEqual(write_snapshot(output_dir.name, file_format)['last_run_rows'], 0)
+
+
+@override_settings(SCORING_SIMULATION_MAX_CANDIDATES=500)
+class SimulationApiTests(APITestCase):
+    """POST /api/scoring/scores/simulate/ : grille what-if plafonnée"""
+
+    url = '/api/scoring/scores/simulate/'
+
+    def setUp(self):
+        self.client.force_authenticate(User.objects.create_user(username='agent', password='x', role='AGENT'))
+        self.customer = make_client('simulated')
+
+    def test_grid_is_scored(self):
+        response = self.client.post(self.url, {
+            'client_id': self.customer.id,
+            'amounts': [1000000, 2000000],
+            'durations': [12, 24, 36],
+            'credit_types': ['AUTO', 'CONSUMPTION'],
+        }, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 12)
+        self.assertEqual(
+            {(r['amount'], r['duration_months'], r['credit_type']) for r in response.data['results']},
+            {(a, d, t) for a in [1000000.0, 2000000.0] for d in [12, 24, 36] for t in ['AUTO', 'CONSUMPTION']},
+        )
+
+    def test_grid_size_is_checked_before_building_it(self):
+        response = self.client.post(self.url, {
+            'client_id': self.customer.id,
+            'amounts': [100000 + i for i in range(500)],
+            'durations': [6 + i % 300 for i in range(500)],
+        }, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('250000 variantes', str(response.data))
+
+    def test_lists_are_capped(self):
+        for field, values in [
+            ('amounts', [1000000] * 501),
+            ('durations', [12] * 501),
+            ('candidates', [{'amount': 1000000, 'duration_months': 12, 'credit_type': 'AUTO'}] * 501),
+        ]:
+            data = {'client_id': self.customer.id, 'amounts': [1000000], 'durations': [12], field: values}
+            response = self.client.post(self.url, data, format='json')
+
+            self.assertEqual(response.status_code, 400, field)
+            self.assertIn(field, response.data)
+
+    def test_unknown_client(self):
+        response = self.client.post(
+            self.url, {'client_id': 999999, 'amounts': [1000000], 'durations': [12]}, format='json',
+        )
+
+        self.assertEqual(response.status_code, 404)
+
+
+class ExportApiTests(APITestCase):
+    """GET /api/scoring/scores/export/ : export en flux NDJSON ou CSV"""
+
+    url = '/api/scoring/scores/export/'
+
+    def setUp(self):
+        self.client.force_authenticate(User.objects.create_user(username='agent', password='x', role='AGENT'))
+        self.demands = [make_demand(make_client(f'export{i}')) for i in range(2)]
+        calculate_scores(self.demands)
+        CreditScore.objects.filter(demand=self.demands[0]).update(
+            calculated_at=timezone.now() - timedelta(days=30)
+        )
+
+    def export(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_ndjson_by_default(self):
+        rows = [json.loads(line) for line in self.export().splitlines()]
+
+        self.assertEqual([row['demand_id'] for row in rows], [demand.id for demand in self.demands])
+        self.assertEqual(rows[0]['features_used'], self.demands[0].score.features_used)
+
+    def test_csv_columns(self):
+        rows = list(csv.reader(self.export(export_format='csv').splitlines()))
+        features = sorted(self.demands[0].score.features_used)
+
+        self.assertEqual(rows[0], SCORE_COLUMNS + [f'f_{name}' for name in features])
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[1][0], str(self.demands[0].id))
+
+    def test_date_filters(self):
+        today = timezone.now().date()
+        recent = self.export(start=str(today - timedelta(days=1)))
+        older = self.export(end=str(today - timedelta(days=1)))
+
+        self.assertEqual([json.loads(line)['demand_id'] for line in recent.splitlines()], [self.demands[1].id])
+        self.assertEqual([json.loads(line)['demand_id'] for line in older.splitlines()], [self.demands[0].id])
+
+    def test_invalid_parameters(self):
+        for params in [{'export_format': 'xml'}, {'start': '16/10/2026'}, {'end': '2026-13-01'}]:
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, 400, params)
+
+
+@override_settings(SCORING_BATCH_MAX_DEMANDS=5)
+class CalculateBatchApiTests(APITestCase):
+    """POST /api/scoring/scores/calculate_batch/ : résultat par demande"""
+
+    url = '/api/scoring/scores/calculate_batch/'
+
+    def setUp(self):
+        self.client.force_authenticate(User.objects.create_user(username='batch-agent', password='x', role='AGENT'))
+        self.demands = [make_demand(make_client(f'batch{i}')) for i in range(3)]
+
+    def test_results_per_demand(self):
+        ids = [self.demands[1].id, 999999, self.demands[0].id, self.demands[1].id]
+        response = self.client.post(self.url, {'demand_ids': ids}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        # Doublons retirés, ordre de la requête conservé
+        self.assertEqual([r['demand_id'] for r in response.data['results']], [ids[0], 999999, ids[2]])
+        self.assertEqual((response.data['count'], response.data['scored'], response.data['errors']), (3, 2, 1))
+        self.assertEqual(response.data['results'][1]['error'], 'Demande non trouvée')
+        self.assertEqual(
+            response.data['results'][0]['score']['score_value'],
+            CreditScore.objects.get(demand=self.demands[1]).score_value,
+        )
+
+    def test_failing_demand_does_not_block_the_others(self):
+        failing = self.demands[0]
+        calculate = calculate_scores
+
+        def calculate_scores_failing(demands, **kwargs):
+            if failing in demands:
+                raise ValueError('revenu invalide')
+            return calculate(demands, **kwargs)
+
+        with mock.patch('apps.scoring.services.calculate_scores', side_effect=calculate_scores_failing):
+            with self.assertLogs('apps.scoring.services', level='ERROR'):
+                response = self.client.post(
+                    self.url, {'demand_ids': [demand.id for demand in self.demands]}, format='json',
+                )
+
+        self.assertEqual(response.data['scored'], 2)
+        self.assertEqual(response.data['results'][0], {'demand_id': failing.id, 'error': 'revenu invalide'})
+        self.assertEqual(CreditScore.objects.filter(demand__in=self.demands).count(), 2)
+
+    def test_database_error_is_not_retried_per_demand(self):
+        outage = OperationalError('base indisponible')
+        with mock.patch('apps.scoring.services.calculate_scores', side_effect=outage) as calculate:
+            with self.assertRaises(OperationalError):
+                calculate_scores_or_errors(self.demands)
+
+        self.assertEqual(calculate.call_count, 1)
+
+    def test_batch_size_is_capped(self):
+        response = self.client.post(self.url, {'demand_ids': list(range(1, 7))}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('demand_ids', response.data)
+
+
+class ParallelRecalculationTests(TestCase):
+    """recalculate_scores : tranches d'ids scorées par un pool de processus"""
+
+    def setUp(self):
+        self.demands = [make_demand(make_client(f'range{i}')) for i in range(3)]
+        checkpoint_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(checkpoint_dir.cleanup)
+        self.checkpoint = f'{checkpoint_dir.name}/checkpoint.json'
+
+    def test_range_reports_failing_demands(self):
+        failing = self.demands[1]
+        calculate = calculate_scores
+
+        def calculate_scores_failing(demands, **kwargs):
+            if failing in demands:
+                raise ValueError('profil incohérent')
+            return calculate(demands, **kwargs)
+
+        with mock.patch('apps.scoring.services.calculate_scores', side_effect=calculate_scores_failing):
+            with self.assertLogs('apps.scoring.services', level='ERROR'):
+                result = score_demand_range((self.demands[0].id, self.demands[-1].id, True, False, None))
+
+        self.assertEqual(result['count'], 3)
+        self.assertEqual(result['errors'], [{'demand_id': failing.id, 'error': 'profil incohérent'}])
+        self.assertEqual(CreditScore.objects.filter(demand__in=self.demands).count(), 2)
+
+    def run_with_pool(self, results):
+        with mock.patch('apps.scoring.management.commands.recalculate_scores.multiprocessing.Pool') as Pool:
+            Pool.return_value.imap.return_value = results
+            self.pool_mock = Pool.return_value
+            call_command('recalculate_scores', workers=2, checkpoint=self.checkpoint, stdout=StringIO())
+        return Pool.return_value
+
+    def test_pool_is_closed_after_completion(self):
+        pool = self.run_with_pool(iter([score_demand_range((self.demands[0].id, self.demands[-1].id, True, False, None))]))
+
+        pool.close.assert_called_once()
+        pool.terminate.assert_not_called()
+
+    def test_interrupt_terminates_pool(self):
+        def interrupted():
+            yield score_demand_range((self.demands[0].id, self.demands[0].id, True, False, None))
+            raise KeyboardInterrupt
+
+        with self.assertRaises(KeyboardInterrupt):
+            self.run_with_pool(interrupted())
+
+        pool = self.pool_mock
+        pool.terminate.assert_called_once()
+        pool.close.assert_not_called()
+
+    def test_interrupt_does_not_wait_for_queued_ranges(self):
+        with mock.patch('apps.scoring.management.commands.recalculate_scores.multiprocessing.Pool') as Pool:
+            Pool.return_value.imap.side_effect = KeyboardInterrupt
+            with self.assertRaises(KeyboardInterrupt):
+                call_command('recalculate_scores', workers=2, checkpoint=self.checkpoint, stdout=StringIO())
+
+        Pool.return_value.terminate.assert_called_once()
+        Pool.return_value.close.assert_not_called()
@@ -0,0 +1,329 @@
+"""
+Instantanés colonnaires des features pour l'entraînement hors ligne
+
+Chaque demande scorée devient une ligne : métadonnées de la demande, score,
+une colonne par feature (contenu de features_used) et étiquettes de
+résultat :
+    demand_status         statut de la demande
+    label_approved        1 si APPROVED, 0 si REJECTED, vide sinon
+    late_payments_after   paiements en retard du client depuis la demande
+    defaults_after        paiements en défaut du client depuis la demande
+    label_default         1 si au moins un défaut depuis la demande, sinon 0
+
+Les fichiers sont écrits par paquets, partitionnés par version de modèle
+(model_version=<version>/part-<run>-<paquet>.<ext>, lisible par
+pyarrow.dataset ou pandas.read_parquet sur le dossier). Un manifeste
+(_manifest.json) garde le dernier score exporté et la date du dernier
+export : un nouvel instantané ajoute les scores créés depuis (nouvelles
+demandes) et réexporte ceux dont les étiquettes ou le score ont pu changer
+(demande modifiée, par exemple décidée ; demande rescorée ; paiement en
+retard ou en défaut daté d'après le dernier export). Les anciennes lignes
+de ces scores sont retirées de leurs fichiers : chaque score figure une
+seule fois dans l'instantané.
+
+Feather est écrit sans compression : un notebook peut le mapper en mémoire
+(pyarrow.feather.read_table(path, memory_map=True)) sans copie.
+
+pyarrow (requirements/base.txt) n'est importé que par cet export.
+"""
+import json
+import re
+from bisect import bisect_left
+from datetime import datetime
+from pathlib import Path
+
+from django.db.models import Count, Exists, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+SNAPSHOT_FORMATS = ['parquet', 'feather']
+
+# Préfixe '_' : ignoré par pyarrow.dataset lors de la lecture du dossier
+MANIFEST_NAME = '_manifest.json'
+
+BASE_COLUMNS = [
+    'score_id', 'demand_id', 'client_id', 'demand_created_at',
+    'score_value', 'risk_level', 'ai_recommendation', 'model_version', 'features_hash', 'calculated_at',
+]
+
+LABEL_COLUMNS = ['demand_status', 'label_approved', 'late_payments_after', 'defaults_after', 'label_default']
+
+# Colonnes souvent entièrement vides dans un fichier (demandes non décidées) :
+# type fixé pour que tous les fichiers de l'instantané aient le même schéma
+COLUMN_TYPES = {'label_approved': 'int64'}
+
+
+def load_manifest(output_dir):
+    path = Path(output_dir) / MANIFEST_NAME
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding='utf-8'))
+
+
+def save_manifest(output_dir, manifest):
+    path = Path(output_dir) / MANIFEST_NAME
+    tmp = path.with_suffix('.tmp')
+    tmp.write_text(json.dumps(manifest, indent=2), encoding='utf-8')
+    tmp.replace(path)
+
+
+def payments_after_demand(status):
+    """Sous-requête : paiements du client de ce statut depuis la date de la demande"""
+    from .models import PaymentHistory
+
+    payments = (
+        PaymentHistory.objects.filter(
+            client_id=OuterRef('demand__client_id'),
+            payment_date__gte=OuterRef('demand__created_at__date'),
+            status=status,
+        )
+        .order_by()
+        .values('client_id')
+        .annotate(count=Count('id'))
+        .values('count')
+    )
+    return Coalesce(Subquery(payments, output_field=IntegerField()), 0)
+
+
+def changed_since(since):
+    """Condition : étiquettes ou score d'un score déjà exporté susceptibles d'avoir changé depuis since"""
+    from .models import CreditScoreHistory, PaymentHistory
+
+    rescored = CreditScoreHistory.objects.filter(demand_id=OuterRef('demand_id'), calculated_at__gt=since)
+    new_incidents = PaymentHistory.objects.filter(
+        client_id=OuterRef('demand__client_id'),
+        payment_date__gte=OuterRef('demand__created_at__date'),
+        status__in=['LATE', 'DEFAULT'],
+    ).filter(payment_date__gte=timezone.localdate(since))
+    return Q(demand__updated_at__gt=since) | Q(Exists(rescored)) | Q(Exists(new_incidents))
+
+
+def snapshot_queryset(after_score_id=0, since=None):
+    """Scores à exporter (id croissant), étiquettes calculées par la base
+
+    since : réexporter aussi les scores déjà exportés modifiés depuis cette date.
+    """
+    from .models import CreditScore
+
+    selected = Q(id__gt=after_score_id)
+    if since is not None:
+        selected |= changed_since(since)
+
+    return (
+        CreditScore.objects.filter(selected)
+        .exclude(features_used={})
+        .annotate(
+            late_payments_after=payments_after_demand('LATE'),
+            defaults_after=payments_after_demand('DEFAULT'),
+        )
+        .order_by('id')
+        .values_list(
+            'id', 'demand_id', 'demand__client_id', 'demand__created_at',
+            'score_value', 'risk_level', 'ai_recommendation', 'model_version', 'features_hash', 'calculated_at',
+            'demand__status', 'late_payments_after', 'defaults_after', 'features_used',
+        )
+    )
+
+
+def build_columns(rows, feature_names):
+    """Colonnes (dict nom -> liste) d'un paquet de lignes"""
+    columns = {name: [] for name in BASE_COLUMNS + feature_names + LABEL_COLUMNS}
+
+    for row in rows:
+        for name, value in zip(BASE_COLUMNS, row[:len(BASE_COLUMNS)]):
+            columns[name].append(value)
+
+        features = row[-1]
+        for name in feature_names:
+            columns[name].append(features.get(name))
+
+        status, late, defaults = row[len(BASE_COLUMNS):len(BASE_COLUMNS) + 3]
+        columns['demand_status'].append(status)
+        columns['label_approved'].append({'APPROVED': 1, 'REJECTED': 0}.get(status))
+        columns['late_payments_after'].append(late)
+        columns['defaults_after'].append(defaults)
+        columns['label_default'].append(int(defaults > 0))
+
+    return columns
+
+
+def partition_name(model_version):
+    """Dossier de partition (style Hive), nom de version assaini pour le système de fichiers"""
+    return 'model_version=' + re.sub(r'[^A-Za-z0-9._-]', '_', model_version)
+
+
+def write_table(table, path, file_format):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if file_format == 'feather':
+        import pyarrow.feather as feather
+
+        feather.write_feather(table, path, compression='uncompressed')
+    else:
+        import pyarrow.parquet as pq
+
+        pq.write_table(table, path)
+    return table.num_rows
+
+
+def read_table(path, file_format):
+    if file_format == 'feather':
+        import pyarrow.feather as feather
+
+        return feather.read_table(path, memory_map=False)
+    import pyarrow.parquet as pq
+
+    return pq.read_table(path)
+
+
+def write_part(columns, path, file_format):
+    import pyarrow as pa
+
+    table = pa.table({name: pa.array(values, type=COLUMN_TYPES.get(name)) for name, values in columns.items()})
+    return write_table(table, path, file_format)
+
+
+def remove_rows(output_dir, manifest, score_ids):
+    """
+    Retire des fichiers déjà écrits les lignes de ces scores (avant leur réexport).
+
+    Seuls les fichiers dont l'intervalle d'ids contient un de ces scores sont
+    relus ; un fichier vidé est supprimé. Retourne le nombre de lignes retirées.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    score_ids = sorted(score_ids)
+    if not score_ids:
+        return 0
+
+    removed = 0
+    parts = []
+    for part in manifest['parts']:
+        first = bisect_left(score_ids, part['first_score_id'])
+        if first == len(score_ids) or score_ids[first] > part['last_score_id']:
+            parts.append(part)
+            continue
+
+        path = output_dir / part['file']
+        table = read_table(path, manifest['format'])
+        stale = pc.is_in(table['score_id'], value_set=pa.array(score_ids, type=table['score_id'].type))
+        kept = table.filter(pc.invert(stale))
+        removed += table.num_rows - kept.num_rows
+
+        if kept.num_rows == 0:
+            path.unlink(missing_ok=True)
+            continue
+        if kept.num_rows < table.num_rows:
+            # Préfixe '.' : fichier temporaire ignoré par pyarrow.dataset
+            tmp = path.with_name('.' + path.name)
+            write_table(kept, tmp, manifest['format'])
+            tmp.replace(path)
+            part['rows'] = kept.num_rows
+        parts.append(part)
+
+    manifest['parts'] = parts
+    manifest['rows'] -= removed
+    return removed
+
+
+def write_snapshot(output_dir, file_format='parquet', chunk_size=10000, full=False, progress=None):
+    """
+    Écrit les scores non encore exportés, ou modifiés depuis le dernier export, dans output_dir, par paquets.
+
+    full=True repart de zéro (manifeste ignoré, anciens fichiers supprimés).
+    Retourne le manifeste mis à jour.
+    """
+    from .models import CreditScore
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    manifest = None if full else load_manifest(output_dir)
+    if manifest is not None and manifest['format'] != file_format:
+        raise ValueError(f"Instantané existant au format {manifest['format']} (utiliser --full pour changer)")
+
+    if manifest is None:
+        for part in (load_manifest(output_dir) or {}).get('parts', []):
+            (output_dir / part['file']).unlink(missing_ok=True)
+        manifest = {
+            'format': file_format,
+            'last_score_id': 0,
+            'exported_until': None,
+            'feature_names': None,
+            'runs': 0,
+            'rows': 0,
+            'parts': [],
+        }
+
+    # Date lue avant l'export : une modification pendant l'export sera reprise au suivant
+    started_at = timezone.now()
+    since = manifest.get('exported_until') or manifest.get('updated_at')
+    since = datetime.fromisoformat(since) if since else None
+
+    # Numéro d'exécution réservé d'emblée : un export interrompu ne sera pas écrasé
+    manifest['runs'] += 1
+    run = manifest['runs']
+
+    # Scores déjà exportés à réécrire : leurs anciennes lignes sont retirées d'abord
+    # (un export interrompu les retrouvera, ainsi que leurs lignes déjà réécrites)
+    updated = 0
+    if since is not None:
+        updated = remove_rows(
+            output_dir,
+            manifest,
+            CreditScore.objects.filter(changed_since(since), id__lte=manifest['last_score_id'])
+            .values_list('id', flat=True),
+        )
+    save_manifest(output_dir, manifest)
+    rows_written = 0
+    chunk = []
+
+    def flush(chunk, index):
+        # Les colonnes de features sont fixées par le premier paquet exporté
+        if manifest['feature_names'] is None:
+            manifest['feature_names'] = sorted({name for row in chunk for name in row[-1]})
+
+        by_version = {}
+        for row in chunk:
+            by_version.setdefault(row[7], []).append(row)
+
+        written = 0
+        for model_version, rows in sorted(by_version.items()):
+            relative = Path(partition_name(model_version)) / f'part-{run:05d}-{index:05d}.{file_format}'
+            count = write_part(build_columns(rows, manifest['feature_names']), output_dir / relative, file_format)
+            manifest['parts'].append({
+                'file': str(relative),
+                'model_version': model_version,
+                'rows': count,
+                'first_score_id': rows[0][0],
+                'last_score_id': rows[-1][0],
+            })
+            written += count
+
+        # Scores réexportés (ids anciens) : le dernier score exporté ne recule pas
+        manifest['last_score_id'] = max(manifest['last_score_id'], chunk[-1][0])
+        manifest['rows'] += written
+        save_manifest(output_dir, manifest)
+        return written
+
+    index = 0
+    for row in snapshot_queryset(manifest['last_score_id'], since).iterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            rows_written += flush(chunk, index)
+            index += 1
+            chunk = []
+            if progress:
+                progress(rows_written)
+
+    if chunk:
+        rows_written += flush(chunk, index)
+        if progress:
+            progress(rows_written)
+
+    manifest['exported_until'] = started_at.isoformat()
+    manifest['updated_at'] = timezone.now().isoformat()
+    manifest['last_run_rows'] = rows_written
+    manifest['last_run_updated'] = updated
+    save_manifest(output_dir, manifest)
+    return manifest
@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import CreditScoreViewSet, PaymentHistoryViewSet, TransactionViewSet
+from .views import CreditScoreViewSet, PaymentHistoryViewSet, TransactionViewSet, metrics_view, drift_view, challenger_report_view
 
 router = DefaultRouter()
 router.register(r'scores', CreditScoreViewSet, basename='score')
@@ -8,5 +8,8 @@ router.register(r'payment-history', PaymentHistoryViewSet, basename='payment-his
 router.register(r'transactions', TransactionViewSet, basename='transaction')
 
 urlpatterns = [
+    path('metrics/', metrics_view, name='scoring-metrics'),
+    path('drift/', drift_view, name='scoring-drift'),
+    path('challengers/report/', challenger_report_view, name='scoring-challenger-report'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -0,0 +1,66 @@
+"""
+Versions de configuration partagées entre processus (table config_versions)
+
+Les grilles de score, les challengers et les règles métier sont compilés
+une fois par processus. Chaque modification incrémente en base le compteur
+de sa configuration (voir signals.py) : tous les processus (API, workers,
+pool parallèle) voient le changement et recompilent, sans redémarrage.
+
+Le compteur est relu au plus toutes les CONFIG_VERSION_CHECK_INTERVAL
+secondes par processus (0 : à chaque usage) ; le processus qui fait la
+modification vide son propre cache immédiatement.
+"""
+import time
+
+from django.conf import settings
+from django.db.models import F
+
+
+def get_config_version(name):
+    from .models import ConfigVersion
+
+    return ConfigVersion.objects.filter(name=name).values_list('version', flat=True).first() or 0
+
+
+def bump_config_version(name):
+    """Incrémente le compteur (UPDATE atomique ; ligne créée au premier usage)"""
+    from .models import ConfigVersion
+
+    if not ConfigVersion.objects.filter(name=name).update(version=F('version') + 1):
+        ConfigVersion.objects.bulk_create([ConfigVersion(name=name, version=1)], ignore_conflicts=True)
+
+
+class VersionedCache:
+    """Valeurs calculées une fois par processus, recalculées quand la version en base change"""
+
+    def __init__(self, name):
+        self.name = name
+        self.version = None
+        self.checked_at = None
+        self.values = {}
+
+    def check(self):
+        now = time.monotonic()
+        if self.checked_at is not None and now - self.checked_at < settings.CONFIG_VERSION_CHECK_INTERVAL:
+            return
+        version = get_config_version(self.name)
+        if version != self.version:
+            self.values.clear()
+            self.version = version
+        self.checked_at = now
+
+    def get(self, key, compute):
+        self.check()
+        if key not in self.values:
+            self.values[key] = compute()
+        return self.values[key]
+
+    def __contains__(self, key):
+        self.check()
+        return key in self.values
+
+    def clear(self):
+        """Vide le cache local et force la relecture de la version"""
+        self.values.clear()
+        self.version = None
+        self.checked_at = None
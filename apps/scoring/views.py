@@ -2,18 +2,30 @@
 # apps/scoring/views.py - CORRIGÉ POUR RÉCUPÉRER LE BON SCORE
 # ============================================
 
+from django.http import StreamingHttpResponse
 from rest_framework import viewsets, status
-from rest_framework.decorators import action
+from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 
 # Import core
 from core.permissions import IsAgent
 from core.exceptions import InsufficientScoreException
+from core.instrumentation import registry as metrics_registry
+from datetime import datetime
 
 from .models import CreditScore, PaymentHistory, Transaction
-from .serializers import CreditScoreSerializer, PaymentHistorySerializer, TransactionSerializer
-from .services import calculate_score
+from .serializers import (
+    CreditScoreSerializer, PaymentHistorySerializer, TransactionSerializer, SimulationRequestSerializer,
+    CalculateBatchSerializer,
+)
+from .services import calculate_score, calculate_scores_or_errors, simulate_scores
+from .drift import compute_drift, default_drift_periods
+from .challengers import challenger_report, get_active_challengers
+from .history import score_history
+from .export import EXPORT_FORMATS, filter_scores, iter_export
+from .scorecard import get_active_scorecard
+from apps.accounts.models import User, ClientProfile
 from apps.demands.models import CreditDemand
 
 
@@ -76,6 +88,36 @@ class CreditScoreViewSet(viewsets.ReadOnlyModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
     
+    @action(detail=False, methods=['get'])
+    def history(self, request):
+        """Historique des calculs de score d'une demande (plus récent d'abord)"""
+        demand_id = request.query_params.get('demand_id')
+        
+        if not demand_id:
+            return Response(
+                {'error': 'demand_id est requis'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            demand = CreditDemand.objects.get(id=demand_id)
+        except (CreditDemand.DoesNotExist, ValueError):
+            return Response(
+                {'error': 'Demande non trouvée'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        if request.user.role == 'CLIENT' and demand.client_id != request.user.id:
+            return Response(
+                {'error': 'Accès non autorisé'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        return Response({
+            'demand_id': demand.id,
+            'history': score_history(demand.id),
+        })
+    
     @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated, IsAgent])
     def calculate(self, request):
         """Calculer le score pour une demande spécifique"""
@@ -98,6 +140,97 @@ class CreditScoreViewSet(viewsets.ReadOnlyModelViewSet):
                 {'error': 'Demande non trouvée'},
                 status=status.HTTP_404_NOT_FOUND
             )
+    
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated, IsAgent])
+    def calculate_batch(self, request):
+        """Calculer les scores d'un lot de demandes en une passe (features en masse, écriture groupée)"""
+        serializer = CalculateBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        demand_ids = serializer.validated_data['demand_ids']
+        
+        demands = CreditDemand.objects.select_related('client').in_bulk(demand_ids)
+        found = [demands[demand_id] for demand_id in demand_ids if demand_id in demands]
+        scores, errors = calculate_scores_or_errors(found, force=serializer.validated_data['force'])
+        
+        results = []
+        for demand_id in demand_ids:
+            if demand_id not in demands:
+                results.append({'demand_id': demand_id, 'error': 'Demande non trouvée'})
+            elif demand_id in errors:
+                results.append({'demand_id': demand_id, 'error': errors[demand_id]})
+            else:
+                results.append({'demand_id': demand_id, 'score': self.get_serializer(scores[demand_id]).data})
+        
+        return Response({
+            'count': len(demand_ids),
+            'scored': len(scores),
+            'errors': len(demand_ids) - len(scores),
+            'results': results,
+        })
+    
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated, IsAgent])
+    def export(self, request):
+        """Export en flux des scores et des features (NDJSON ou CSV), sans pagination
+        
+        Paramètres (optionnels) : export_format (ndjson, csv), start, end
+        (AAAA-MM-JJ), model_version, risk_level.
+        """
+        params = request.query_params
+        export_format = params.get('export_format', 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {'error': f"Format invalide ({', '.join(EXPORT_FORMATS)})"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            dates = {
+                name: datetime.strptime(params[name], '%Y-%m-%d').date() if params.get(name) else None
+                for name in ['start', 'end']
+            }
+        except ValueError:
+            return Response(
+                {'error': 'Format de date invalide (AAAA-MM-JJ)'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        scores = filter_scores(
+            model_version=params.get('model_version'),
+            risk_level=params.get('risk_level'),
+            **dates,
+        )
+        content_type = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+        response = StreamingHttpResponse(iter_export(scores, export_format), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="scores.{export_format}"'
+        return response
+    
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated, IsAgent])
+    def simulate(self, request):
+        """Simulation what-if : score et recommandation pour une grille (montant, durée, type)"""
+        serializer = SimulationRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        try:
+            client = User.objects.select_related('client_profile').get(
+                id=serializer.validated_data['client_id'], role='CLIENT'
+            )
+            results = simulate_scores(client, serializer.validated_data['grid'])
+        except User.DoesNotExist:
+            return Response(
+                {'error': 'Client non trouvé'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        except ClientProfile.DoesNotExist:
+            return Response(
+                {'error': 'Profil client incomplet'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        return Response({
+            'client_id': client.id,
+            'count': len(results),
+            'results': results,
+        })
 
 
 class PaymentHistoryViewSet(viewsets.ReadOnlyModelViewSet):
@@ -131,4 +264,68 @@ class TransactionViewSet(viewsets.ReadOnlyModelViewSet):
         if client_id:
             return Transaction.objects.filter(client_id=client_id)
         
-        return Transaction.objects.none()
\ No newline at end of file
+        return Transaction.objects.none()
+
+
+@api_view(['GET', 'DELETE'])
+@permission_classes([IsAuthenticated, IsAgent])
+def metrics_view(request):
+    """Latences et requêtes par étape (calculate_score, evaluate_all_rules) du processus courant
+    
+    DELETE remet les histogrammes à zéro.
+    """
+    if request.method == 'DELETE':
+        metrics_registry.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    
+    return Response(metrics_registry.snapshot())
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsAgent])
+def drift_view(request):
+    """Dérive (PSI / KS) du score et des features entre une période de référence et la période courante
+    
+    Paramètres (optionnels) : model_version, reference_start, reference_end,
+    current_start, current_end (AAAA-MM-JJ), features (liste séparée par des virgules).
+    Par défaut : 7 derniers jours contre les 30 jours précédents.
+    
+    Lecture seule : les histogrammes sont alimentés par run_scoring_worker.
+    """
+    params = request.query_params
+    periods = dict(zip(
+        ['reference_start', 'reference_end', 'current_start', 'current_end'],
+        default_drift_periods(),
+    ))
+    
+    try:
+        for name in periods:
+            if params.get(name):
+                periods[name] = datetime.strptime(params[name], '%Y-%m-%d').date()
+    except ValueError:
+        return Response(
+            {'error': 'Format de date invalide (AAAA-MM-JJ)'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    model_version = params.get('model_version') or get_active_scorecard().version
+    features = [f for f in params.get('features', '').split(',') if f] or None
+    
+    return Response({
+        'model_version': model_version,
+        **{name: value.isoformat() for name, value in periods.items()},
+        'features': compute_drift(model_version, features=features, **periods),
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsAgent])
+def challenger_report_view(request):
+    """Comparaison des challengers (scoring shadow) avec le champion
+    
+    Paramètre optionnel : version (un seul challenger).
+    """
+    return Response({
+        'active_challengers': [challenger.version for challenger in get_active_challengers()],
+        'challengers': challenger_report(request.query_params.get('version')),
+    })
@@ -0,0 +1,170 @@
+# core/instrumentation.py
+"""
+Mesures de latence en processus : durée et nombre de requêtes SQL par étape
+
+Chaque étape mesurée alimente un histogramme à seaux fixes (ms) du registre
+du processus. Le coût est constant par étape (deux lectures d'horloge, un
+compteur de requêtes, une incrémentation de seau sous verrou) : les mesures
+peuvent rester actives en permanence. Chaque processus (worker gunicorn,
+run_scoring_worker) a son propre registre.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+
+# Bornes supérieures des seaux, en millisecondes (le dernier seau est +inf)
+BUCKETS_MS = [0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+
+class Histogram:
+    """Histogramme à seaux fixes : durée (ms) et requêtes SQL par observation"""
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.total_queries = 0
+        self.max_queries = 0
+
+    def observe(self, ms, queries):
+        self.buckets[bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        self.total_queries += queries
+        self.max_queries = max(self.max_queries, queries)
+
+    def quantile(self, q):
+        """Quantile estimé : borne supérieure du seau qui le contient"""
+        if not self.count:
+            return None
+
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS_MS + [self.max_ms], self.buckets):
+            seen += count
+            if seen >= rank:
+                return round(min(bound, self.max_ms), 3)
+        return round(self.max_ms, 3)
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total_ms / self.count, 3) if self.count else None,
+            'p50_ms': self.quantile(0.5),
+            'p95_ms': self.quantile(0.95),
+            'p99_ms': self.quantile(0.99),
+            'max_ms': round(self.max_ms, 3),
+            'mean_queries': round(self.total_queries / self.count, 2) if self.count else None,
+            'max_queries': self.max_queries,
+            'buckets': dict(zip([str(b) for b in BUCKETS_MS] + ['+inf'], self.buckets)),
+        }
+
+
+class MetricsRegistry:
+    """Histogrammes du processus, indexés par nom de mesure ('calculate_score.features', ...)"""
+
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, ms, queries=0):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.observe(ms, queries)
+
+    def snapshot(self):
+        with self._lock:
+            return {name: histogram.to_dict() for name, histogram in sorted(self._histograms.items())}
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+
+registry = MetricsRegistry()
+
+
+@contextmanager
+def measure(result):
+    """
+    Durée (ms) et nombre de requêtes SQL du bloc, écrits dans result en sortie
+    (y compris sur exception) :
+
+        measured = {}
+        with measure(measured):
+            ...
+        measured  # {'ms': ..., 'queries': ...}
+    """
+    queries = [0]
+
+    def count_queries(execute, sql, params, many, context):
+        queries[0] += 1
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        with connection.execute_wrapper(count_queries):
+            yield result
+    finally:
+        result['ms'] = (time.perf_counter() - started) * 1000
+        result['queries'] = queries[0]
+
+
+class StageRecorder:
+    """
+    Mesure les étapes d'un traitement (durée, requêtes SQL).
+
+        recorder = StageRecorder('calculate_score')
+        with recorder.stage('features'):
+            ...
+        recorder.finish()   # enregistre les étapes et le total dans le registre
+
+    recorder.timings : {'features': {'ms': ..., 'queries': ...}, ...}
+    """
+
+    def __init__(self, name, enabled=None):
+        self.name = name
+        self.enabled = settings.SCORING_METRICS_ENABLED if enabled is None else enabled
+        self.timings = {}
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, stage):
+        if not self.enabled:
+            yield
+            return
+
+        measured = {}
+        try:
+            with measure(measured):
+                yield
+        finally:
+            timing = self.timings.setdefault(stage, {'ms': 0.0, 'queries': 0})
+            timing['ms'] += measured['ms']
+            timing['queries'] += measured['queries']
+
+    def finish(self):
+        """Enregistre chaque étape et le total dans le registre du processus"""
+        if not self.enabled:
+            return
+        total_ms = (time.perf_counter() - self._started) * 1000
+        total_queries = 0
+        for stage, timing in self.timings.items():
+            registry.observe(f'{self.name}.{stage}', timing['ms'], timing['queries'])
+            total_queries += timing['queries']
+        registry.observe(f'{self.name}.total', total_ms, total_queries)
+
+    def as_dict(self):
+        """Étapes mesurées, arrondies (pour stockage)"""
+        return {
+            stage: {'ms': round(timing['ms'], 3), 'queries': timing['queries']}
+            for stage, timing in self.timings.items()
+        }